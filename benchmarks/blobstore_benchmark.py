@@ -57,7 +57,8 @@ class BlobstoreTiming(Bench):
         logger.info("downloadBlobs")
 
         meta_values = []
-        blob_values = []
+        self.discard(self.namespace + "Fetching blob data")
+        t_blob = Timer(cpu=True)
         for i in range(self.args['loops']):
 
             time.sleep(10)
@@ -75,17 +76,19 @@ class BlobstoreTiming(Bench):
                 meta_values.append(t_meta.elapsed.total_seconds())
                 logger.debug("----> Fetching metadata for blob %s took %.4f secs" % (blob_id, t_meta.elapsed.total_seconds()))
                 # could use 'print reader.meta' to have a look at the metadata dictionary
-                with Timer() as t_blob:
+                # measures the CPU time, too, to tell the waiting for the blobstore apart
+                with t_blob:
                     while 1:
                         dummy = reader.read(1024 * 1024)
                         dlen += len(dummy)
                         if not dummy:
                             break
-                blob_values.append(t_blob.elapsed.total_seconds())
-                logger.debug("----> Fetching data of blob %s ( %d bytes) took %.4f secs. (%.4f KBytes/sec)" % (
-                    blob_id, len(reader), t_blob.elapsed.total_seconds(), len(reader) / (t_blob.elapsed.total_seconds() * 1024)))
+                self.record("Fetching blob data", t_blob)
+                self.storeThroughput("Fetching blob data", t_blob, nbytes=len(reader))
+                logger.debug("----> Fetching data of blob %s ( %d bytes) took %.4f secs. (%.4f KBytes/sec, %d%% waiting)" % (
+                    blob_id, len(reader), t_blob.seconds, len(reader) / (t_blob.seconds * 1024),
+                    100 * (t_blob.wait_fraction or 0)))
         self.storeResult(meta_values, name="Fetching meta data", type="time_series")
-        self.storeResult(blob_values, name="Fetching blob data", type="time_series")
 
     def saveFilesIntoBlobStore(self, sourcefiles):
 
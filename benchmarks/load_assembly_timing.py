@@ -61,6 +61,7 @@ class LoadAssemblyTiming(Bench):
         logger.info("load files")
         meta_values = []
         blob_values = []
+        self.discard(self.namespace + "Fetching blob data")
         for i in range(self.args['loops']):
             time.sleep(10)
             logger.debug("Load file content - %d/%d" % (i + 1, self.args['loops']))
@@ -80,7 +81,8 @@ class LoadAssemblyTiming(Bench):
                         dlen += len(dummy)
                         if not dummy:
                             break
-                blob_values.append(t_blob.elapsed.total_seconds())
+                blob_values.append(t_blob.seconds)
+                self.storeThroughput("Fetching blob data", t_blob, nbytes=len(reader))
                 logger.debug("----> Fetching data of blob %s ( %d bytes) took %.4f secs. (%.4f KBytes/sec)" % (
                     f.cdbf_blob_id, len(reader), t_blob.elapsed.total_seconds(), len(reader) / (t_blob.elapsed.total_seconds() * 1024)))
         self.storeResult(meta_values, name="Fetching meta data", type="time_series")
@@ -11,7 +11,7 @@ This benchmarks measures the performance of pyperf itself
 import logging
 
 from pyperf.bench import Bench
-from pyperf.timer import Timer
+from pyperf.timer import PerfTimer
 
 
 logger = logging.getLogger(__name__)
@@ -27,8 +27,9 @@ class NOPBenchmark(Bench):
 
     def bench_nop(self):
         times = []
+        t = PerfTimer()
         for i in range(0, self.args["iterations"]):
-            with Timer() as t:
+            with t:
                 pass
-            times.append(t.elapsed.total_seconds())
+            times.append(t.seconds)
         self.storeResult(times, name="bench_runtime", type="time_series")
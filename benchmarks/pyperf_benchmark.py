@@ -12,12 +12,17 @@ import logging
 import subprocess
 import sys
 
+from pyperf import importtime
 from pyperf.bench import Bench
+from pyperf.exceptions import PyperfError
 from pyperf.timer import Timer
 
 
 logger = logging.getLogger(__name__)
 
+STARTUP_MODULES = ("pyperf.benchmark", "pyperf.benchrunner", "pyperf.bench")
+"""The modules "pyperf run" imports before it starts the first bench."""
+
 
 class PyPerfBenchmark(Bench):
 
@@ -36,3 +41,18 @@ class PyPerfBenchmark(Bench):
                 subprocess.check_call(cmdline)
             times.append(t.elapsed.total_seconds())
         self.storeResult(times, name="bench_runtime", type="time_series")
+
+    def bench_import_time(self):
+        """Measures the cold start imports of "pyperf run" with "python -X importtime". Fails
+        if the fastest run exceeds the arg "import_budget_ms".
+        """
+        modules = self.args.get("import_modules", STARTUP_MODULES)
+        times = []
+        for i in range(0, self.args["iterations"]):
+            measured = importtime.measure_imports(modules)
+            times.append(importtime.import_seconds(measured, modules))
+        self.storeResult(times, name="import_time", type="time_series", unit="seconds")
+        budget = self.args.get("import_budget_ms")
+        if budget is not None and min(times) * 1000 > budget:
+            raise PyperfError("Importing %s took %.1f ms, the budget is %s ms"
+                              % (", ".join(modules), min(times) * 1000, budget))
@@ -19,7 +19,7 @@ from random import choice
 from string import lowercase
 
 from pyperf.bench import Bench
-from pyperf.timer import Timer
+from pyperf.timer import PerfTimer, Timer
 from cdb import cdbtime, ddl, misc, rte, sqlapi, transaction
 
 logger = logging.getLogger("[" + __name__ + " - SqlApiBenchmark]")
@@ -207,15 +207,14 @@ class SqlApiBenchmark(Bench):
         rec["standard_library"] = 0
         rec["schriftkopf_ok"] = 1
 
-        res = []
+        self.discard(self.namespace + "Inserts")
+        t = PerfTimer()
         for i in range(rows):
             rec["z_nummer"] = _quote("%d" % i)
             # rec["z_index"] = _quote("%d" % i)
-            with Timer() as t:
+            with t:
                 self.do_single_insert(table, rec)
-            res.append(t.elapsed.total_seconds())
-        # logger.info(u"Stmts / second: %.2f stmts", rows / t.elapsed.total_seconds())
-        self.storeResult(res, type="time_series", name="Inserts")
+            self.record("Inserts", t.seconds)
 
     def do_select_one_by_one(self, rows, table):
         logger.info("\nSelect row by row for %d rows", rows)
@@ -310,4 +309,5 @@ class SqlApiBenchmark(Bench):
         self.storeResult(t.elapsed.total_seconds(), name="Nope statement")
 
 if __name__ == "__main__":
-    print(SqlApiBenchmark().run({"rows": 1000, "iterations": 10, "tablename": "x_cdb_testperf", "warmup": 100}))
+    print(SqlApiBenchmark().run({"rows": 1000, "iterations": 10, "tablename": "x_cdb_testperf",
+                                 "warmup": 100}))
@@ -34,7 +34,7 @@ class DatabaseBench(Bench):
         for i in range(0, self.args["iterations"]):
             with Timer() as t:
                 self._insert(i)
-            measurements.append(t.elapsed.total_seconds())
+            measurements.append(t.seconds)
 
         self.storeResult(measurements, name="bench_insert", type="time_series")
 
@@ -13,5 +13,5 @@ class DatabaseBench(Bench):
         for i in range(0, 10):
             with Timer() as t:
                 db.execute("INSERT INTO test VALUES 42")
-            measurements.append(t.elapsed.total_seconds())
+            measurements.append(t.seconds)
         self.storeResult(measurements, name="bench_insert", type="time_series")
@@ -0,0 +1,92 @@
+# -*- mode: python; coding: utf-8 -*-
+#
+# Copyright (C) 1990 - 2019 CONTACT Software GmbH
+# All rights reserved.
+# https://www.contact-software.com/
+
+"""Support for benches written with asyncio.
+
+:class:`pyperf.bench.Bench` drives coroutine hooks and bench methods on one event loop
+per bench class. While a coroutine bench method runs, a :class:`LoopLagMonitor` measures
+how long the event loop was blocked.
+
+asyncio is imported only when a bench actually needs an event loop, since importing it takes
+longer than running most benches.
+"""
+
+import inspect
+
+LAG_INTERVAL = 0.01
+"""The interval in seconds in which the loop lag is sampled."""
+
+
+def isawaitable(obj):
+    """Returns True if `obj` has to be run on an event loop."""
+    return hasattr(inspect, "isawaitable") and inspect.isawaitable(obj)
+
+
+def iscoroutinefunction(fn):
+    """Returns True if `fn` is a coroutine function, i.e. defined with :code:`async def`."""
+    return hasattr(inspect, "iscoroutinefunction") and inspect.iscoroutinefunction(fn)
+
+
+def new_event_loop():
+    """Creates a new event loop and makes it the current one."""
+    import asyncio
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    return loop
+
+
+def close_event_loop(loop):
+    """Closes the event loop created by :func:`new_event_loop`."""
+    import asyncio
+    try:
+        loop.run_until_complete(loop.shutdown_asyncgens())
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+
+
+class LoopLagMonitor(object):
+    """
+    Measures how late the event loop runs a callback scheduled every `interval` seconds.
+    The delay is the time the loop was blocked by other callbacks or coroutines.
+
+    :param loop: the event loop to monitor
+    :param interval: the interval in seconds between two measurements
+    """
+    def __init__(self, loop, interval=LAG_INTERVAL):
+        self.loop = loop
+        self.interval = interval
+        self.lags = []
+        self._expected = None
+        self._handle = None
+
+    def start(self):
+        """Starts the monitoring. The measurements are taken while the loop runs."""
+        self.lags = []
+        self._schedule()
+
+    def stop(self):
+        """
+        Stops the monitoring.
+
+        :returns: the list of measured lags in seconds
+        """
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+            # the loop was blocked until now, even if the tick did not run anymore
+            lag = self.loop.time() - self._expected
+            if lag > 0:
+                self.lags.append(lag)
+        return self.lags
+
+    def _schedule(self):
+        self._expected = self.loop.time() + self.interval
+        self._handle = self.loop.call_at(self._expected, self._tick)
+
+    def _tick(self):
+        self.lags.append(max(0.0, self.loop.time() - self._expected))
+        self._schedule()
@@ -0,0 +1,257 @@
+# -*- mode: python; coding: utf-8 -*-
+#
+# Copyright (C) 1990 - 2019 CONTACT Software GmbH
+# All rights reserved.
+# https://www.contact-software.com/
+
+"""Attribution of outlier samples to garbage collections and to the load of other processes.
+
+While a bench runs with the setting :code:`"attribution"`, an :class:`Attribution`
+
+* records the collections of the cyclic garbage collector with their start and duration
+  (:code:`gc.callbacks`, Python 3.3+),
+* samples the CPU load the other processes put on the machine in a helper thread and
+* timestamps every sample appended with :meth:`pyperf.bench.Bench.record`, except for
+  histograms, which do not keep their samples.
+
+Afterwards the outliers of every timestamped series are determined, either by the median
+absolute deviation (:data:`MAD`) or by the interquartile range (:data:`IQR`). An outlier is
+attributed to the garbage collector or to the system if a collection or a load spike overlapped
+it, a sample in a unit of time is assumed to end at its timestamp. The counts are stored as
+"outliers" next to the series, the collections as series "gc_pauses".
+"""
+
+import gc
+import logging
+import threading
+
+from pyperf import stats
+from pyperf import timer
+from pyperf.samples import Samples
+
+logger = logging.getLogger(__name__)
+
+MAD = "mad"
+"""Outliers are above the median by more than `threshold` times the scaled MAD."""
+
+IQR = "iqr"
+"""Outliers are above the third quartile by more than `threshold` times the IQR."""
+
+THRESHOLDS = {MAD: 3.0, IQR: 1.5}
+"""The default thresholds of the methods."""
+
+MAD_SCALE = 1.4826
+"""Scales the MAD to the standard deviation of normally distributed samples."""
+
+TELEMETRY_INTERVAL = 0.05
+"""The interval in seconds the load of the system is sampled in."""
+
+SPIKE_PERCENT = 50.0
+"""The CPU load of other processes in percent of the machine regarded as spike."""
+
+GC = "gc"
+"""The result type of the garbage collections."""
+
+
+class GCMonitor(object):
+    """
+    Records the collections of the garbage collector as (start, end, generation) tuples.
+
+    :param clock: a function returning the current time in seconds
+    """
+    def __init__(self, clock):
+        self.events = []
+        self._clock = clock
+        self._start = None
+
+    def start(self):
+        """Starts recording the collections."""
+        self.events = []
+        if not hasattr(gc, "callbacks"):
+            logger.debug("gc.callbacks is not available, the garbage collections are not recorded")
+            return
+        gc.callbacks.append(self._callback)
+
+    def stop(self):
+        """Stops recording the collections."""
+        if hasattr(gc, "callbacks") and self._callback in gc.callbacks:
+            gc.callbacks.remove(self._callback)
+        self._start = None
+
+    def _callback(self, phase, info):
+        now = self._clock()
+        if phase == "start":
+            self._start = now
+        elif self._start is not None:
+            self.events.append((self._start, now, info["generation"]))
+            self._start = None
+
+
+class TelemetryMonitor(object):
+    """
+    Samples the CPU load of the other processes, i.e. the load of the machine minus the load of
+    this process, in percent of all CPUs. Intervals with a load of at least `spike` percent are
+    the :attr:`spikes`.
+
+    :param clock: a function returning the current time in seconds
+    :param interval: the sampling interval in seconds
+    :param spike: the load in percent regarded as spike
+    """
+    def __init__(self, clock, interval=TELEMETRY_INTERVAL, spike=SPIKE_PERCENT):
+        self.interval = interval
+        self.spike = spike
+        self.samples = []
+        self._clock = clock
+        import psutil
+        self._process = psutil.Process()
+        self._cpus = psutil.cpu_count() or 1
+        self._stopped = threading.Event()
+        self._thread = None
+
+    @property
+    def spikes(self):
+        """The (start, end) tuples of the intervals with a load spike."""
+        return [(start, end) for start, end, load in self.samples if load >= self.spike]
+
+    def start(self):
+        """Starts sampling in a helper thread."""
+        self.samples = []
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="pyperf-telemetry")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Stops sampling."""
+        if self._thread is not None:
+            self._stopped.set()
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        import psutil
+        psutil.cpu_percent(None)
+        self._process.cpu_percent(None)
+        last = self._clock()
+        while not self._stopped.wait(self.interval):
+            now = self._clock()
+            load = psutil.cpu_percent(None) - self._process.cpu_percent(None) / self._cpus
+            self.samples.append((last, now, max(0.0, load)))
+            last = now
+
+
+def find_outliers(values, method=MAD, threshold=None):
+    """
+    Finds the samples which are slower, i.e. larger, than the bulk of the samples.
+
+    :param values: the samples
+    :param method: :data:`MAD` or :data:`IQR`
+    :param threshold: the multiple of the MAD or IQR, defaults to :data:`THRESHOLDS`
+    :returns: a tuple of the limit and the indices of the samples above it
+    :raises ValueError: for an unknown method
+    """
+    if method not in THRESHOLDS:
+        raise ValueError("Unknown outlier method '%s'" % method)
+    if threshold is None:
+        threshold = THRESHOLDS[method]
+    ordered = sorted(values)
+    if method == MAD:
+        limit = stats.percentile(ordered, 50) + threshold * MAD_SCALE * stats.mad(ordered)
+    else:
+        q1, q3 = stats.percentile(ordered, 25), stats.percentile(ordered, 75)
+        limit = q3 + threshold * (q3 - q1)
+    return limit, [index for index, value in enumerate(values) if value > limit]
+
+
+def attribute(values, timestamps, unit, gc_events, spikes, method=MAD, threshold=None):
+    """
+    Attributes the outliers of a timestamped series to the garbage collections and load spikes
+    overlapping them.
+
+    :param values: the samples
+    :param timestamps: the time in seconds each sample was recorded at
+    :param unit: the unit of the samples. Samples in a unit of time cover the interval up to
+        their timestamp, others only their timestamp.
+    :param gc_events: the collections, see :class:`GCMonitor`
+    :param spikes: the load spikes, see :class:`TelemetryMonitor`
+    :param method: see :func:`find_outliers`
+    :param threshold: see :func:`find_outliers`
+    :returns: a dict with the "method", the "limit" and the number of outliers ("count"), of
+        those overlapping a collection ("gc") or a load spike ("system") and of the others
+        ("unexplained")
+    """
+    limit, outliers = find_outliers(values, method, threshold)
+    scale = timer.UNIT_NANOSECONDS.get(unit)
+    counts = {"method": method, "limit": limit, "count": len(outliers), "gc": 0, "system": 0,
+              "unexplained": 0}
+    for index in outliers:
+        end = timestamps[index]
+        start = end - values[index] * scale / 1e9 if scale else end
+        by_gc = any(_overlaps(event[0], event[1], start, end) for event in gc_events)
+        by_system = any(_overlaps(spike[0], spike[1], start, end) for spike in spikes)
+        counts["gc"] += by_gc
+        counts["system"] += by_system
+        counts["unexplained"] += not (by_gc or by_system)
+    return counts
+
+
+def _overlaps(start1, end1, start2, end2):
+    return start1 <= end2 and end1 >= start2
+
+
+class Attribution(object):
+    """
+    Records the garbage collections and the load of the system while a bench runs, and
+    attributes the outliers of its timestamped series afterwards.
+
+    :param method: the method to find outliers with, :data:`MAD` or :data:`IQR`
+    :param threshold: the threshold of the method, see :func:`find_outliers`
+    :param interval: the sampling interval of the system load in seconds
+    :param spike: the load of other processes in percent regarded as spike
+    :raises ValueError: for an unknown method
+    """
+    def __init__(self, method=MAD, threshold=None, interval=TELEMETRY_INTERVAL, spike=SPIKE_PERCENT):
+        if method not in THRESHOLDS:
+            raise ValueError("Unknown outlier method '%s'" % method)
+        self.method = method
+        self.threshold = threshold
+        self._epoch = timer.perf_counter_ns()
+        self.gc = GCMonitor(self.now)
+        self.telemetry = TelemetryMonitor(self.now, interval, spike)
+
+    def now(self):
+        """Returns the seconds since the creation of the attribution."""
+        return (timer.perf_counter_ns() - self._epoch) / 1e9
+
+    def start(self):
+        """Starts recording the collections and the system load."""
+        self.gc.start()
+        self.telemetry.start()
+
+    def stop(self):
+        """Stops recording."""
+        self.telemetry.stop()
+        self.gc.stop()
+
+    def timestamp(self, entry):
+        """Appends the current time to the "timestamps" of the result `entry`."""
+        entry.setdefault("timestamps", Samples()).append(self.now())
+
+    def store(self, bench):
+        """Stores the attributed outlier counts as "outliers" of the timestamped results of
+        the bench and the durations of the collections as series "gc_pauses".
+        """
+        spikes = self.telemetry.spikes
+        for entry in bench.results.values():
+            timestamps = entry.get("timestamps")
+            if not isinstance(entry["value"], (Samples, list)):
+                continue
+            if timestamps and len(timestamps) == len(entry["value"]):
+                entry["outliers"] = attribute(entry["value"], timestamps, entry["unit"],
+                                              self.gc.events, spikes, self.method, self.threshold)
+        bench.results["gc_pauses"] = {
+            "value": Samples(end - start for start, end, _ in self.gc.events),
+            "timestamps": Samples(end for _, end, _ in self.gc.events),
+            "unit": "seconds",
+            "type": GC,
+        }
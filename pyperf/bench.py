@@ -5,11 +5,96 @@
 # All rights reserved.
 # https://www.contact-software.com/
 
-import inspect
+import collections
+import fnmatch
+import itertools
 import logging
+import os
+import sys
+import timeit
+
+from pyperf import aio
+from pyperf import stats
+from pyperf import timer
+from pyperf.samples import Samples, SECONDS
+from pyperf.histogram import Histogram, HISTOGRAM
 
 logger = logging.getLogger(__name__)
 
+MEASURE_MIN_TIME = 0.01
+"""Minimum duration in seconds a single sample of :meth:`Bench.measure` has to last."""
+
+MEASURE_MAX_TIME = 10.0
+"""Maximum time in seconds :meth:`Bench.measure` spends on sampling."""
+
+MEASURE_REL_CI = 0.01
+"""Relative half width of the 95% confidence interval :meth:`Bench.measure` aims at."""
+
+MEASURE_MIN_SAMPLES = 5
+MEASURE_MAX_SAMPLES = 1000
+
+THROUGHPUT = "throughput"
+"""The result type of the series stored by :meth:`Bench.storeThroughput`."""
+
+FILE = "file"
+"""The result type of results referring to a file written by :meth:`Bench.storeFile`.
+These results are not uploaded."""
+
+BenchInfo = collections.namedtuple("BenchInfo", ["attr", "name", "unit", "type"])
+"""Metadata of a bench method: the attribute name of the method, the default name, unit and
+type of the results it stores. Only the attribute name is mandatory, the others may be None."""
+
+_BENCH_INFO = "_pyperf_bench"
+
+
+def bench(name=None, unit=None, type=None):  # pylint: disable=redefined-builtin
+    """Decorator marking a method of a :class:`Bench` as bench method, regardless of its name.
+    The metadata is used by :meth:`Bench.storeResult` for results stored directly by the method
+    without giving a name, unit or type::
+
+        class MyBench(Bench):
+            @bench(name="bench_insert", unit="ms")
+            def insert(self):
+                self.storeResult(42)
+
+    :param name: the name of the results stored by the method, defaults to the name of the
+        method prefixed with "bench\\_", which the uploader expects
+    :param unit: the default unit of the results stored directly by the method
+    :param type: the default type of the results stored directly by the method
+    """
+    def decorator(fn):
+        setattr(fn, _BENCH_INFO, (name, unit, type))
+        return fn
+    return decorator
+
+
+def _callername(depth):
+    """Returns the name of the function `depth` frames above the caller."""
+    try:
+        return sys._getframe(depth + 1).f_code.co_name  # pylint: disable=protected-access
+    except (AttributeError, ValueError):
+        return ""
+
+
+def _time_loops(fn, loops):
+    """Calls `fn` `loops` times and returns the elapsed time in seconds."""
+    it = itertools.repeat(None, loops)
+    clock = timeit.default_timer
+    start = clock()
+    for _ in it:
+        fn()
+    return clock() - start
+
+
+def _next_loops(loops):
+    """Returns the successor of `loops` in the sequence 1, 2, 5, 10, 20, 50, ..."""
+    base = 1
+    while base * 10 <= loops:
+        base *= 10
+    for factor in (2, 5, 10):
+        if base * factor > loops:
+            return base * factor
+
 
 class Bench(object):
     """'Bench' is an abstract class which has to be used for creating benchmarks.
@@ -29,6 +114,56 @@ class Bench(object):
     measurements. The data would be stored under the name of the third method.
     In order to distinguish the calls the namespace attribute was introduced."""
 
+    settings = {}
+    """This dict contains the settings of the suite entry running this bench, e.g.
+    the warmup. The settings are read by the benchrunner and passed by the run method."""
+
+    fixtures = {}
+    """This dict maps the names of the fixtures the suite entry uses to their values, see
+    :class:`pyperf.fixture.Fixture`. The fixtures are set up by the benchrunner and shared
+    by all benches using them."""
+
+    artifacts = ""
+    """The directory the files stored by :meth:`storeFile` are written to. The benchrunner sets
+    it to a directory next to the report, which is unique for every suite entry."""
+
+    recording = True
+    """Results are only stored while recording is True. The run method disables
+    recording during the warmup phase."""
+
+    progress = None
+    """An optional callable notified by the run method before each test and after the last
+    one. It is called with the method name of the test (None after the last one) and the
+    results stored so far. The benchrunner uses it to supervise benches with a timeout."""
+
+    _current = None
+    _loop = None
+    _attribution = None
+
+    @classmethod
+    def benches(cls):
+        """Returns the metadata of the bench methods of this class, ordered by their
+        attribute names. Bench methods are the methods decorated with :func:`bench` and the
+        methods prefixed with "bench\\_". The list is computed once per class.
+
+        :returns: a list of :class:`BenchInfo` tuples
+        """
+        registry = cls.__dict__.get("_registry")
+        if registry is None:
+            registry = []
+            for attr in sorted(dir(cls)):
+                member = getattr(cls, attr, None)
+                info = getattr(member, _BENCH_INFO, None)
+                if info is not None:
+                    name, unit, type_ = info
+                    if name is None and not attr.startswith("bench_"):
+                        name = "bench_" + attr
+                    registry.append(BenchInfo(attr, name, unit, type_))
+                elif attr.startswith("bench_") and callable(member):
+                    registry.append(BenchInfo(attr, None, None, None))
+            cls._registry = registry
+        return registry
+
     def setUp(self):
         """Method called to prepare the test fixture. The default implementation does nothing.
         This is called immediately before calling the test method;
@@ -54,25 +189,210 @@ class Bench(object):
         """
         pass
 
-    def storeResult(self, val, name="", type="time", unit="seconds"):
+    def storeResult(self, val, name="", type=None, unit=None, overhead=None):
         """Store the benchmark result. The run-Method call will return all stored results.
         Note that the global variable 'namespace' is used as a prefix for the name.
         If a method is called several times from different test, a namespace is
         used to distinguish the entries. Entries with the same name will be updated.
 
-        :param val: measurments; the val can be a collection or a single value.
+        :param val: measurments; the val can be a collection or a single value. For a
+            :class:`pyperf.timer.PerfTimer` (or :class:`pyperf.timer.Timer`) its wall clock time
+            is stored in seconds. If it measured the CPU times, they are stored as well as
+            "<name>_cpu", "<name>_thread_cpu" and the wait fraction as "<name>_wait".
         :param name: the name of the entry for this data. If name is empty or not
-            specified, the name of calling method (parent frame) will be used.
+            specified, the name given to the :func:`bench` decorator or the name of
+            calling method will be used.
         :param type: type of measurments. this is important for further processing of
-            the data.
-        :param unit: the unit of the values.
+            the data. Defaults to the type given to the :func:`bench` decorator, if the decorated
+            method stores the result itself, or "time".
+        :param unit: the unit of the values. Defaults to the unit given to the :func:`bench`
+            decorator, if the decorated method stores the result itself, or "seconds".
+        :param overhead: "subtract" subtracts the overhead of the timer from the measurements,
+            "flag" counts the measurements which are too short to be measured reliably in the
+            field "below_resolution" of the result, see :func:`pyperf.timer.correct_overhead`.
         """
+        if not self.recording:
+            return
         if name == "":
-            curframe = inspect.currentframe()
-            calframe = inspect.getouterframes(curframe, 2)
-            name = calframe[1][3]
+            name = self._resultname(_callername(1))
+        current = self._current
+        if current is not None and (type is None or unit is None):
+            # the defaults of the decorator do not apply to helpers called by the method
+            caller = _callername(1)
+            if caller and caller != current.attr:
+                current = None
+        if type is None:
+            type = (current and current.type) or "time"
+        if unit is None:
+            unit = (current and current.unit) or "seconds"
+        if isinstance(val, timer.PerfTimer):
+            for suffix, value, value_unit in val.measurements():
+                self.storeResult(value, name + suffix, type, value_unit, overhead if not suffix else None)
+            return
+        entry = {"value": val, "unit": unit, "type": type}
+        self._add_percentiles(entry)
+        if overhead:
+            entry["value"], flagged = timer.correct_overhead(val, unit, overhead)
+            if flagged is not None:
+                entry["below_resolution"] = flagged
         # overrides if the entry already exist
-        self.results.update({self.namespace + name: {"value": val, "unit": unit, "type": type}})
+        self.results.update({self.namespace + name: entry})
+
+    def artifactPath(self, name, extension=".txt"):
+        """Returns the path of a file for the result `name` in :attr:`artifacts` and creates
+        the directory if needed. Note that the global variable 'namespace' is used as a prefix
+        for the name.
+
+        :param name: the name of the result the file belongs to
+        :param extension: the extension of the file
+        :returns: the path of the file
+        """
+        if self.artifacts and not os.path.isdir(self.artifacts):
+            os.makedirs(self.artifacts)
+        return os.path.join(self.artifacts, self.namespace + name + extension)
+
+    def storeFile(self, name, content, extension=".txt"):
+        """Writes the content to a file in :attr:`artifacts` and stores its path as result
+        of the type "file". Use it for data which is too large or too unstructured for the
+        report, e.g. the top allocation sites of a test.
+
+        :param name: the name of the result
+        :param content: the text or bytes to write
+        :param extension: the extension of the file
+        :returns: the path of the file, None when not recording
+        """
+        if not self.recording:
+            return None
+        path = self.artifactPath(name, extension)
+        with open(path, "wb" if isinstance(content, bytes) else "w") as f:
+            f.write(content)
+        self.storeResult(path, name=name, type=FILE, unit="path")
+        return path
+
+    def record(self, name, value, unit="seconds", type="time_series", typecode=SECONDS, overhead=None):
+        """Append a single sample to the time series `name`. The series is stored compactly
+        as :class:`pyperf.samples.Samples`, which makes this the method of choice for long
+        series recorded inside of loops. Note that the global variable 'namespace' is used
+        as a prefix for the name.
+
+        When the type is "histogram", the samples are not kept at all, but counted in a
+        :class:`pyperf.histogram.Histogram` instead. Its memory usage does not grow with
+        the number of samples, so its samples are not timestamped for the outlier attribution.
+
+        :param name: the name of the entry for the series
+        :param value: the sample to append. For a :class:`pyperf.timer.PerfTimer` the samples
+            of all its measurements are appended, see :meth:`storeResult`.
+        :param unit: the unit of the values
+        :param type: type of measurments
+        :param typecode: the :code:`array` typecode of the series, e.g.
+            :data:`pyperf.samples.NANOSECONDS` for integer nanoseconds
+        :param overhead: "subtract" or "flag", see :meth:`storeResult`
+        """
+        if not self.recording:
+            return
+        if isinstance(value, timer.PerfTimer):
+            for suffix, sample, sample_unit in value.measurements():
+                self.record(name + suffix, sample, sample_unit, type, SECONDS,
+                            overhead if not suffix else None)
+            return
+        key = self.namespace + name
+        entry = self.results.get(key)
+        container = Histogram if type == HISTOGRAM else Samples
+        if entry is None or not isinstance(entry["value"], container):
+            series = Histogram() if type == HISTOGRAM else Samples(typecode=typecode)
+            entry = {"value": series, "unit": unit, "type": type}
+            self._add_percentiles(entry)
+            self.results[key] = entry
+        if overhead:
+            value, flagged = timer.correct_overhead(value, unit, overhead)
+            if flagged is not None:
+                entry["below_resolution"] = entry.get("below_resolution", 0) + flagged
+        entry["value"].append(value)
+        if self._attribution is not None and container is Samples:
+            self._attribution.timestamp(entry)
+
+    def _add_percentiles(self, entry):
+        """Adds the percentiles configured for the suite entry to a result of type
+        "distribution", which the uploader aggregates to these percentiles.
+        """
+        percentiles = self.settings.get("percentiles")
+        if entry["type"] == stats.DISTRIBUTION and percentiles:
+            entry["percentiles"] = list(percentiles)
+
+    def storeThroughput(self, name, seconds, items=None, nbytes=None):
+        """Append the throughput of a single operation to the series "<name>_ops_per_sec"
+        (unit "ops/s") and "<name>_bytes_per_sec" (unit "bytes/s"). The series are stored
+        like the series of :meth:`record`, so the uploader aggregates them to fields.
+
+        :param name: the prefix of the names of the series
+        :param seconds: the duration of the operation in seconds or the
+            :class:`pyperf.timer.PerfTimer` which measured it
+        :param items: the number of items processed by the operation, e.g. rows
+        :param nbytes: the number of bytes processed by the operation
+        """
+        if not self.recording:
+            return
+        if isinstance(seconds, timer.PerfTimer):
+            seconds = seconds.seconds
+        if not seconds or seconds <= 0:
+            logger.debug("Skipping the throughput of '%s', its duration is %r", name, seconds)
+            return
+        if items is not None:
+            self.record(name + "_ops_per_sec", items / float(seconds), unit="ops/s", type=THROUGHPUT)
+        if nbytes is not None:
+            self.record(name + "_bytes_per_sec", nbytes / float(seconds), unit="bytes/s", type=THROUGHPUT)
+
+    def measure(self, fn, name="", min_time=MEASURE_MIN_TIME, max_time=MEASURE_MAX_TIME,
+                rel_ci=MEASURE_REL_CI, min_samples=MEASURE_MIN_SAMPLES, max_samples=MEASURE_MAX_SAMPLES):
+        """Measure the runtime of `fn` and store the samples as time series.
+        Like :code:`timeit`'s autorange, the number of calls per sample is grown (1, 2, 5, 10, 20, ...)
+        until a single sample lasts at least `min_time`. Afterwards samples are taken until
+        the confidence interval of the mean is narrow enough or `max_time` is exceeded.
+        Every sample is the time of a single call of `fn`, averaged over the calls of the sample.
+
+        :param fn: the callable to measure, it is called without arguments.
+        :param name: the name of the entry for the samples. If name is empty or not
+            specified, the name of calling method will be used.
+        :param min_time: minimum duration of a single sample in seconds
+        :param max_time: time in seconds after which the sampling stops
+        :param rel_ci: relative half width of the 95% confidence interval of the mean
+            that ends the sampling
+        :param min_samples: minimum number of samples
+        :param max_samples: maximum number of samples
+        :returns: the list of samples
+        """
+        if name == "":
+            name = self._resultname(_callername(1))
+
+        # calibrate: grow the number of calls per sample
+        loops = 1
+        while True:
+            elapsed = _time_loops(fn, loops)
+            if elapsed >= min_time:
+                break
+            loops = _next_loops(loops)
+
+        samples = [elapsed / loops]
+        spent = elapsed
+        while len(samples) < max_samples and spent < max_time:
+            if len(samples) >= min_samples and stats.relative_ci(samples) <= rel_ci:
+                break
+            elapsed = _time_loops(fn, loops)
+            spent += elapsed
+            samples.append(elapsed / loops)
+
+        logger.debug("Measured '%s': %d samples of %d calls each", name, len(samples), loops)
+        self.storeResult(samples, name=name, type="time_series")
+        return samples
+
+    def _resultname(self, caller):
+        """Returns the name for results stored by the function `caller` without
+        an explicit name.
+        """
+        current = self._current
+        if current is not None and (not caller or caller == current.attr):
+            return current.name or current.attr
+        return caller
 
     def discard(self, prefix):
         """Discard results with the given prefix.
@@ -86,48 +406,277 @@ class Bench(object):
         for ele in remove:
             self.results.pop(ele, None)
 
-    def run(self, args):
-        """This method calls every test in this class. Test are indentified by the prefix "bench\_".
+    def run(self, args, settings=None):
+        """This method calls every test in this class. Test are indentified by the prefix "bench\_"
+        or by the :func:`bench` decorator, see :meth:`benches`.
         The setUp-method is called immediately before each test and the tearDown-method is
         called immediately after each test. The result stored by 'storeResult'
         is structured in json format and will be returned.
 
+        Hooks and tests may be coroutine functions (:code:`async def`). They are run on an
+        event loop shared by all methods of this class. While a coroutine test runs, the lag of
+        the event loop is monitored and stored as time series named "<test>_loop_lag".
+
+        When the settings contain a warmup, each test is run in a warmup phase before it is
+        measured. Results stored during the warmup phase are dropped. The warmup is either a
+        fixed number of iterations (:code:`{"iterations": 10}`) or lasts until the runtime of
+        the test is stable (:code:`{"until_stable": true}`), see :meth:`_warmup`.
+
+        When the settings contain a :code:`profile` pattern, the matching tests are run once
+        more under cProfile after all tests were measured, see :meth:`_profile`.
+
+        When the settings contain :code:`"attribution": true` (or its parameters, e.g.
+        :code:`{"method": "iqr"}`), the garbage collections and the load of the system are
+        recorded while the tests run, the samples appended by :meth:`record` are timestamped
+        and their outliers are attributed, see :mod:`pyperf.attribution`.
+
         :param args: a dictionary consisting of all parameter which are used in this benchmark.
             E.g. iterations could be used for the repitition of an insert query.
+        :param settings: a dictionary with the settings of the suite entry, e.g. the warmup.
         :returns: a dict with the result of the benchmark.
         """
-        # pylint: disable=broad-except, too-many-nested-blocks
+        # pylint: disable=broad-except
         self.args = args
+        self.settings = settings or {}
         self.results = {}
         rc = True
         try:
-            self.setUpClass()
-            for test in dir(self):
-                if test.find('bench_') == 0:
-                    try:
-                        self.setUp()
-                        getattr(self, test)()
-                    except Exception:
-                        rc = False
-                        logger.exception("Exception while running '%s'",
-                                         self.__class__.__name__)
-                    finally:
-                        try:
-                            self.tearDown()
-                        except Exception:
-                            rc = False
-                            logger.exception("Exception while running tearDown of '%s'",
-                                             self.__class__.__name__)
+            attribution = self.settings.get("attribution")
+            if attribution:
+                from pyperf.attribution import Attribution
+                self._attribution = Attribution(**(attribution if isinstance(attribution, dict) else {}))
+                self._attribution.start()
+            self._call(self.setUpClass)
+            warmup = self.settings.get("warmup")
+            for test in self.benches():
+                self._notify(test.attr)
+                if warmup:
+                    rc &= self._warmup(test, warmup)
+                rc &= self._run_test(test)[0]
+            profile = self.settings.get("profile")
+            if profile:
+                rc &= self._profile(profile)
+            self._notify(None)
         except Exception:
             rc = False
             logger.exception("Exception while running '%s'",
                              self.__class__.__name__)
         finally:
+            if self._attribution is not None:
+                attribution, self._attribution = self._attribution, None
+                attribution.stop()
+                try:
+                    attribution.store(self)
+                except Exception:
+                    rc = False
+                    logger.exception("Exception while attributing the outliers of '%s'",
+                                     self.__class__.__name__)
             try:
-                self.tearDownClass()
+                self._call(self.tearDownClass)
             except Exception:
                 rc = False
                 logger.exception("Exception while running tearDownClass of '%s'",
                                  self.__class__.__name__)
+            if self._loop is not None:
+                aio.close_event_loop(self._loop)
+                self._loop = None
 
         return rc, self.results
+
+    def _notify(self, test):
+        """Passes the name of the test which is about to run (None when all tests are done)
+        and the results stored so far to :attr:`progress`.
+        """
+        if self.progress is not None:
+            self.progress(test, self.results)
+
+    def _call(self, fn):
+        """Calls `fn`. If it returns an awaitable, e.g. because it is a coroutine function,
+        the awaitable is run on the event loop of this bench.
+        """
+        result = fn()
+        if aio.isawaitable(result):
+            result = self._await(result)[0]
+        return result
+
+    def _await(self, awaitable, monitor=False):
+        """Runs the awaitable on the event loop of this bench, which is created on first use.
+
+        :param awaitable: the awaitable to run
+        :param monitor: whether to monitor the lag of the event loop
+        :returns: a tuple of the result and the list of loop lags (None if not monitored)
+        """
+        if self._loop is None:
+            self._loop = aio.new_event_loop()
+        lags = None
+        if monitor:
+            lagmonitor = aio.LoopLagMonitor(self._loop)
+            lagmonitor.start()
+            try:
+                result = self._loop.run_until_complete(awaitable)
+            finally:
+                lags = lagmonitor.stop()
+        else:
+            result = self._loop.run_until_complete(awaitable)
+        return result, lags
+
+    def _warmup(self, test, warmup):
+        """Runs the test repeatedly without recording any results.
+        The warmup dict may contain these keys:
+
+        * iterations: the number of warmup iterations (default: 1). When warming up
+          until the runtime is stable, this is the minimum number of iterations.
+        * until_stable: keep warming up until the runtime of the test is stable, i.e. the
+          mean runtimes of the last two windows differ less than the tolerance.
+        * window: the number of iterations per window (default: 3)
+        * tolerance: the allowed relative difference of the window means (default: 0.05)
+        * max_iterations: the maximum number of warmup iterations (default: 50)
+
+        :param test: the :class:`BenchInfo` of the test method
+        :param warmup: the dict describing the warmup
+        :returns: False if the warmup failed, True otherwise
+        """
+        iterations = warmup.get("iterations", 1)
+        until_stable = warmup.get("until_stable", False)
+        window = warmup.get("window", 3)
+        tolerance = warmup.get("tolerance", 0.05)
+        max_iterations = max(iterations, warmup.get("max_iterations", 50)) if until_stable else iterations
+
+        runtimes = []
+        self.recording = False
+        try:
+            while len(runtimes) < max_iterations:
+                if len(runtimes) >= iterations and \
+                   (not until_stable or stats.is_steady(runtimes, window, tolerance)):
+                    break
+                ok, runtime = self._run_test(test)
+                if not ok:
+                    logger.error("Warmup of '%s' failed", test.attr)
+                    return False
+                runtimes.append(runtime)
+        finally:
+            self.recording = True
+        if until_stable and not stats.is_steady(runtimes, window, tolerance):
+            logger.warning("Runtime of '%s' is not stable after %d warmup iterations",
+                           test.attr, len(runtimes))
+        else:
+            logger.debug("Warmup of '%s' finished after %d iterations", test.attr, len(runtimes))
+        return True
+
+    def _profile(self, pattern):
+        """Runs the tests whose attribute name or result name match the glob pattern once more
+        under cProfile. Only the test method itself is profiled, not setUp and tearDown. Since
+        this pass runs after the measured one, the overhead of the profiler does not distort the
+        measurements. Its results are not recorded, but the statistics of every test are written
+        to the file "<test>_profile.pstats" in :attr:`artifacts` and stored as a result.
+
+        :param pattern: the glob pattern selecting the tests to profile
+        :returns: True if all profiled tests succeeded, False otherwise
+        """
+        rc = True
+        for test in self.benches():
+            name = test.name or test.attr
+            if not fnmatch.fnmatchcase(test.attr, pattern) and not fnmatch.fnmatchcase(name, pattern):
+                continue
+            self._notify(test.attr)
+            import cProfile
+            profiler = cProfile.Profile()
+            self.recording = False
+            try:
+                rc &= self._run_test(test, profiler)[0]
+            finally:
+                self.recording = True
+            path = self.artifactPath(name + "_profile", ".pstats")
+            profiler.dump_stats(path)
+            self.storeResult(path, name=name + "_profile", type=FILE, unit="path")
+            logger.info("Profile of '%s' written to '%s'", name, path)
+        return rc
+
+    def _probes(self):
+        """Creates the probes enabled in the settings, which measure a test beside its runtime.
+        A probe has the methods start(), stop() and store(bench, name). No probes are used
+        while not recording.
+
+        The setting :code:`"memory": true` enables a :class:`pyperf.memory.MemoryProbe`.
+        With :code:`"memory": {"top": 10}` the top allocation sites are stored in a file.
+        The setting :code:`"resources": true` enables a :class:`pyperf.resources.ResourceProbe`.
+        The setting :code:`"sampling": true` enables a :class:`pyperf.sampler.SamplingProfiler`,
+        which may be configured with :code:`{"interval": 0.001, "mode": "wall"}`.
+        The setting :code:`"gc": "disable"` controls the garbage collector during the test,
+        see :class:`pyperf.environment.GCControl`. It is the first probe, so the collection
+        before the test happens before the other probes start.
+
+        The probes are imported on demand, most of them depend on psutil, which is not worth
+        importing for benches which do not use them.
+        """
+        if not self.recording:
+            return []
+        probes = []
+        if self.settings.get("gc"):
+            from pyperf.environment import GCControl
+            probes.append(GCControl(self.settings["gc"]))
+        memory = self.settings.get("memory")
+        if memory:
+            from pyperf.memory import MemoryProbe
+            probes.append(MemoryProbe(memory.get("top", 0) if isinstance(memory, dict) else 0))
+        if self.settings.get("resources"):
+            from pyperf.resources import ResourceProbe
+            probes.append(ResourceProbe())
+        sampling = self.settings.get("sampling")
+        if sampling:
+            from pyperf.sampler import SamplingProfiler
+            probes.append(SamplingProfiler(**(sampling if isinstance(sampling, dict) else {})))
+        return probes
+
+    def _run_test(self, test, profiler=None):
+        """Runs a single test method framed by setUp and tearDown.
+
+        :param test: the :class:`BenchInfo` of the test method
+        :param profiler: an optional :code:`cProfile.Profile` enabled while the test method runs
+        :returns: a tuple of the success and the runtime of the test method in seconds
+        """
+        # pylint: disable=broad-except
+        rc = True
+        runtime = None
+        lags = None
+        probes = []
+        try:
+            self._call(self.setUp)
+            self._current = test
+            try:
+                probes = self._probes()
+                for probe in probes:
+                    probe.start()
+                if profiler is not None:
+                    profiler.enable()
+                start = timeit.default_timer()
+                result = getattr(self, test.attr)()
+                if aio.isawaitable(result):
+                    lags = self._await(result, monitor=True)[1]
+                runtime = timeit.default_timer() - start
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+                self._current = None
+                name = test.name or test.attr
+                # all probes stop before anything is stored, so no probe measures the
+                # storing of the others, e.g. the file written by the sampler
+                for probe in reversed(probes):
+                    probe.stop()
+                if lags is not None:
+                    self.storeResult(lags, name="%s_loop_lag" % name,
+                                     type="time_series", unit="seconds")
+                for probe in reversed(probes):
+                    probe.store(self, name)
+        except Exception:
+            rc = False
+            logger.exception("Exception while running '%s'",
+                             self.__class__.__name__)
+        finally:
+            try:
+                self._call(self.tearDown)
+            except Exception:
+                rc = False
+                logger.exception("Exception while running tearDown of '%s'",
+                                 self.__class__.__name__)
+        return rc, runtime
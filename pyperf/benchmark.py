@@ -56,6 +56,18 @@ def main():
                         action='store_true', help="Get some more logging.")
     runner.add_argument("-v", "--verbose", default=False,
                         action='store_true', help="Get more detailled system infos.")
+    runner.add_argument("-j", "--jobs", type=int, default=1,
+                        help="Run up to JOBS non-exclusive benches in parallel worker processes "
+                             "(default: 1).")
+    runner.add_argument("-p", "--profile", metavar="GLOB", default=None,
+                        help="Profile the benches or bench methods matching GLOB after measuring them.")
+    runner.add_argument("-r", "--resume", metavar="CHECKPOINT", default=None,
+                        help="Resume an interrupted run from its checkpoint, skipping the completed benches.")
+    runner.add_argument("--no-cache", dest="use_cache", default=True, action="store_false",
+                        help="Run the benches with the setting 'cache' even if their results are cached.")
+    runner.add_argument("--no-sysinfo-cache", dest="use_sysinfo_cache", default=True,
+                        action="store_false",
+                        help="Collect all system infos instead of taking the static ones from the cache.")
 
     upload_parser = subparsers.add_parser("upload")
     upload_parser.add_argument("filename", help="JSON report to upload.")
@@ -80,7 +92,8 @@ def main():
         help="If given, overrides the timestamp given in the report. Valid units are 's' and 'ms'."
     )
     upload_parser.add_argument("--uploadconfig", "-u", nargs="?", default="",
-                               help="A file containing mappings from system metadata to Influx tags to upload.")
+                               help="A file containing mappings from system metadata to Influx tags "
+                                    "to upload.")
     upload_parser.add_argument("--values", help="Additional values to upload.")
     upload_parser.add_argument("--tags", help="Additional tags to upload.")
     upload_parser.add_argument("--logconfig", "-l", nargs='?', default="",
@@ -93,7 +106,9 @@ def main():
     rc = 0
     if subcommand == "run":
         from .benchrunner import Benchrunner
-        return Benchrunner().main(args.suite, args.outfile, args.logconfig, args.verbose, args.debug)
+        return Benchrunner().main(args.suite, args.outfile, args.logconfig, args.verbose, args.debug,
+                                  args.jobs, args.profile, args.resume, args.use_cache,
+                                  args.use_sysinfo_cache)
     elif subcommand == "upload":
         if args.target == "influx":
             try:
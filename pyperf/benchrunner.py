@@ -5,16 +5,35 @@
 # https://www.contact-software.com/
 
 import os
+import re
 import sys
+import json
+import signal
+import fnmatch
+import itertools
 import logging
+import timeit
 
+from six import string_types
+
+from . import environment
 from . import ioservice
 from . import systemInfos
+from . import timer
 from pyperf.log import customlogging
 from pyperf.exceptions import PyperfError
 
 logger = logging.getLogger(__name__)
 
+WORKER_POLL_INTERVAL = 0.1
+WORKER_KILL_GRACE = 1.0
+"""Seconds a terminated worker gets to send the results gathered so far, before it is killed."""
+
+STATUS_TIMEOUT = "timeout"
+
+CHECKPOINT_EXTENSION = ".checkpoint.jsonl"
+"""The checkpoint of a run is written next to the report, with this extension instead of its own."""
+
 
 class Benchrunner(object):
     """The benchrunner runs different benchmarks. These benchmarks inherit from the
@@ -28,7 +47,17 @@ class Benchrunner(object):
 
     results = {'results': {}}
 
-    def main(self, suite, outfile, logconfig="", verbose=False, debug=False):
+    def __init__(self):
+        self.fixtures = {}
+        self.artifacts = ""
+        self.checkpoint = ""
+        self.completed = {}
+        self.cache = None
+        self.use_cache = True
+        self.cache_keys = {}
+
+    def main(self, suite, outfile, logconfig="", verbose=False, debug=False, jobs=1, profile=None,
+             resume=None, use_cache=True, use_sysinfo_cache=True):
         """
         This method is the entry point for the pyperf run subcommand, but may be called by
         importing this module too.
@@ -38,13 +67,30 @@ class Benchrunner(object):
         :param logconfig: the config file for the logging, see :ref:`howto_logging`
         :param verbose: whether the collected system info shall be verbose or not
         :param debug: whether DEBUG logging shall be enabled or not
+        :param jobs: the maximum number of benches to run in parallel worker processes
+        :param profile: a glob pattern selecting the benches to profile after they were measured.
+            It is matched against the names of the suite entries, whose bench methods are all
+            profiled, and against the names of the bench methods.
+        :param resume: the path to the checkpoint of an interrupted run. The entries which
+            completed in it with the same args are not run again, see :meth:`init_checkpoint`.
+        :param use_cache: whether the cached results of the entries with the setting
+            :code:`cache` shall be used, see :meth:`load_cached`. They are cached anyway.
+        :param use_sysinfo_cache: whether the static system infos may be taken from the cache,
+            see :func:`pyperf.systemInfos.getAllSysInfos`
         :return: 0 on success, 1 otherwise
         """
         try:
             customlogging.init_logging(logconfig, debug)
         except PyperfError as e:
             raise
-        self.sys_infos(verbose)
+        self.sys_infos(verbose, use_sysinfo_cache)
+        self.calibrate_timer()
+        self.artifacts = os.path.splitext(outfile)[0] + "_files"
+        try:
+            self.init_checkpoint(os.path.splitext(outfile)[0] + CHECKPOINT_EXTENSION, resume)
+        except PyperfError as e:
+            logger.error("The checkpoint '%s' could not be resumed. %s" % (resume, e.message))
+            return 1
         logger.info("Starting")
         logger.info("Reading the benchsuite '%s'", suite)
         try:
@@ -52,32 +98,398 @@ class Benchrunner(object):
         except PyperfError as e:
             logger.error("The Testsuite '%s' could not be loaded. %s" % (suite, e.message))
         else:
-            # iterating the suite
-            rc_all = True
+            applied = self.apply_environment(data.get("environment") or {})
+            if any(val.get("cache") for val in data["suite"].values()):
+                from . import cache
+                self.cache = cache.ResultCache(os.path.join(os.path.dirname(os.path.abspath(suite)),
+                                                            cache.CACHE_DIRECTORY), self.results['Sysinfos'])
+            self.use_cache = use_cache
+            entries = []
             for bench_key, bench_val in data["suite"].items():
                 if bench_val.get("active", True) is False:
                     logger.info("Bench '%s' is inactive, skipping", bench_key)
                     continue
+                if "gc" in applied and "gc" not in bench_val:
+                    bench_val = dict(bench_val, gc=applied["gc"])
+                if profile:
+                    bench_val = dict(bench_val, profile="*" if fnmatch.fnmatchcase(bench_key, profile)
+                                     else profile)
+                entries.extend(self.expand_matrix(bench_key, bench_val))
 
-                logger.info("Executing bench '%s'", bench_key)
-                rc, results = self.start_bench_script(suite, bench_val["file"],
-                                                      bench_val["className"], bench_val["args"])
-                rc_all &= rc
-                self.results['results'][bench_key] = {'args': bench_val["args"], 'data': results}
+            rc_all = self.run_suite(suite, entries, jobs, logconfig, debug, data.get("fixtures"))
             if ioservice.saveJSONData(self.results, outfile):
                 logger.info("Results saved to %s", outfile)
+                if rc_all:
+                    self.remove_checkpoint()
             return int(not rc_all)
 
-    def start_bench_script(self, suitepath, benchpath, class_name, args):
+    def expand_matrix(self, bench_key, bench_val):
+        """Expands the :code:`matrix` of a suite entry into one entry per point of the cartesian
+        product of its values. The values of a point are added to the args of its entry, and
+        the entry is named after the point, e.g. :code:`sqlite[rows=1000,journal_mode=WAL]`.
+        The parameters are named in the order of the matrix.
+
+        :param bench_key: the name of the suite entry
+        :param bench_val: the suite entry
+        :returns: a list of (name, entry) tuples, only the given entry if it has no matrix
+        """
+        matrix = bench_val.get("matrix")
+        if not matrix:
+            return [(bench_key, bench_val)]
+        params = list(matrix.keys())
+        values = [val if isinstance(val, list) else [val] for val in matrix.values()]
+        entries = []
+        for point in itertools.product(*values):
+            name = "%s[%s]" % (bench_key, ",".join("%s=%s" % (param, _format_param(val))
+                                                   for param, val in zip(params, point)))
+            entry = dict((key, val) for key, val in bench_val.items() if key != "matrix")
+            entry["args"] = dict(bench_val.get("args", {}))
+            entry["args"].update(zip(params, point))
+            entries.append((name, entry))
+        if not entries:
+            logger.warning("The matrix of bench '%s' is empty, skipping", bench_key)
+        return entries
+
+    def run_suite(self, suitepath, entries, jobs=1, logconfig="", debug=False, fixtures=None):
+        """Runs the given suite entries and merges their results into the report in
+        suite order. When more than one job is requested, all entries which are not
+        marked as :code:`exclusive` are run in parallel worker processes first.
+        The exclusive entries are run afterwards one by one in this process, so they
+        have the machine for their own.
+
+        Entries with a :code:`timeout` or :code:`method_timeout` are always run in a
+        supervised worker process, which is killed when the timeout expires. Their
+        result gets the status :code:`timeout` and keeps the results gathered so far.
+
+        The fixtures used by the entries are set up before the first entry using them and
+        torn down after the last one, see :meth:`setup_fixtures`.
+
+        Every entry is appended to the checkpoint when it finished. The entries which
+        completed in a resumed checkpoint are not run, see :meth:`init_checkpoint`, neither
+        are the entries with valid cached results, see :meth:`load_cached`. The latter are
+        marked as :code:`cached` in the report.
+
+        :param suitepath: the path to the benchsuite
+        :param entries: list of (name, entry) tuples of the active benches
+        :param jobs: the maximum number of benches running at the same time
+        :param logconfig: the config file for the logging of the worker processes
+        :param debug: whether DEBUG logging shall be enabled in the worker processes
+        :param fixtures: the dict of fixture definitions of the benchsuite
+        :returns: True if all benches succeeded, False otherwise
+        """
+        outcomes = {}
+        timeouts = {}
+        cached = set()
+        pending = []
+        for bench_key, bench_val in entries:
+            completed = self.completed.get(bench_key)
+            if completed is not None and _same_args(completed["args"], bench_val["args"]):
+                logger.info("Bench '%s' completed before, skipping", bench_key)
+                outcomes[bench_key] = (True, completed["data"])
+                continue
+            results = self.load_cached(suitepath, bench_key, bench_val, fixtures)
+            if results is not None:
+                logger.info("Bench '%s' is unchanged, using its cached results", bench_key)
+                outcomes[bench_key] = (True, results)
+                cached.add(bench_key)
+            else:
+                pending.append((bench_key, bench_val))
+        entries, all_entries = pending, entries
+        self.init_fixtures(fixtures or {}, entries)
+        try:
+            if jobs > 1:
+                parallel = [(bench_key, bench_val) for bench_key, bench_val in entries
+                            if not bench_val.get("exclusive", False)]
+                outcomes.update(self.run_parallel(suitepath, parallel, jobs, logconfig, debug, timeouts))
+
+            for bench_key, bench_val in entries:
+                if bench_key in outcomes:
+                    continue
+                if _is_supervised(bench_val):
+                    outcomes.update(self.run_parallel(suitepath, [(bench_key, bench_val)], 1,
+                                                      logconfig, debug, timeouts))
+                    continue
+                bench_fixtures = self.setup_fixtures(suitepath, bench_key, bench_val)
+                if bench_fixtures is None:
+                    outcomes[bench_key] = (False, {})
+                    self.finish_entry(bench_key, bench_val, outcomes[bench_key])
+                    continue
+                logger.info("Executing bench '%s'", bench_key)
+                try:
+                    outcomes[bench_key] = self.start_bench_script(suitepath, bench_val["file"],
+                                                                  bench_val["className"], bench_val["args"],
+                                                                  bench_val, fixtures=bench_fixtures,
+                                                                  artifacts=self.artifact_dir(bench_key))
+                finally:
+                    self.release_fixtures(bench_val)
+                self.finish_entry(bench_key, bench_val, outcomes[bench_key])
+        finally:
+            self.teardown_fixtures()
+
+        rc_all = True
+        for bench_key, bench_val in all_entries:
+            rc, results = outcomes[bench_key]
+            rc_all &= rc
+            self.results['results'][bench_key] = {'args': bench_val["args"], 'data': results}
+            if bench_key in timeouts:
+                self.results['results'][bench_key]['status'] = STATUS_TIMEOUT
+                self.results['results'][bench_key]['timeout'] = timeouts[bench_key]
+            if bench_key in cached:
+                self.results['results'][bench_key]['cached'] = True
+        return rc_all
+
+    def run_parallel(self, suitepath, entries, jobs, logconfig="", debug=False, timeouts=None):
+        """Runs the given suite entries in worker processes. At most `jobs` workers
+        are alive at the same time. Every worker runs exactly one bench and reports
+        its progress and finally its result back through a pipe.
+
+        A worker is killed when its entry runs longer than its :code:`timeout` or one of
+        its bench methods runs longer than the :code:`method_timeout`. The results
+        gathered until then are kept.
+
+        :param suitepath: the path to the benchsuite
+        :param entries: list of (name, entry) tuples to run
+        :param jobs: the maximum number of worker processes
+        :param logconfig: the config file for the logging of the worker processes
+        :param debug: whether DEBUG logging shall be enabled in the worker processes
+        :param timeouts: an optional dict, which is filled with a description of the
+            expired timeout for every bench which was killed
+        :returns: a dict mapping the bench names to their (rc, results) tuples
+        """
+        pending = list(entries)
+        running = {}
+        outcomes = {}
+        while pending or running:
+            while pending and len(running) < jobs:
+                bench_key, bench_val = pending.pop(0)
+                bench_fixtures = self.setup_fixtures(suitepath, bench_key, bench_val)
+                if bench_fixtures is None:
+                    outcomes[bench_key] = (False, {})
+                    self.finish_entry(bench_key, bench_val, outcomes[bench_key])
+                    continue
+                logger.info("Executing bench '%s' in a worker process", bench_key)
+                running[bench_key] = _Worker(suitepath, bench_key, bench_val, bench_fixtures,
+                                             self.artifact_dir(bench_key), logconfig, debug)
+
+            for bench_key, worker in list(running.items()):
+                outcome = worker.poll(WORKER_POLL_INTERVAL / len(running))
+                expired = None
+                if outcome is None:
+                    expired = worker.expired()
+                    if expired is None:
+                        continue
+                    logger.error("Bench '%s' exceeded the timeout of %ss%s, killing it", bench_key,
+                                 expired["seconds"],
+                                 " in '%s'" % expired["method"] if expired["method"] else "")
+                    outcome = worker.kill()
+                    if timeouts is not None:
+                        timeouts[bench_key] = expired
+                outcomes[bench_key] = outcome
+                self.finish_entry(bench_key, worker.bench_val, outcome, expired)
+                worker.close()
+                del running[bench_key]
+                self.release_fixtures(worker.bench_val)
+        return outcomes
+
+    def init_checkpoint(self, checkpoint, resume=None):
+        """Prepares the checkpoint, to which every suite entry is appended as soon as it
+        finished, see :meth:`save_checkpoint`. A crashed run can be resumed from it.
+
+        :param checkpoint: the path of the checkpoint of this run, it is truncated
+        :param resume: the path of the checkpoint of an interrupted run. The entries which
+            completed successfully in it are not run again if their args did not change,
+            their results are taken from it. The checkpoint is continued.
+        :raises PyperfError: if the checkpoint to resume cannot be read
+        """
+        self.completed = {}
+        if resume:
+            for line in ioservice.loadJSONLines(resume):
+                if line.get("rc") and "timeout" not in line:
+                    self.completed[line["name"]] = line
+                else:
+                    self.completed.pop(line.get("name"), None)
+            logger.info("Resuming '%s', %d benches completed", resume, len(self.completed))
+            self.checkpoint = resume
+        else:
+            self.checkpoint = checkpoint
+            if os.path.exists(checkpoint):
+                os.remove(checkpoint)
+
+    def remove_checkpoint(self):
+        """Removes the checkpoint of a run which succeeded and whose report was saved, so it
+        does not keep a second copy of the results. The checkpoint of a failed run is kept to
+        resume it.
+        """
+        if self.checkpoint and os.path.exists(self.checkpoint):
+            os.remove(self.checkpoint)
+
+    def load_cached(self, suitepath, bench_key, bench_val, fixtures=None):
+        """Returns the cached results of a suite entry with the setting :code:`"cache": true`
+        (or :code:`{"max_age": <seconds>}`), see :mod:`pyperf.cache`. The key of the entry is
+        remembered, so its results are cached when it finished.
+
+        :param suitepath: the path to the benchsuite
+        :param bench_key: the name of the suite entry
+        :param bench_val: the suite entry
+        :param fixtures: the dict of fixture definitions of the benchsuite, the definitions
+            and modules of the fixtures the entry uses are part of its key
+        :returns: the results, None if the entry is not cached, its results are outdated or the
+            cache shall not be used
+        """
+        if self.cache is None:
+            return None
+        from . import cache
+        max_age = cache.max_age(bench_val.get("cache"))
+        if max_age is None:
+            return None
+        used = {}
+        for name in bench_val.get("fixtures", []):
+            definition = (fixtures or {}).get(name)
+            if definition is None:
+                return None
+            used[name] = (self.normalize_bench_path(suitepath, definition["file"]), definition)
+        key = self.cache.key(self.normalize_bench_path(suitepath, bench_val["file"]), bench_val,
+                             used)
+        if key is None:
+            return None
+        self.cache_keys[bench_key] = key
+        return self.cache.load(key, max_age) if self.use_cache else None
+
+    def finish_entry(self, bench_key, bench_val, outcome, expired=None):
+        """Saves the outcome of a finished suite entry to the checkpoint and, if it succeeded,
+        to the cache.
+
+        :param bench_key: the name of the suite entry
+        :param bench_val: the suite entry
+        :param outcome: the (rc, results) tuple of the entry
+        :param expired: the description of the expired timeout, if the entry was killed
+        """
+        self.save_checkpoint(bench_key, bench_val, outcome, expired)
+        key = self.cache_keys.get(bench_key)
+        if key is not None and outcome[0] and expired is None:
+            self.cache.store(key, outcome[1])
+
+    def save_checkpoint(self, bench_key, bench_val, outcome, expired=None):
+        """Appends the outcome of a suite entry to the checkpoint. The line is flushed to the
+        disk, so it survives a crash of the runner.
+
+        :param bench_key: the name of the suite entry
+        :param bench_val: the suite entry
+        :param outcome: the (rc, results) tuple of the entry
+        :param expired: the description of the expired timeout, if the entry was killed
+        """
+        if not self.checkpoint:
+            return
+        line = {"name": bench_key, "args": bench_val["args"], "rc": outcome[0], "data": outcome[1]}
+        if expired is not None:
+            line["timeout"] = expired
+        try:
+            ioservice.appendJSONLine(line, self.checkpoint)
+        except PyperfError as e:
+            logger.error("Bench '%s' could not be saved to the checkpoint. %s", bench_key, e.message)
+
+    def artifact_dir(self, bench_key):
+        """Returns the directory for the files written by the bench of a suite entry,
+        see :meth:`pyperf.bench.Bench.storeFile`. It is located in the directory
+        "<report>_files" next to the report.
+        """
+        if not self.artifacts:
+            return ""
+        return os.path.join(self.artifacts, re.sub(r"[^\w.,=\[\]-]", "_", bench_key))
+
+    def init_fixtures(self, definitions, entries):
+        """Prepares the fixtures of the benchsuite. Every fixture is counted with the
+        number of entries using it, so it can be torn down after the last one.
+
+        :param definitions: the dict of fixture definitions of the benchsuite
+        :param entries: list of (name, entry) tuples of the active benches
+        """
+        self.fixtures = {}
+        for name, definition in definitions.items():
+            users = sum(1 for _, bench_val in entries if name in bench_val.get("fixtures", []))
+            if users:
+                self.fixtures[name] = _SuiteFixture(definition, users)
+
+    def setup_fixtures(self, suitepath, bench_key, bench_val):
+        """Sets up the fixtures used by the suite entry, which are not set up yet. The time
+        needed for the setup is reported in the :code:`fixtures` of the report.
+
+        :returns: a dict mapping the fixture names to their values, None if a fixture
+            is unknown or could not be set up. Then the entry has released its fixtures, see
+            :meth:`release_fixtures`, since it will not run.
+        """
+        values = {}
+        for name in bench_val.get("fixtures", []):
+            fixture = self.fixtures.get(name)
+            if fixture is None:
+                logger.error("Bench '%s' uses the unknown fixture '%s'", bench_key, name)
+                self.release_fixtures(bench_val)
+                return None
+            if not fixture.ready and not fixture.failed:
+                logger.info("Setting up fixture '%s'", name)
+                fixture.setup(self, suitepath)
+                self.results.setdefault('fixtures', {})[name] = {'setup': fixture.setup_time}
+            if fixture.failed:
+                logger.error("Bench '%s' cannot run without the fixture '%s'", bench_key, name)
+                self.release_fixtures(bench_val)
+                return None
+            values[name] = fixture.value
+        return values
+
+    def release_fixtures(self, bench_val):
+        """Marks the fixtures of the suite entry as no longer used by it. A fixture
+        is torn down after its last user.
+        """
+        for name in bench_val.get("fixtures", []):
+            fixture = self.fixtures.get(name)
+            if fixture is not None:
+                fixture.users -= 1
+                if fixture.users <= 0:
+                    self._teardown_fixture(name, fixture)
+
+    def teardown_fixtures(self):
+        """Tears down all fixtures which are still set up."""
+        for name, fixture in self.fixtures.items():
+            self._teardown_fixture(name, fixture)
+
+    def _teardown_fixture(self, name, fixture):
+        if fixture.ready:
+            logger.info("Tearing down fixture '%s'", name)
+            fixture.teardown()
+            self.results['fixtures'][name]['teardown'] = fixture.teardown_time
+
+    def start_bench_script(self, suitepath, benchpath, class_name, args, settings=None, progress=None,
+                           fixtures=None, artifacts=""):
         """This function imports the bench module and creates an instance of the given
-        class_name. It calls the method run(args) which is the entry point for
+        class_name. It calls the method run(args, settings) which is the entry point for
         the test classes. Returns the result of the bench.
 
         :param path: path to the module of the benchmark
         :param class_name: name of the benchmark
         :param args: serveral arguments for the benchmark
+        :param settings: the settings of the suite entry, e.g. the warmup
+        :param progress: an optional callable, see :attr:`pyperf.bench.Bench.progress`
+        :param fixtures: the dict of fixture values the bench uses
+        :param artifacts: the directory for the files written by the bench
         :returns: the dict with measurements of the benchmark.
         """
+        bench_class = self.load_class(suitepath, benchpath, class_name)
+
+        # perform the benchmark
+        bench = bench_class()
+        bench.progress = progress
+        bench.fixtures = fixtures or {}
+        bench.artifacts = artifacts
+        return bench.run(args, settings)
+
+    def load_class(self, suitepath, benchpath, class_name):
+        """Imports the module of a bench or fixture and returns the class `class_name`.
+
+        :param suitepath: path to the benchsuite file
+        :param benchpath: path to the module, relative to the benchsuite
+        :param class_name: name of the class
+        :returns: the class
+        """
         prevSysPath = sys.path
         try:
             benchpath = self.normalize_bench_path(suitepath, benchpath)
@@ -103,15 +515,36 @@ class Benchrunner(object):
             raise
         finally:
             sys.path = prevSysPath
+        return bench_class
 
-        # perform the benchmark
-        return bench_class().run(args)
-
-    def sys_infos(self, verbose):
+    def sys_infos(self, verbose, use_cache=True):
         """Detect several system information. These information will be saved later
-        with the results of the benchmarks.
+        with the results of the benchmarks. Unless use_cache is set, the static system
+        information is collected again and neither read from nor written to the cache.
         """
-        self.results['Sysinfos'] = systemInfos.getAllSysInfos(verbose)
+        ttl = systemInfos.CACHE_TTL if use_cache else 0
+        self.results['Sysinfos'] = systemInfos.getAllSysInfos(verbose, ttl=ttl)
+
+    def apply_environment(self, settings):
+        """Applies the :code:`environment` of the benchsuite to this process before the benches
+        are run, see :mod:`pyperf.environment`. The worker processes inherit it. The settings
+        actually applied are recorded in the Sysinfos, e.g. as "env_affinity".
+
+        :param settings: the environment of the benchsuite
+        :returns: a dict with the applied settings
+        """
+        applied = environment.apply_environment(settings)
+        if applied:
+            logger.debug("Applied the environment %s", applied)
+        self.results['Sysinfos'].update(environment.sysinfos(applied))
+        return applied
+
+    def calibrate_timer(self):
+        """Measures the overhead of the timer, see :func:`pyperf.timer.calibrate`, and stores
+        it in the report. The benches use it to correct their measurements.
+        """
+        self.results['timer'] = timer.calibration()
+        logger.debug("Timer overhead: %(min_ns)d ns (min), %(median_ns)d ns (median)", self.results['timer'])
 
     def normalize_bench_path(self, suitepath, benchpath):
         """
@@ -132,3 +565,202 @@ class Benchrunner(object):
             path = os.path.join(os.getcwd(), os.path.dirname(suitepath), benchpath)
 
         return os.path.normpath(path)
+
+
+def _format_param(value):
+    """Formats a matrix value for the name of an entry. Strings are used as they are,
+    all other values in their JSON notation.
+    """
+    if isinstance(value, string_types):
+        return value
+    return json.dumps(value, sort_keys=True)
+
+
+def _is_supervised(bench_val):
+    """Returns True if the suite entry has to run in a worker process, which can be killed."""
+    return bench_val.get("timeout") is not None or bench_val.get("method_timeout") is not None
+
+
+def _same_args(args, other):
+    """Compares the args of suite entries regardless of the order of their keys, the
+    checkpoint is written with sorted keys."""
+    return json.dumps(args, sort_keys=True) == json.dumps(other, sort_keys=True)
+
+
+class _SuiteFixture(object):
+    """A fixture of the benchsuite with the number of entries still going to use it."""
+    def __init__(self, definition, users):
+        self.definition = definition
+        self.users = users
+        self.instance = None
+        self.value = None
+        self.ready = False
+        self.failed = False
+        self.setup_time = None
+        self.teardown_time = None
+
+    def setup(self, runner, suitepath):
+        # pylint: disable=broad-except
+        try:
+            fixture_class = runner.load_class(suitepath, self.definition["file"],
+                                              self.definition["className"])
+            self.instance = fixture_class()
+            self.instance.args = self.definition.get("args", {})
+            start = timeit.default_timer()
+            self.value = self.instance.setUp()
+            self.setup_time = timeit.default_timer() - start
+            self.ready = True
+        except Exception:
+            logger.exception("Exception while setting up the fixture '%s'",
+                             self.definition.get("className"))
+            self.failed = True
+
+    def teardown(self):
+        # pylint: disable=broad-except
+        self.ready = False
+        start = timeit.default_timer()
+        try:
+            self.instance.tearDown()
+        except Exception:
+            logger.exception("Exception while tearing down the fixture '%s'",
+                             self.definition.get("className"))
+        self.teardown_time = timeit.default_timer() - start
+        self.value = None
+
+
+class _Worker(object):
+    """Supervises a worker process running a single bench. The worker sends the
+    messages ("progress", (method, results)) before each bench method and finally
+    ("done", (rc, results)), or ("timeout", results) when it was terminated.
+    """
+    def __init__(self, suitepath, bench_key, bench_val, fixtures, artifacts, logconfig, debug):
+        self.bench_key = bench_key
+        self.bench_val = bench_val
+        self.timeout = bench_val.get("timeout")
+        self.method_timeout = bench_val.get("method_timeout")
+        self.method = None
+        self.results = {}
+        self.terminated = False
+        import multiprocessing
+        self.reader, writer = multiprocessing.Pipe(duplex=False)
+        self.proc = multiprocessing.Process(target=_bench_worker,
+                                            args=(writer, suitepath, bench_val, fixtures, artifacts,
+                                                  logconfig, debug),
+                                            name="pyperf-%s" % bench_key)
+        self.proc.start()
+        writer.close()
+        self.started = self.method_started = timeit.default_timer()
+
+    def poll(self, timeout):
+        """Receives the messages of the worker for at most `timeout` seconds.
+
+        :returns: the (rc, results) tuple if the worker is finished, None otherwise
+        """
+        while self.reader.poll(timeout):
+            try:
+                kind, payload = self.reader.recv()
+            except EOFError:
+                if not self.terminated:
+                    logger.error("The worker of bench '%s' terminated without results", self.bench_key)
+                return False, self.results
+            if kind == "progress":
+                self.method, self.results = payload
+                self.method_started = timeit.default_timer()
+            elif kind == "timeout":
+                return False, payload
+            else:
+                return payload
+            timeout = 0
+        if not self.proc.is_alive() and not self.reader.poll():
+            if self.terminated:
+                return False, self.results
+            logger.error("The worker of bench '%s' died with exit code %s",
+                         self.bench_key, self.proc.exitcode)
+            return False, self.results
+        return None
+
+    def _method_timeout(self):
+        if isinstance(self.method_timeout, dict):
+            return self.method_timeout.get(self.method)
+        return self.method_timeout
+
+    def expired(self):
+        """Checks the timeouts of the bench and of the running bench method.
+
+        :returns: a dict describing the expired timeout or None
+        """
+        now = timeit.default_timer()
+        if self.timeout is not None and now - self.started > self.timeout:
+            return {"method": None, "seconds": self.timeout}
+        method_timeout = self._method_timeout()
+        if self.method is not None and method_timeout is not None and \
+           now - self.method_started > method_timeout:
+            return {"method": self.method, "seconds": method_timeout}
+        return None
+
+    def kill(self):
+        """Terminates the worker. It gets :data:`WORKER_KILL_GRACE` seconds to send the
+        results gathered so far, then it is killed.
+
+        :returns: the (False, results) tuple with the results gathered so far
+        """
+        self.terminated = True
+        self.proc.terminate()
+        outcome = self.poll(WORKER_KILL_GRACE)
+        if self.proc.is_alive():
+            if hasattr(signal, "SIGKILL"):
+                os.kill(self.proc.pid, signal.SIGKILL)
+            else:
+                self.proc.terminate()
+        return False, (outcome or (False, self.results))[1]
+
+    def close(self):
+        self.proc.join()
+        self.reader.close()
+
+
+def _bench_worker(conn, suitepath, bench_val, fixtures, artifacts, logconfig, debug):
+    """Entry point of the worker processes started by :meth:`Benchrunner.run_parallel`.
+    Runs a single bench and sends its progress and its (rc, results) tuple through `conn`.
+    When the worker is terminated because of a timeout, it sends the results gathered so far.
+    Forked workers share the fixtures with the runner, spawned workers get a pickled copy.
+    """
+    # pylint: disable=broad-except
+    if not logging.root.handlers:
+        # spawned (not forked) workers do not inherit the logging setup
+        customlogging.init_logging(logconfig, debug)
+
+    state = {"results": {}, "sending": False, "terminated": False}
+
+    def timeout():
+        conn.send(("timeout", state["results"]))
+        conn.close()
+        os._exit(1)
+
+    def progress(method, results):
+        state["results"] = results
+        state["sending"] = True
+        conn.send(("progress", (method, results)))
+        state["sending"] = False
+        if state["terminated"]:
+            timeout()
+
+    def on_terminate(signum, frame):
+        # do not interleave two messages on the pipe
+        if state["sending"]:
+            state["terminated"] = True
+        else:
+            timeout()
+
+    if hasattr(signal, "SIGTERM"):
+        signal.signal(signal.SIGTERM, on_terminate)
+    try:
+        outcome = Benchrunner().start_bench_script(suitepath, bench_val["file"],
+                                                   bench_val["className"], bench_val["args"],
+                                                   bench_val, progress, fixtures, artifacts)
+    except Exception:
+        outcome = (False, {})
+    if hasattr(signal, "SIGTERM"):
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    conn.send(("done", outcome))
+    conn.close()
@@ -0,0 +1,147 @@
+# -*- mode: python; coding: utf-8 -*-
+#
+# Copyright (C) 1990 - 2019 CONTACT Software GmbH
+# All rights reserved.
+# https://www.contact-software.com/
+
+"""A content-addressed cache of the results of suite entries.
+
+The results of an entry with the setting :code:`"cache"` are stored under a key hashing
+everything they depend on: the source of the bench module, the entry itself (its args and
+settings), the definitions and sources of the fixtures it uses, the
+:data:`FINGERPRINT_SYSINFOS` of the machine and the interpreter. As long as none
+of them changed and the results are younger than the max age, the entry is not run again.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import platform
+import sys
+import time
+
+from pyperf import ioservice
+from pyperf.exceptions import PyperfError
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIRECTORY = ".pyperf_cache"
+"""The directory of the cache, relative to the benchsuite."""
+
+MAX_AGE_DEFAULT = 7 * 24 * 3600
+"""The default maximum age of cached results in seconds."""
+
+FINGERPRINT_SYSINFOS = ("cpu", "cpu_cores_logical", "cpu_cores_physical", "mem_total", "os",
+                        "os_version", "vm", "ce_version", "dbms_driver", "dbms_version")
+"""The Sysinfos which invalidate the cached results when they change, beside the settings of
+the environment ("env_*")."""
+
+IGNORED_SETTINGS = ("active", "cache")
+"""The settings of an entry which do not influence its results."""
+
+
+def fingerprint(sysinfos):
+    """Returns the Sysinfos and properties of the interpreter the results depend on."""
+    result = dict((key, value) for key, value in sysinfos.items()
+                  if key in FINGERPRINT_SYSINFOS or key.startswith("env_"))
+    result["python"] = sys.version
+    result["python_implementation"] = platform.python_implementation()
+    result["python_executable"] = sys.executable
+    return result
+
+
+def max_age(setting):
+    """Returns the max age in seconds of the :code:`"cache"` setting of an entry, which is
+    either true or :code:`{"max_age": <seconds>}`, or None if it is not cached.
+    """
+    if not setting:
+        return None
+    if isinstance(setting, dict):
+        return setting.get("max_age", MAX_AGE_DEFAULT)
+    return MAX_AGE_DEFAULT
+
+
+class ResultCache(object):
+    """
+    Stores the results of suite entries in files named after their key.
+
+    :param directory: the directory of the cache, it is created on demand
+    :param sysinfos: the Sysinfos of this run
+    """
+    def __init__(self, directory, sysinfos):
+        self.directory = directory
+        self.fingerprint = fingerprint(sysinfos)
+
+    def key(self, benchpath, bench_val, fixtures=None):
+        """
+        Returns the key of the results of a suite entry.
+
+        :param benchpath: the absolute path of the bench module
+        :param bench_val: the suite entry
+        :param fixtures: a dict mapping the names of the fixtures the entry uses to the
+            absolute path of their module and their definition in the benchsuite
+        :returns: the hex digest, None if the source of a module cannot be read
+        """
+        source = _read_source(benchpath)
+        if source is None:
+            return None
+        digest = hashlib.sha256(source)
+        definitions = {}
+        for name, (path, definition) in sorted((fixtures or {}).items()):
+            source = _read_source(path)
+            if source is None:
+                return None
+            digest.update(source)
+            definitions[name] = definition
+        settings = dict((key, value) for key, value in bench_val.items() if key not in IGNORED_SETTINGS)
+        digest.update(json.dumps([settings, definitions, self.fingerprint],
+                                 sort_keys=True).encode("utf-8"))
+        return digest.hexdigest()
+
+    def path(self, key):
+        """Returns the path of the file of the key."""
+        return os.path.join(self.directory, key + ".json")
+
+    def load(self, key, max_age):
+        """
+        Returns the results cached for the key.
+
+        :param key: the key, see :meth:`key`
+        :param max_age: the maximum age of the results in seconds
+        :returns: the results, None if there are none or they are older than max_age
+        """
+        path = self.path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            cached = ioservice.loadJSONData(path)
+        except PyperfError as e:
+            logger.warning("Ignoring the cached results '%s'. %s", path, e.message)
+            return None
+        age = time.time() - cached.get("time", 0)
+        if age > max_age:
+            logger.debug("The cached results '%s' are %ds old, ignoring them", path, age)
+            return None
+        return cached["data"]
+
+    def store(self, key, results):
+        """Caches the results under the key."""
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        try:
+            ioservice.saveJSONData({"time": time.time(), "data": results}, self.path(key))
+        except PyperfError as e:
+            logger.warning("The results could not be cached. %s", e.message)
+
+
+def _read_source(path):
+    """Returns the source of a module, None if it cannot be read."""
+    if not os.path.splitext(path)[1]:
+        path += ".py"
+    try:
+        with open(path, "rb") as fd:
+            return fd.read()
+    except IOError as e:
+        logger.debug("The results depending on '%s' cannot be cached: %s", path, e)
+        return None
@@ -0,0 +1,134 @@
+# -*- mode: python; coding: utf-8 -*-
+#
+# Copyright (C) 1990 - 2019 CONTACT Software GmbH
+# All rights reserved.
+# https://www.contact-software.com/
+
+"""Control of the environment the benches are measured in.
+
+The :code:`environment` of a benchsuite reduces the jitter caused by the operating system and
+the interpreter:
+
+* :code:`"affinity": [2, 3]` pins the bench processes to the given CPUs, so the scheduler does
+  not move them between cores.
+* :code:`"nice": 10` sets the scheduling priority and :code:`"ionice": 0` the I/O priority
+  (best effort class, 0 is the highest) of the bench processes (Linux only).
+* :code:`"hashseed": 0` sets :code:`PYTHONHASHSEED` for the subprocesses started by the benches.
+* :code:`"gc": "disable"` (or :code:`"collect"`, :code:`"freeze"`) controls the cyclic garbage
+  collector around the measured regions, see :class:`GCControl`.
+
+The settings are applied by the benchrunner once, before the first bench, and are inherited by
+the worker processes. The settings actually applied are recorded in the Sysinfos of the report.
+"""
+
+import gc
+import logging
+import os
+import sys
+
+import psutil
+
+logger = logging.getLogger(__name__)
+
+GC_COLLECT = "collect"
+GC_DISABLE = "disable"
+GC_FREEZE = "freeze"
+
+SYSINFO_PREFIX = "env_"
+"""The prefix of the Sysinfos recording the applied settings."""
+
+
+def apply_environment(settings):
+    """
+    Applies the process wide settings of the environment to this process. Settings which
+    cannot be applied, e.g. for lack of privileges, are skipped with a warning.
+
+    :param settings: the :code:`environment` of the benchsuite
+    :returns: a dict with the settings actually applied, read back from the system where possible
+    """
+    applied = {}
+    process = psutil.Process()
+    affinity = settings.get("affinity")
+    if affinity is not None:
+        try:
+            if hasattr(os, "sched_setaffinity"):
+                os.sched_setaffinity(0, affinity)
+                applied["affinity"] = sorted(os.sched_getaffinity(0))
+            else:
+                process.cpu_affinity(list(affinity))
+                applied["affinity"] = sorted(process.cpu_affinity())
+        except (OSError, ValueError, AttributeError, psutil.Error) as e:
+            logger.warning("Cannot pin the benches to the CPUs %s: %s", affinity, e)
+    nice = settings.get("nice")
+    if nice is not None:
+        try:
+            process.nice(nice)
+            applied["nice"] = process.nice()
+        except (OSError, ValueError, psutil.Error) as e:
+            logger.warning("Cannot set the priority of the benches to %s: %s", nice, e)
+    ionice = settings.get("ionice")
+    if ionice is not None:
+        try:
+            process.ionice(psutil.IOPRIO_CLASS_BE, ionice)
+            applied["ionice"] = process.ionice().value
+        except (OSError, ValueError, AttributeError, psutil.Error) as e:
+            logger.warning("Cannot set the I/O priority of the benches to %s: %s", ionice, e)
+    hashseed = settings.get("hashseed")
+    if hashseed is not None:
+        os.environ["PYTHONHASHSEED"] = str(hashseed)
+        applied["hashseed"] = os.environ["PYTHONHASHSEED"]
+    if settings.get("gc"):
+        try:
+            applied["gc"] = GCControl(settings["gc"]).mode
+        except ValueError as e:
+            logger.warning("Cannot control the gc of the benches: %s", e)
+    return applied
+
+
+def sysinfos(applied):
+    """Returns the applied settings as Sysinfos, e.g. "env_affinity"."""
+    return dict((SYSINFO_PREFIX + key, value) for key, value in applied.items())
+
+
+class GCControl(object):
+    """
+    Controls the cyclic garbage collector around a measured region, so collections of garbage
+    left by other code do not fall into it. It is used like a probe of a bench method, see
+    :meth:`pyperf.bench.Bench._probes`.
+
+    :param mode: :data:`GC_COLLECT` collects the garbage before the region.
+        :data:`GC_DISABLE` collects it, too, and disables the collector during the region.
+        :data:`GC_FREEZE` additionally moves all objects to the permanent generation
+        (:code:`gc.freeze`, Python 3.7+), so they are not traversed if the region collects
+        explicitly; without :code:`gc.freeze` it falls back to :data:`GC_DISABLE`.
+    """
+    def __init__(self, mode):
+        if mode not in (GC_COLLECT, GC_DISABLE, GC_FREEZE):
+            raise ValueError("Unknown gc mode '%s'" % mode)
+        if mode == GC_FREEZE and not hasattr(gc, "freeze"):
+            logger.debug("gc.freeze is not available in Python %s, disabling the gc instead",
+                         sys.version.split()[0])
+            mode = GC_DISABLE
+        self.mode = mode
+        self._enabled = None
+
+    def start(self):
+        """Collects the garbage and disables or freezes the collector."""
+        gc.collect()
+        if self.mode == GC_COLLECT:
+            return
+        self._enabled = gc.isenabled()
+        gc.disable()
+        if self.mode == GC_FREEZE:
+            gc.freeze()
+
+    def stop(self):
+        """Restores the collector."""
+        if self.mode == GC_FREEZE:
+            gc.unfreeze()
+        if self._enabled:
+            gc.enable()
+        self._enabled = None
+
+    def store(self, bench, name):
+        """Stores nothing, the mode is recorded in the Sysinfos."""
@@ -0,0 +1,29 @@
+# -*- mode: python; coding: utf-8 -*-
+#
+# Copyright (C) 1990 - 2019 CONTACT Software GmbH
+# All rights reserved.
+# https://www.contact-software.com/
+
+"""Fixtures shared by the benches of a benchsuite.
+
+A fixture is declared once in the :code:`fixtures` of the benchsuite and used by every suite
+entry listing its name. The benchrunner sets it up before the first bench using it and tears
+it down after the last one, so expensive preparations are not repeated for every bench.
+"""
+
+
+class Fixture(object):
+    """'Fixture' is the base class for resources shared by several benches of a suite.
+    """
+    args = {}
+    """This dict contains the arguments of the fixture, as defined in the benchsuite."""
+
+    def setUp(self):
+        """Prepares the shared resource. Its return value is handed to the benches in
+        :attr:`pyperf.bench.Bench.fixtures`.
+        """
+        return None
+
+    def tearDown(self):
+        """Releases the shared resource after the last bench using it."""
+        pass
@@ -0,0 +1,144 @@
+# -*- mode: python; coding: utf-8 -*-
+#
+# Copyright (C) 1990 - 2019 CONTACT Software GmbH
+# All rights reserved.
+# https://www.contact-software.com/
+
+"""Streaming statistics for an unbounded number of samples.
+
+A :class:`Histogram` keeps the count, mean and variance (Welford's algorithm), the extrema
+and log-bucketed counts of the samples. Updating it costs O(1) per sample and its size only
+depends on the range of the samples, not on their number. Similar to an HDR histogram, every
+percentile is exact up to the relative precision of the buckets.
+"""
+
+import math
+
+HISTOGRAM = "histogram"
+"""The result type of results stored as :class:`Histogram`."""
+
+PRECISION_DEFAULT = 0.01
+LOWEST_DEFAULT = 1e-9
+
+
+class Histogram(object):
+    """
+    Log-bucketed histogram of non-negative samples. Bucket `i` > 0 holds the samples in
+    (lowest * (1 + precision) ** (i - 1), lowest * (1 + precision) ** i], bucket 0 holds the
+    samples up to `lowest`.
+
+    :param precision: the relative width of the buckets, i.e. the relative error of the percentiles
+    :param lowest: the smallest value that is distinguished from zero, e.g. one nanosecond
+        for samples in seconds
+    """
+    def __init__(self, precision=PRECISION_DEFAULT, lowest=LOWEST_DEFAULT):
+        self.precision = precision
+        self.lowest = lowest
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+        self.buckets = {}
+        self._log_base = math.log1p(precision)
+
+    def add(self, value):
+        """Adds a sample to the histogram."""
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        index = self._index(value)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+
+    append = add
+
+    def _index(self, value):
+        if value <= self.lowest:
+            return 0
+        return int(math.ceil(math.log(value / self.lowest) / self._log_base))
+
+    def _upper_bound(self, index):
+        return self.lowest * math.exp(index * self._log_base)
+
+    @property
+    def variance(self):
+        """The sample variance, 0.0 for less than two samples."""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def stdev(self):
+        """The sample standard deviation, 0.0 for less than two samples."""
+        return math.sqrt(self.variance)
+
+    def percentile(self, p):
+        """
+        Returns the p-th percentile of the samples, exact up to the precision of the histogram.
+
+        :param p: the percentile in the range [0, 100]
+        :returns: the percentile or None if the histogram is empty
+        """
+        if not self.count:
+            return None
+        if p <= 0:
+            return self.min
+        rank = max(1, int(math.ceil(p * self.count / 100.0)))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(max(self._upper_bound(index), self.min), self.max)
+        return self.max
+
+    def merge(self, other):
+        """
+        Adds the samples of another histogram with the same precision and lowest value.
+
+        :param other: the histogram to merge into this one
+        :raises ValueError: when the histograms have different bucket layouts
+        """
+        if (other.precision, other.lowest) != (self.precision, self.lowest):
+            raise ValueError("Cannot merge histograms with different precision or lowest value")
+        if not other.count:
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.mean += delta * other.count / count
+        self.count = count
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        for index, n in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + n
+
+    def to_dict(self):
+        """Returns the histogram as JSON serializable dict."""
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "m2": self.m2,
+            "min": self.min,
+            "max": self.max,
+            "precision": self.precision,
+            "lowest": self.lowest,
+            "buckets": dict((str(index), n) for index, n in self.buckets.items())
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Creates a histogram from a dict returned by :meth:`to_dict`."""
+        hist = cls(data["precision"], data["lowest"])
+        hist.count = data["count"]
+        hist.mean = data["mean"]
+        hist.m2 = data["m2"]
+        hist.min = data["min"]
+        hist.max = data["max"]
+        hist.buckets = dict((int(index), n) for index, n in data["buckets"].items())
+        return hist
+
+    def __len__(self):
+        return self.count
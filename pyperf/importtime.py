@@ -0,0 +1,89 @@
+# -*- mode: python; coding: utf-8 -*-
+#
+# Copyright (C) 1990 - 2019 CONTACT Software GmbH
+# All rights reserved.
+# https://www.contact-software.com/
+
+"""Measurement of the time a fresh interpreter spends importing modules.
+
+With :code:`python -X importtime` (Python 3.7+) the interpreter writes a line per imported
+module to stderr, with the microseconds spent in the module itself and including the modules
+it imported, indented by the nesting level::
+
+    import time: self [us] | cumulative | imported package
+    import time:      1042 |       1042 |     psutil._common
+    import time:      5278 |      21538 | pyperf.bench
+
+:func:`measure_imports` starts an interpreter importing the given modules and parses its
+output with :func:`parse_importtime`. The benchmark "pyperf" uses it to check that starting
+the command line stays within an import budget.
+"""
+
+import collections
+import re
+import subprocess
+import sys
+
+from pyperf.exceptions import PyperfError
+
+IMPORTTIME_PATTERN = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)\s*$")
+"""A line of the output of :code:`-X importtime`, the header does not match."""
+
+ImportTime = collections.namedtuple("ImportTime", ["self_us", "cumulative_us", "depth"])
+"""The microseconds spent importing a module, without and with the modules it imported, and
+its nesting level, 0 for a module imported by the main code or during startup."""
+
+
+def parse_importtime(output):
+    """
+    Parses the output of :code:`python -X importtime`.
+
+    :param output: the stderr of the interpreter, other lines are ignored
+    :returns: a dict mapping the names of the imported modules to :class:`ImportTime`
+    """
+    result = {}
+    for line in output.splitlines():
+        match = IMPORTTIME_PATTERN.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            result[module] = ImportTime(int(self_us), int(cumulative_us), len(indent) // 2)
+    return result
+
+
+def measure_imports(modules, python=None):
+    """
+    Imports the modules in a new interpreter and measures the time of every import.
+
+    :param modules: the names of the modules to import
+    :param python: the interpreter to start, defaults to the running one
+    :returns: see :func:`parse_importtime`
+    :raises PyperfError: if the modules cannot be imported or the interpreter does not
+        support :code:`-X importtime`
+    """
+    cmdline = [python or sys.executable, "-X", "importtime", "-c", "import " + ", ".join(modules)]
+    proc = subprocess.Popen(cmdline, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    _, stderr = proc.communicate()
+    stderr = stderr.decode("utf-8", "replace")
+    if proc.returncode:
+        raise PyperfError("Importing %s failed: %s" % (", ".join(modules), stderr.strip()))
+    result = parse_importtime(stderr)
+    if not result:
+        raise PyperfError("'%s' does not support -X importtime" % cmdline[0])
+    return result
+
+
+def import_seconds(times, modules):
+    """
+    Returns the time it took to import the modules, including their parent packages but
+    without the startup of the interpreter.
+
+    :param times: the result of :func:`measure_imports`
+    :param modules: the names of the imported modules
+    :returns: the sum of the cumulative import times in seconds
+    """
+    names = set()
+    for module in modules:
+        parts = module.split(".")
+        names.update(".".join(parts[:index]) for index in range(1, len(parts) + 1))
+    return sum(times[name].cumulative_us for name in names
+               if name in times and times[name].depth == 0) / 1e6
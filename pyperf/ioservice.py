@@ -10,13 +10,22 @@
 
 import io
 import json
-from six import PY2
+import os
+from collections import OrderedDict
+from six import PY2, string_types
 from pyperf.exceptions import PyperfError
+from pyperf.samples import Samples
+from pyperf.histogram import Histogram
+
+INDENT = 4
+CHUNKSIZE = 4096
+INF = float("inf")
 
 
 def loadJSONData(json_file):
     """
     This function loads the json_file and returns it as a json object.
+    The order of the keys is kept as found in the file.
 
     :param fileName: name of the destination file
     :param json_file: the file in json format
@@ -26,7 +35,7 @@ def loadJSONData(json_file):
     """
     try:
         with io.open(json_file, encoding="UTF-8") as data_file:
-            return json.load(data_file)
+            return json.load(data_file, object_pairs_hook=OrderedDict)
     except ValueError:
         raise PyperfError("The content of '%s' could not be decoded as JSON." % json_file)
     except IOError:
@@ -37,6 +46,8 @@ def saveJSONData(data, fileName="benchmarkResults.json"):
     """
     This functions dumps json data into a file. The name of the output file
     is determined by the parameter. The default output file is 'benchmarkResults.json'.
+    The data is written piecewise, so :class:`pyperf.samples.Samples` are written without
+    converting them to lists.
 
     :param data: json data which will be saved to file
     :param fileName: the name of the file where the data will be saved
@@ -45,19 +56,162 @@ def saveJSONData(data, fileName="benchmarkResults.json"):
     :returns: True when data could be written to fileName
     """
     try:
-        if PY2:
-            jsonData = json.dumps(data, sort_keys=True, indent=4, ensure_ascii=False).decode(encoding="utf-8")
-        else:
-            jsonData = json.dumps(data, sort_keys=True, indent=4, ensure_ascii=False)
-    except TypeError:
+        outfile = io.open(fileName, 'w', encoding="utf-8")
+    except IOError:
+        raise PyperfError("Could not open file '%s' to save the data!" % fileName)
+    try:
+        with outfile:
+            for chunk in iterencode(data):
+                outfile.write(chunk)
+        return True
+    except (TypeError, ValueError):
+        os.remove(fileName)
         raise PyperfError("Could not serialize object %s!" % data)
+    except IOError:
+        raise PyperfError("Could not open file '%s' to save the data!" % fileName)
+
+
+def iterencode(data, level=0, indent=INDENT):
+    """
+    Encodes data as JSON like :code:`json.dumps(data, sort_keys=True, indent=4)` does,
+    but yields the result in chunks. :class:`pyperf.samples.Samples` are encoded as lists,
+    :class:`pyperf.histogram.Histogram` as dicts.
+
+    :param data: the data to encode
+    :param level: the indentation level of data
+    :param indent: the number of spaces per indentation level, None to encode the data
+        into a single line
+    :raises TypeError: when data contains objects that cannot be converted to JSON
+    :returns: a generator of text chunks
+    """
+    if isinstance(data, dict):
+        if not data:
+            yield u"{}"
+            return
+        separator = _newline(level + 1, indent)
+        yield u"{"
+        for i, key in enumerate(sorted(data)):
+            name = key if isinstance(key, string_types) else _dumps(key)
+            yield (u"," if i else u"") + separator + _dumps(name) + u": "
+            for chunk in iterencode(data[key], level + 1, indent):
+                yield chunk
+        yield _newline(level, indent) + u"}"
+    elif isinstance(data, Samples):
+        for chunk in _iterencode_samples(data, level, indent):
+            yield chunk
+    elif isinstance(data, Histogram):
+        for chunk in iterencode(data.to_dict(), level, indent):
+            yield chunk
+    elif isinstance(data, (list, tuple)):
+        if not data:
+            yield u"[]"
+            return
+        separator = _newline(level + 1, indent)
+        yield u"["
+        for i, value in enumerate(data):
+            yield (u"," if i else u"") + separator
+            for chunk in iterencode(value, level + 1, indent):
+                yield chunk
+        yield _newline(level, indent) + u"]"
     else:
-        try:
-            with io.open(fileName, 'w', encoding="utf-8") as outfile:
-                outfile.write(jsonData)
-            return True
-        except IOError:
-            raise PyperfError("Could not open file '%s' to save the data!" % fileName)
+        yield _dumps(data)
+
+
+def _newline(level, indent):
+    if indent is None:
+        return u""
+    return u"\n" + u" " * (indent * level)
+
+
+def _iterencode_samples(samples, level, indent=INDENT):
+    if not len(samples):
+        yield u"[]"
+        return
+    separator = u"," + _newline(level + 1, indent)
+    number = _float if samples.typecode in "fd" else str
+    yield u"[" + separator[1:]
+    data = samples.data
+    for start in range(0, len(data), CHUNKSIZE):
+        chunk = separator.join(number(value) for value in data[start:start + CHUNKSIZE])
+        yield (separator if start else u"") + chunk
+    yield _newline(level, indent) + u"]"
+
+
+def _float(value):
+    if value != value:
+        return u"NaN"
+    if value == INF:
+        return u"Infinity"
+    if value == -INF:
+        return u"-Infinity"
+    return repr(value)
+
+
+def _dumps(value):
+    text = json.dumps(value, ensure_ascii=False)
+    if PY2 and isinstance(text, bytes):
+        text = text.decode(encoding="utf-8")
+    return text
+
+
+def appendJSONLine(data, fileName):
+    """
+    Appends data as a single line of JSON to a file and flushes it to the disk, so the line
+    survives a crash of the process. A last line truncated by a crash is terminated first.
+    The line is written piecewise like :func:`saveJSONData` does, so
+    :class:`pyperf.samples.Samples` are written without converting them to lists. A line
+    which could not be encoded completely is terminated, too, and skipped by
+    :func:`loadJSONLines`.
+
+    :param data: json data which will be appended to the file
+    :param fileName: the name of the file, it is created if it does not exist
+    :raises PyperfError: when data could not be converted to JSON or
+        when it could not be written to fileName
+    """
+    error = None
+    try:
+        with io.open(fileName, 'ab+') as outfile:
+            outfile.seek(0, os.SEEK_END)
+            if outfile.tell():
+                outfile.seek(-1, os.SEEK_END)
+                if outfile.read(1) != b"\n":
+                    outfile.write(b"\n")
+            try:
+                for chunk in iterencode(data, indent=None):
+                    outfile.write(chunk.encode("utf-8"))
+            except (TypeError, ValueError) as e:
+                error = e
+            outfile.write(b"\n")
+            outfile.flush()
+            os.fsync(outfile.fileno())
+    except (IOError, OSError):
+        raise PyperfError("Could not append the data to '%s'!" % fileName)
+    if error is not None:
+        raise PyperfError("The data for '%s' could not be converted to JSON: %s" % (fileName, error))
+
+
+def loadJSONLines(fileName):
+    """
+    Loads a file written by :func:`appendJSONLine`. A line which cannot be decoded, e.g.
+    because the process writing it was killed, is skipped.
+
+    :param fileName: the name of the file
+    :returns: a list with the data of every line
+    :raises PyperfError: when the file could not be opened
+    """
+    lines = []
+    try:
+        with io.open(fileName, encoding="utf-8") as infile:
+            for line in infile:
+                if not line.strip():
+                    continue
+                try:
+                    lines.append(json.loads(line, object_pairs_hook=OrderedDict))
+                except ValueError:
+                    continue
+    except IOError:
+        raise PyperfError("Could not open file '%s' to load the data!" % fileName)
+    return lines
 
 
 def readFile(fileName):
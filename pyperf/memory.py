@@ -0,0 +1,117 @@
+# -*- mode: python; coding: utf-8 -*-
+#
+# Copyright (C) 1990 - 2019 CONTACT Software GmbH
+# All rights reserved.
+# https://www.contact-software.com/
+
+"""Memory measurement of single bench methods.
+
+:class:`MemoryProbe` combines two views on the memory used by a bench method:
+
+* :code:`tracemalloc` traces the allocations of Python objects, which yields the peak and the
+  net allocation of the method (Python 3 only).
+* :code:`psutil` reports the resident set size (RSS) and the unique set size (USS) of the
+  process, which include memory allocated by C extensions and the allocator overhead.
+"""
+
+import logging
+
+import psutil
+
+try:
+    import tracemalloc
+except ImportError:  # Python 2
+    tracemalloc = None
+
+logger = logging.getLogger(__name__)
+
+MEMORY = "memory"
+"""The result type of the memory measurements."""
+
+TRACE_FRAMES = 10
+"""The number of frames stored per allocation when the top allocation sites are requested."""
+
+
+class MemoryProbe(object):
+    """
+    Measures the memory used between :meth:`start` and :meth:`stop`.
+
+    :param top: the number of top allocation sites to collect, 0 to collect none
+    """
+    def __init__(self, top=0):
+        self.top = top
+        self.allocations = []
+        self.measurements = {}
+        self._tracing = False
+        self._traced = 0
+        self._snapshot = None
+        self._rss = None
+        self._uss = None
+
+    def start(self):
+        """Starts the measurement."""
+        self.allocations = []
+        if tracemalloc is not None:
+            self._tracing = not tracemalloc.is_tracing()
+            if self._tracing:
+                tracemalloc.start(TRACE_FRAMES if self.top else 1)
+            elif hasattr(tracemalloc, "reset_peak"):
+                tracemalloc.reset_peak()
+            if self.top:
+                self._snapshot = tracemalloc.take_snapshot()
+            self._traced = tracemalloc.get_traced_memory()[0]
+        self._rss, self._uss = _process_memory()
+
+    def stop(self):
+        """
+        Stops the measurement.
+
+        :returns: a dict with the measurements in bytes: "peak_bytes" and "net_bytes" (traced
+            Python allocations) as well as "rss_bytes" and "uss_bytes" (the growth of the process)
+            if available
+        """
+        results = {}
+        if tracemalloc is not None:
+            current, peak = tracemalloc.get_traced_memory()
+            results["peak_bytes"] = max(0, peak - self._traced)
+            results["net_bytes"] = current - self._traced
+            if self.top:
+                stats = tracemalloc.take_snapshot().compare_to(self._snapshot, "traceback")
+                self.allocations = [stat for stat in stats if stat.size_diff > 0][:self.top]
+                self._snapshot = None
+            if self._tracing:
+                tracemalloc.stop()
+        rss, uss = _process_memory()
+        results["rss_bytes"] = rss - self._rss
+        if uss is not None and self._uss is not None:
+            results["uss_bytes"] = uss - self._uss
+        self.measurements = results
+        return results
+
+    def store(self, bench, name):
+        """Stores the measurements of the last :meth:`stop` as results "<name>_<measurement>"
+        of the bench. The top allocation sites are stored in the file "<name>_allocations".
+        """
+        for key, value in sorted(self.measurements.items()):
+            bench.storeResult(value, name="%s_%s" % (name, key), type=MEMORY, unit="bytes")
+        if self.top:
+            bench.storeFile("%s_allocations" % name, self.format_allocations())
+
+    def format_allocations(self):
+        """Returns the top allocation sites collected by :meth:`stop` as text."""
+        lines = []
+        for index, stat in enumerate(self.allocations, 1):
+            lines.append("#%d: %+d bytes in %+d blocks" % (index, stat.size_diff, stat.count_diff))
+            lines.extend("    " + line for line in stat.traceback.format())
+        return "\n".join(lines) + "\n"
+
+
+def _process_memory():
+    """Returns the RSS and the USS of this process, the USS is None if it is not available."""
+    process = psutil.Process()
+    try:
+        info = process.memory_full_info()
+        return info.rss, getattr(info, "uss", None)
+    except (psutil.AccessDenied, AttributeError):
+        logger.debug("The USS of the process is not available")
+        return process.memory_info().rss, None
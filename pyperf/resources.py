@@ -0,0 +1,103 @@
+# -*- mode: python; coding: utf-8 -*-
+#
+# Copyright (C) 1990 - 2019 CONTACT Software GmbH
+# All rights reserved.
+# https://www.contact-software.com/
+
+"""Accounting of the OS resources consumed by single bench methods.
+
+:class:`ResourceProbe` takes the difference of the counters of this process before and after
+a bench method. The counters are process wide, so they include other threads of the process.
+Counters not provided by the platform are left out.
+"""
+
+import psutil
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+RESOURCES = "resources"
+"""The result type of the resource measurements."""
+
+UNITS = {
+    "user_seconds": "seconds",
+    "system_seconds": "seconds",
+    "voluntary_switches": "count",
+    "involuntary_switches": "count",
+    "minor_faults": "count",
+    "major_faults": "count",
+    "page_faults": "count",
+    "read_bytes": "bytes",
+    "write_bytes": "bytes",
+    "read_syscalls": "count",
+    "write_syscalls": "count",
+}
+"""The units of the measurements."""
+
+
+class ResourceProbe(object):
+    """
+    Measures the resources consumed between :meth:`start` and :meth:`stop`:
+
+    * the user and system CPU time,
+    * the voluntary and involuntary context switches,
+    * the minor and major page faults (the page faults on Windows),
+    * the bytes read and written and the number of read and write syscalls.
+    """
+    def __init__(self):
+        self.measurements = {}
+        self._process = psutil.Process()
+        self._counters = {}
+
+    def start(self):
+        """Starts the measurement."""
+        self.measurements = {}
+        self._counters = self._snapshot()
+
+    def stop(self):
+        """
+        Stops the measurement.
+
+        :returns: a dict with the consumed resources, see :data:`UNITS`
+        """
+        counters = self._snapshot()
+        self.measurements = dict((key, counters[key] - self._counters[key])
+                                 for key in counters if key in self._counters)
+        return self.measurements
+
+    def store(self, bench, name):
+        """Stores the measurements of the last :meth:`stop` as results "<name>_<measurement>"
+        of the bench.
+        """
+        for key, value in sorted(self.measurements.items()):
+            bench.storeResult(value, name="%s_%s" % (name, key), type=RESOURCES, unit=UNITS[key])
+
+    def _snapshot(self):
+        counters = {}
+        cpu = self._process.cpu_times()
+        counters["user_seconds"] = cpu.user
+        counters["system_seconds"] = cpu.system
+        switches = self._process.num_ctx_switches()
+        counters["voluntary_switches"] = switches.voluntary
+        counters["involuntary_switches"] = switches.involuntary
+        if resource is not None:
+            usage = resource.getrusage(resource.RUSAGE_SELF)
+            counters["minor_faults"] = usage.ru_minflt
+            counters["major_faults"] = usage.ru_majflt
+        else:
+            faults = getattr(self._process.memory_info(), "num_page_faults", None)
+            if faults is not None:
+                counters["page_faults"] = faults
+        if hasattr(self._process, "io_counters"):
+            try:
+                io = self._process.io_counters()
+            except (psutil.AccessDenied, NotImplementedError):
+                io = None
+            if io is not None:
+                counters["read_bytes"] = io.read_bytes
+                counters["write_bytes"] = io.write_bytes
+                counters["read_syscalls"] = io.read_count
+                counters["write_syscalls"] = io.write_count
+        return counters
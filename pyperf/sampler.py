@@ -0,0 +1,137 @@
+# -*- mode: python; coding: utf-8 -*-
+#
+# Copyright (C) 1990 - 2019 CONTACT Software GmbH
+# All rights reserved.
+# https://www.contact-software.com/
+
+"""A statistical sampling profiler with low overhead.
+
+Unlike cProfile, which hooks into every call, :class:`SamplingProfiler` only looks at the stack
+of the profiled thread in a fixed interval. With the default interval of 5 ms its overhead is
+below 1%, so it can stay enabled while a bench is measured.
+
+On POSIX systems the main thread is sampled in a :code:`SIGPROF` (CPU time) or :code:`SIGALRM`
+(wall clock time) handler scheduled by :code:`signal.setitimer`. Elsewhere, and for other
+threads, a helper thread samples the stack with :code:`sys._current_frames`, which measures
+wall clock time.
+
+The samples are written in the collapsed stack format, one line per distinct stack with the
+frames from the root to the leaf separated by semicolons and followed by the number of samples.
+It is understood by flamegraph tools like :code:`flamegraph.pl` or speedscope.
+"""
+
+import collections
+import os
+import signal
+import sys
+import threading
+
+try:
+    import thread as _thread  # Python 2
+except ImportError:
+    import _thread
+
+INTERVAL_DEFAULT = 0.005
+"""The default sampling interval in seconds."""
+
+MAX_DEPTH = 256
+"""The maximum number of frames recorded per sample, the outermost frames are dropped."""
+
+CPU = "cpu"
+WALL = "wall"
+
+_TIMERS = {
+    CPU: ("ITIMER_PROF", "SIGPROF"),
+    WALL: ("ITIMER_REAL", "SIGALRM"),
+}
+
+
+class SamplingProfiler(object):
+    """
+    Samples the stack of the thread calling :meth:`start` until :meth:`stop` is called.
+
+    :param interval: the sampling interval in seconds
+    :param mode: :data:`CPU` samples in intervals of CPU time of the process, :data:`WALL`
+        in intervals of wall clock time. Without timer signals, the wall clock time is used.
+    """
+    def __init__(self, interval=INTERVAL_DEFAULT, mode=CPU):
+        if mode not in _TIMERS:
+            raise ValueError("Unknown sampling mode '%s'" % mode)
+        self.interval = interval
+        self.mode = mode
+        self.stacks = collections.Counter()
+        self._thread_id = None
+        self._signal = None
+        self._previous_handler = None
+        self._sampler = None
+        self._stopped = threading.Event()
+
+    @property
+    def samples(self):
+        """The number of samples taken."""
+        return sum(self.stacks.values())
+
+    def start(self):
+        """Starts sampling the calling thread."""
+        self.stacks = collections.Counter()
+        self._thread_id = _thread.get_ident()
+        timer, signame = _TIMERS[self.mode]
+        if hasattr(signal, "setitimer"):
+            try:
+                self._previous_handler = signal.signal(getattr(signal, signame), self._on_signal)
+            except ValueError:
+                pass  # signal handlers can only be set in the main thread
+            else:
+                self._signal = getattr(signal, signame)
+                signal.setitimer(getattr(signal, timer), self.interval, self.interval)
+                return
+        self._stopped.clear()
+        self._sampler = threading.Thread(target=self._sample_thread, name="pyperf-sampler")
+        self._sampler.daemon = True
+        self._sampler.start()
+
+    def stop(self):
+        """
+        Stops sampling.
+
+        :returns: the :code:`collections.Counter` of the collapsed stacks
+        """
+        if self._signal is not None:
+            signal.setitimer(getattr(signal, _TIMERS[self.mode][0]), 0)
+            signal.signal(self._signal, self._previous_handler)
+            self._signal = None
+        if self._sampler is not None:
+            self._stopped.set()
+            self._sampler.join()
+            self._sampler = None
+        return self.stacks
+
+    def store(self, bench, name):
+        """Writes the collapsed stacks of the last run to the file "<name>_stacks.folded"
+        of the bench, see :meth:`pyperf.bench.Bench.storeFile`.
+        """
+        bench.storeFile("%s_stacks" % name, self.format(), ".folded")
+
+    def format(self):
+        """Returns the samples in the collapsed stack format."""
+        return "".join("%s %d\n" % (stack, count) for stack, count in sorted(self.stacks.items()))
+
+    def _on_signal(self, signum, frame):
+        self._record(frame)
+
+    def _sample_thread(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)  # pylint: disable=protected-access
+            if frame is not None:
+                self._record(frame)
+            del frame
+
+    def _record(self, frame):
+        labels = []
+        while frame is not None and len(labels) < MAX_DEPTH:
+            code = frame.f_code
+            labels.append("%s (%s:%d)" % (code.co_name, os.path.basename(code.co_filename),
+                                          code.co_firstlineno))
+            frame = frame.f_back
+        labels.reverse()
+        self.stacks[";".join(labels)] += 1
@@ -0,0 +1,78 @@
+# -*- mode: python; coding: utf-8 -*-
+#
+# Copyright (C) 1990 - 2019 CONTACT Software GmbH
+# All rights reserved.
+# https://www.contact-software.com/
+
+"""Compact storage for long time series.
+
+A list of floats costs about 32 bytes per sample (the boxed float plus the pointer in the list).
+:class:`Samples` stores the values unboxed in an :code:`array`, which costs 8 bytes per sample.
+"""
+
+import array
+
+SECONDS = "d"
+"""Typecode for samples stored as float, e.g. seconds."""
+
+NANOSECONDS = "q"
+"""Typecode for samples stored as signed 64 bit integers, e.g. nanoseconds (Python 3 only)."""
+
+
+class Samples(object):
+    """
+    An append-only series of numbers backed by an :code:`array`. It is returned by
+    :meth:`pyperf.bench.Bench.record` and written to the report as a JSON list by
+    :func:`pyperf.ioservice.saveJSONData` without converting it to a list first.
+    """
+    __slots__ = ("data",)
+
+    def __init__(self, values=(), typecode=SECONDS):
+        self.data = array.array(typecode, values)
+
+    @property
+    def typecode(self):
+        return self.data.typecode
+
+    @property
+    def nbytes(self):
+        """The number of bytes used for the values."""
+        return self.data.itemsize * len(self.data)
+
+    def append(self, value):
+        self.data.append(value)
+
+    def extend(self, values):
+        self.data.extend(values)
+
+    def __len__(self):
+        return len(self.data)
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def __getitem__(self, index):
+        return self.data[index]
+
+    def __eq__(self, other):
+        if isinstance(other, Samples):
+            return self.data == other.data
+        try:
+            return len(self.data) == len(other) and all(a == b for a, b in zip(self.data, other))
+        except TypeError:
+            return NotImplemented
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    __hash__ = None
+
+    def __getstate__(self):
+        return (self.data,)
+
+    def __setstate__(self, state):
+        self.data = state[0]
+
+    def __repr__(self):
+        return "Samples(%r, typecode=%r)" % (self.data.tolist(), self.data.typecode)
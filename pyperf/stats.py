@@ -0,0 +1,163 @@
+# -*- mode: python; coding: utf-8 -*-
+#
+# Copyright (C) 1990 - 2019 CONTACT Software GmbH
+# All rights reserved.
+# https://www.contact-software.com/
+
+"""Small statistics helpers used while measuring and aggregating samples.
+
+:func:`distribution` uses NumPy to compute the statistics of long series when it is installed
+and falls back to pure Python otherwise. NumPy is imported on the first call only, so benches
+which do not aggregate distributions do not pay for it.
+"""
+
+import math
+
+_numpy = None
+
+Z_95 = 1.96
+"""z-value of the two sided 95% confidence interval of the normal distribution."""
+
+DISTRIBUTION = "distribution"
+"""The result type of series whose distribution is aggregated by :func:`distribution`."""
+
+PERCENTILES_DEFAULT = (50, 90, 99, 99.9)
+"""The percentiles of a distribution if the suite entry does not configure them."""
+
+
+def mean(values):
+    """
+    Calculates the arithmetic mean of the values.
+
+    :param values: a non-empty collection of numbers
+    :returns: the mean as float
+    """
+    return float(sum(values)) / len(values)
+
+
+def stdev(values):
+    """
+    Calculates the sample standard deviation of the values.
+
+    :param values: a collection of numbers
+    :returns: the standard deviation, 0.0 for less than two values
+    """
+    n = len(values)
+    if n < 2:
+        return 0.0
+    avg = mean(values)
+    return math.sqrt(sum((val - avg) ** 2 for val in values) / (n - 1))
+
+
+def relative_ci(values, z=Z_95):
+    """
+    Calculates the half width of the confidence interval of the mean relative to the mean.
+    The normal approximation is used, so the result gets reliable with a growing number of values.
+
+    :param values: a collection of numbers
+    :param z: the z-value of the confidence level
+    :returns: the relative half width, infinity if it cannot be determined
+    """
+    n = len(values)
+    if n < 2:
+        return float("inf")
+    avg = mean(values)
+    if avg == 0:
+        return float("inf")
+    return z * stdev(values) / math.sqrt(n) / abs(avg)
+
+
+def is_steady(values, window, tolerance):
+    """
+    Checks whether the values reached a steady state, i.e. the means of the last two windows
+    of values differ by at most `tolerance` relative to the earlier window.
+
+    :param values: the values in the order of their occurrence
+    :param window: the number of values per window
+    :param tolerance: the allowed relative difference of the window means
+    :returns: True if the values are steady, False otherwise or if there are not enough values
+    """
+    if window < 1 or len(values) < 2 * window:
+        return False
+    previous = mean(values[-2 * window:-window])
+    last = mean(values[-window:])
+    if previous == 0:
+        return last == 0
+    return abs(last - previous) / abs(previous) <= tolerance
+
+
+def percentile(values, p):
+    """
+    Calculates the p-th percentile of sorted values, interpolating linearly between the
+    closest ranks like :code:`numpy.percentile`.
+
+    :param values: a non-empty, sorted sequence of numbers
+    :param p: the percentile in the range [0, 100]
+    :returns: the percentile as float
+    """
+    rank = (len(values) - 1) * min(max(p, 0), 100) / 100.0
+    lower = int(math.floor(rank))
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (rank - lower)
+
+
+def _import_numpy():
+    """Returns the numpy module, or False if it is not installed."""
+    global _numpy  # pylint: disable=global-statement
+    if _numpy is None:
+        try:
+            import numpy
+            _numpy = numpy
+        except ImportError:
+            _numpy = False
+    return _numpy
+
+
+def mad(values):
+    """
+    Calculates the median absolute deviation of the values from their median, a measure of
+    the spread which is robust against outliers.
+
+    :param values: a non-empty collection of numbers
+    :returns: the median absolute deviation as float
+    """
+    median = percentile(sorted(values), 50)
+    return percentile(sorted(abs(val - median) for val in values), 50)
+
+
+def distribution(values, percentiles=PERCENTILES_DEFAULT):
+    """
+    Describes the distribution of the values, vectorized with NumPy if it is available.
+
+    :param values: a non-empty collection of numbers
+    :param percentiles: the percentiles to calculate, each in the range [0, 100]
+    :returns: a dict with the "mean", "min", "max", "stdev" (sample standard deviation),
+        "mad" (median absolute deviation), "count" and the percentiles, keyed by the percentile
+    """
+    numpy = _import_numpy()
+    if numpy:
+        array = numpy.asarray(values, dtype=float)
+        median = numpy.median(array)
+        result = {
+            "mean": float(array.mean()),
+            "min": float(array.min()),
+            "max": float(array.max()),
+            "stdev": float(array.std(ddof=1)) if len(array) > 1 else 0.0,
+            "mad": float(numpy.median(numpy.abs(array - median))),
+            "count": len(array),
+        }
+        if percentiles:
+            result.update(zip(percentiles, (float(val) for val in numpy.percentile(array, percentiles))))
+        return result
+    ordered = sorted(values)
+    result = {
+        "mean": mean(ordered),
+        "min": ordered[0],
+        "max": ordered[-1],
+        "stdev": stdev(ordered),
+        "mad": mad(ordered),
+        "count": len(ordered),
+    }
+    for p in percentiles:
+        result[p] = percentile(ordered, p)
+    return result
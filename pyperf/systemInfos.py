@@ -7,18 +7,29 @@
 """
 Provides serveral system information.
 The information gathered are:
+
+The information is collected by probes, which :func:`getAllSysInfos` runs concurrently in
+threads. A probe which does not finish within its timeout is skipped. The results of the
+probes for static facts (MAC, hostnames, core counts, OS, VM detection and the route to the
+server) are cached in :data:`CACHE_FILE` for :data:`CACHE_TTL` seconds.
 """
 
-import ctypes
+import collections
 import datetime
 import getpass
 import logging
 import platform
 import subprocess
 import sys
+import threading
 import os
 import psutil
 import re
+import time
+import timeit
+
+from pyperf import ioservice
+from pyperf.exceptions import PyperfError
 
 cdb = None
 try:
@@ -33,28 +44,54 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+CACHE_FILE = os.path.join(os.path.expanduser("~"), ".pyperf", "sysinfos.json")
+"""The file the static system information is cached in."""
 
-# windows memory information
-class MEMORYSTATUSEX(ctypes.Structure):
-    """
-    This class is used for retrieving the memory information on Windows.
+CACHE_TTL = 24 * 3600
+"""The number of seconds the static system information is cached."""
+
+PROBE_TIMEOUT = 10.0
+"""The number of seconds a probe may take, before it is skipped. A command the probe started
+is killed then."""
+
+TRACEROUTE_TIMEOUT = 30.0
+"""The number of seconds the traceroute may take, before it is skipped."""
+
+SysInfoProbe = collections.namedtuple("SysInfoProbe", ["key", "function", "args", "static", "timeout"])
+"""A probe collecting system information: the function is called with the args and returns a
+dict. The results of static probes are cached under the key."""
+
+
+def getWindowsMemoryStatus():
     """
-    _fields_ = [
-        ("dwLength", ctypes.c_ulong),
-        ("dwMemoryLoad", ctypes.c_ulong),
-        ("ullTotalPhys", ctypes.c_ulonglong),
-        ("ullAvailPhys", ctypes.c_ulonglong),
-        ("ullTotalPageFile", ctypes.c_ulonglong),
-        ("ullAvailPageFile", ctypes.c_ulonglong),
-        ("ullTotalVirtual", ctypes.c_ulonglong),
-        ("ullAvailVirtual", ctypes.c_ulonglong),
-        ("sullAvailupdateedVirtual", ctypes.c_ulonglong),
-    ]
+    Retrieves the memory information on Windows via :code:`GlobalMemoryStatusEx`. ctypes is
+    imported here, so it is not loaded on other platforms.
 
-    def __init__(self):
-        # have to initialize this to the size of MEMORYSTATUSEX
-        self.dwLength = ctypes.sizeof(self)
-        super(MEMORYSTATUSEX, self).__init__()
+    :return: the filled MEMORYSTATUSEX structure
+    """
+    import ctypes
+
+    class MEMORYSTATUSEX(ctypes.Structure):
+        _fields_ = [
+            ("dwLength", ctypes.c_ulong),
+            ("dwMemoryLoad", ctypes.c_ulong),
+            ("ullTotalPhys", ctypes.c_ulonglong),
+            ("ullAvailPhys", ctypes.c_ulonglong),
+            ("ullTotalPageFile", ctypes.c_ulonglong),
+            ("ullAvailPageFile", ctypes.c_ulonglong),
+            ("ullTotalVirtual", ctypes.c_ulonglong),
+            ("ullAvailVirtual", ctypes.c_ulonglong),
+            ("sullAvailupdateedVirtual", ctypes.c_ulonglong),
+        ]
+
+        def __init__(self):
+            # have to initialize this to the size of MEMORYSTATUSEX
+            self.dwLength = ctypes.sizeof(self)
+            super(MEMORYSTATUSEX, self).__init__()
+
+    stat = MEMORYSTATUSEX()
+    ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(stat))
+    return stat
 
 
 def getMemoryInfos(verbose=True):
@@ -100,8 +137,7 @@ def getMemoryInfos(verbose=True):
 
     if verbose:
         if psutil.WINDOWS:
-            stat = MEMORYSTATUSEX()
-            ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(stat))
+            stat = getWindowsMemoryStatus()
             res['mem_total_virtual'] = stat.ullTotalVirtual / mb
 
         res['mem_used'] = mem.used / mb
@@ -222,13 +258,27 @@ def getSysInfo():
     * dbms_driver
     * dbms_version
 
+    :returns: dict with the infos"""
+    res = getSessionInfo()
+    res.update(getOSInfo())
+    return res
+
+
+def getOSInfo():
+    """Get the information about the operating system and the processor, see :func:`getSysInfo`.
+
+    :returns: dict with the infos"""
+    return {"os": sys.platform, "os_version": platform.platform(), "cpu": platform.processor()}
+
+
+def getSessionInfo():
+    """Get the time, the user and, when cdb is defined, the versions of CONTACT Elements and
+    the dbms, see :func:`getSysInfo`.
+
     :returns: dict with the infos"""
     res = {}
     res["time"] = datetime.datetime.utcnow().isoformat()
     res["user"] = getpass.getuser()
-    res["os"] = sys.platform
-    res["os_version"] = platform.platform()
-    res["cpu"] = platform.processor()
     if cdb:
         ver = cdb.version.getVersionDescription()
         res["ce_minor"], res["ce_sl"] = matchVersion(ver)
@@ -271,26 +321,63 @@ def getCPUInfo(verbose=True):
     # 1. CPU utilisation by mode (user, system, idle).
     #    TODO: platform specific modes (irq, softirq etc.) would probably be useful too.
     if verbose:
-        cpu_times = psutil.cpu_times()
-        res["cpu_user"] = cpu_times.user
-        res["cpu_system"] = cpu_times.system
-        res["cpu_idle"] = cpu_times.idle
-
-        cpu_percent = psutil.cpu_percent(interval=0.5, percpu=False)
-        res['cpu_percent'] = cpu_percent
-
-        cpu_time_percent = psutil.cpu_times_percent(interval=0.5, percpu=False)
-        res["cpu_load_user"] = cpu_time_percent.user
-        res["cpu_load_system"] = cpu_time_percent.system
-        res["cpu_load_idle"] = cpu_time_percent.idle
+        res.update(getCPUTimes())
+        res.update(getCPUPercent())
+        res.update(getCPULoad())
 
     # 2. CPU core counts
-    cores_logical = psutil.cpu_count()
-    cores_physical = psutil.cpu_count(logical=False)
-    res['cpu_cores_logical'] = cores_logical
-    res['cpu_cores_physical'] = cores_physical
+    res.update(getCPUCores())
 
     # 3. Current CPU frequency
+    res.update(getCPUFrequency())
+
+    return res
+
+
+def getCPUTimes():
+    """Get the CPU times by mode: cpu_user, cpu_system and cpu_idle.
+
+    :return: Dict containing the CPU times
+    """
+    cpu_times = psutil.cpu_times()
+    return {"cpu_user": cpu_times.user, "cpu_system": cpu_times.system, "cpu_idle": cpu_times.idle}
+
+
+def getCPUPercent():
+    """Get the CPU utilisation during 0.5 seconds as cpu_percent.
+
+    :return: Dict containing the CPU utilisation
+    """
+    return {"cpu_percent": psutil.cpu_percent(interval=0.5, percpu=False)}
+
+
+def getCPULoad():
+    """Get the CPU utilisation by mode during 0.5 seconds: cpu_load_user, cpu_load_system
+    and cpu_load_idle.
+
+    :return: Dict containing the CPU utilisation by mode
+    """
+    cpu_time_percent = psutil.cpu_times_percent(interval=0.5, percpu=False)
+    return {"cpu_load_user": cpu_time_percent.user,
+            "cpu_load_system": cpu_time_percent.system,
+            "cpu_load_idle": cpu_time_percent.idle}
+
+
+def getCPUCores():
+    """Get the core counts: cpu_cores_logical and cpu_cores_physical.
+
+    :return: Dict containing the core counts
+    """
+    return {"cpu_cores_logical": psutil.cpu_count(),
+            "cpu_cores_physical": psutil.cpu_count(logical=False)}
+
+
+def getCPUFrequency():
+    """Get the current CPU frequency as cpu_frequency, if psutil supports it.
+
+    :return: Dict containing the CPU frequency
+    """
+    res = {}
     if hasattr(psutil, "cpu_freq"):
         freq = psutil.cpu_freq(percpu=False)
         # Can still be None if the system has no cpufreq module running
@@ -405,8 +492,7 @@ def msinfo32():
         from lxml import etree
 
         fileName = "msinfo32.xml"
-        subprocess.check_call(['msinfo32', "/nfo", fileName],
-                              stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        checkOutput(['msinfo32', "/nfo", fileName], PROBE_TIMEOUT)
         with io.open(fileName, encoding="UTF-16le") as fd:
             xml_string = fd.read().encode("utf-8", "ignore")
 
@@ -438,8 +524,7 @@ def traceroute(dest):
         from . import encodingService
         cp = encodingService.guess_console_encoding()
 
-        output = subprocess.check_output(["tracert", "-w", "100", dest],
-                                         stdin=subprocess.PIPE, stderr=subprocess.STDOUT)
+        output = checkOutput(["tracert", "-w", "100", dest], TRACEROUTE_TIMEOUT)
         output = output.decode(cp).replace("\r\n", "")
 
         # shorten en/de tracert msg
@@ -452,8 +537,9 @@ def traceroute(dest):
             return {"route": tracertString}
     elif psutil.POSIX:
         # traceroute to google.com (172.217.23.14),
-        output = subprocess.check_output(["traceroute", "-w", "100", dest],
-                                         stdin=subprocess.PIPE, stderr=subprocess.STDOUT)
+        output = checkOutput(["traceroute", "-w", "100", dest], TRACEROUTE_TIMEOUT)
+        if not isinstance(output, str):
+            output = output.decode("utf-8", "replace")
         output = output.replace("\n", "")
 
         # shorten traceroute msg
@@ -464,33 +550,190 @@ def traceroute(dest):
             route = m.group(3)
             tracertString = "{}: {}".format(server, route)
             return {"route": tracertString}
-    else:
+    return {}
+
+
+def checkOutput(cmdline, timeout):
+    """
+    Runs a command and returns its output. The command is killed if it does not finish within
+    the timeout, so it does not outlive the probe which started it.
+
+    :param cmdline: the command and its arguments
+    :param timeout: the number of seconds the command may take
+    :returns: the stdout and stderr of the command
+    :raises PyperfError: if the command fails or does not finish in time
+    """
+    proc = subprocess.Popen(cmdline, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                            stderr=subprocess.STDOUT)
+    killed = threading.Event()
+
+    def kill():
+        killed.set()
+        proc.kill()
+
+    killer = threading.Timer(timeout, kill)
+    killer.daemon = True
+    killer.start()
+    try:
+        output, _ = proc.communicate()
+    finally:
+        killer.cancel()
+    if killed.is_set():
+        raise PyperfError("'%s' did not finish within %ss" % (cmdline[0], timeout))
+    if proc.returncode:
+        raise PyperfError("'%s' failed with exit code %s" % (cmdline[0], proc.returncode))
+    return output
+
+
+def getProbes(verbose=True):
+    """
+    Returns the probes collecting the system infos.
+
+    :param verbose: 'True' for gathering more/deeper sysinfos, 'False' otherwise.
+    :returns: list of :data:`SysInfoProbe`
+    """
+    probes = [
+        SysInfoProbe("session", getSessionInfo, (), False, PROBE_TIMEOUT),
+        SysInfoProbe("os", getOSInfo, (), True, PROBE_TIMEOUT),
+        SysInfoProbe("caddok", getCADDOKInfos, (), False, PROBE_TIMEOUT),
+        SysInfoProbe("cpu_cores", getCPUCores, (), True, PROBE_TIMEOUT),
+        SysInfoProbe("cpu_frequency", getCPUFrequency, (), False, PROBE_TIMEOUT),
+        SysInfoProbe("vm", VMInfo, (), True, PROBE_TIMEOUT),
+        SysInfoProbe("hostnames_%s" % ("verbose" if verbose else "sparse"), getAllHostnamesInfo,
+                     (verbose,), True, PROBE_TIMEOUT),
+        SysInfoProbe("memory", getMemoryInfos, (verbose,), False, PROBE_TIMEOUT),
+    ]
+    if verbose:
+        probes.extend([
+            SysInfoProbe("cpu_times", getCPUTimes, (), False, PROBE_TIMEOUT),
+            SysInfoProbe("cpu_percent", getCPUPercent, (), False, PROBE_TIMEOUT),
+            SysInfoProbe("cpu_load", getCPULoad, (), False, PROBE_TIMEOUT),
+            SysInfoProbe("disk_io", diskIOCounter, (), False, PROBE_TIMEOUT),
+            SysInfoProbe("mac", getMacInfo, (), True, PROBE_TIMEOUT),
+            SysInfoProbe("msinfo32", msinfo32, (), False, PROBE_TIMEOUT),
+        ])
+        environ = cdb.rte.environ if cdb else os.environ
+        if 'CADDOK_SERVER' in environ:
+            server = environ['CADDOK_SERVER']
+            probes.append(SysInfoProbe("route_%s" % server, traceroute, (server,), True,
+                                       TRACEROUTE_TIMEOUT))
+    return probes
+
+
+def runProbes(probes):
+    """
+    Runs the probes concurrently, each in a daemon thread. A probe which fails or does not
+    finish within its timeout is skipped with a warning. It is not waited for.
+
+    :param probes: list of :data:`SysInfoProbe`
+    :returns: dict mapping the keys of the finished probes to their results
+    """
+    results = {}
+    running = []
+    start = timeit.default_timer()
+    for probe in probes:
+        outcome = {}
+        thread = threading.Thread(target=_runProbe, args=(probe, outcome),
+                                  name="pyperf-sysinfo-%s" % probe.key)
+        thread.daemon = True
+        thread.start()
+        running.append((probe, thread, outcome))
+    for probe, thread, outcome in running:
+        thread.join(max(0.0, start + probe.timeout - timeit.default_timer()))
+        if thread.is_alive():
+            logger.warning("The system info '%s' was not collected within %ss, skipping it",
+                           probe.key, probe.timeout)
+        elif "error" in outcome:
+            logger.warning("The system info '%s' could not be collected: %s", probe.key,
+                           outcome["error"])
+        else:
+            results[probe.key] = outcome["result"] or {}
+    return results
+
+
+def _runProbe(probe, outcome):
+    """Runs a probe and stores its "result" or "error" in the dict outcome."""
+    try:
+        outcome["result"] = probe.function(*probe.args)
+    except Exception as e:  # pylint: disable=broad-except
+        outcome["error"] = e
+
+
+def loadCache(cachefile, ttl):
+    """
+    Loads the results of the static probes cached on this machine, which are younger than ttl.
+
+    :param cachefile: the path of the cache
+    :param ttl: the maximum age of the results in seconds
+    :returns: dict mapping the keys of the probes to their results
+    """
+    if not os.path.exists(cachefile):
         return {}
+    try:
+        cache = ioservice.loadJSONData(cachefile)
+    except PyperfError as e:
+        logger.debug("Ignoring the cached system infos. %s", e.message)
+        return {}
+    if cache.get("node") != platform.node():
+        return {}
+    now = time.time()
+    return dict((key, entry["value"]) for key, entry in cache.get("probes", {}).items()
+                if now - entry["time"] <= ttl)
 
 
-def getAllSysInfos(verbose=True):
+def saveCache(cachefile, results):
     """
-    Collects all system infos and returns a dict.
+    Adds the results of static probes to the cache.
+
+    :param cachefile: the path of the cache
+    :param results: dict mapping the keys of the probes to their results
+    """
+    cache = {}
+    if os.path.exists(cachefile):
+        try:
+            cache = ioservice.loadJSONData(cachefile)
+        except PyperfError:
+            pass
+    if cache.get("node") != platform.node():
+        cache = {"node": platform.node(), "probes": {}}
+    now = time.time()
+    for key, value in results.items():
+        cache["probes"][key] = {"time": now, "value": value}
+    try:
+        if not os.path.isdir(os.path.dirname(cachefile)):
+            os.makedirs(os.path.dirname(cachefile))
+        ioservice.saveJSONData(cache, cachefile)
+    except (OSError, PyperfError) as e:
+        logger.debug("The system infos could not be cached. %s", e)
+
+
+def getAllSysInfos(verbose=True, cachefile=None, ttl=CACHE_TTL):
+    """
+    Collects all system infos and returns a dict. The probes run concurrently, the results
+    of the static probes are taken from the cache if possible, see :func:`getProbes`.
 
     :param verbose: 'True' for gathering more/deeper sysinfos, 'False' otherwise.
+    :param cachefile: the path of the cache of the static system infos, defaults to
+        :data:`CACHE_FILE`
+    :param ttl: the number of seconds the static system infos are cached, 0 disables the cache
     :returns: dict with all system infos.
     """
 
     logger.info("Fetching system infos (verbose: %s, CONTACT Elements available: %s)",
                 verbose, cdb is not None)
 
-    res = {}
-    res.update(getSysInfo())
-    res.update(getCADDOKInfos())
-    res.update(getCPUInfo(verbose))
-    res.update(VMInfo())
-    res.update(getAllHostnamesInfo(verbose))
-    res.update(getMemoryInfos(verbose))
-    if verbose:
-        if 'CADDOK_SERVER' in res:
-            res.update(traceroute(res['CADDOK_SERVER']))
-        res.update(diskIOCounter())
-        res.update(getMacInfo())
-        res.update(msinfo32())
+    cachefile = cachefile or CACHE_FILE
+    probes = getProbes(verbose)
+    cached = loadCache(cachefile, ttl) if ttl else {}
+    results = runProbes([probe for probe in probes if not (probe.static and probe.key in cached)])
+    if ttl:
+        static = dict((probe.key, results[probe.key]) for probe in probes
+                      if probe.static and probe.key in results)
+        if static:
+            saveCache(cachefile, static)
 
+    res = {}
+    for probe in probes:
+        res.update(cached.get(probe.key, {}) if probe.static and probe.key in cached
+                   else results.get(probe.key, {}))
     return res
@@ -5,23 +5,258 @@
 # https://www.contact-software.com/
 
 import datetime
+import functools
+import time
 import timeit
 
+try:
+    perf_counter_ns = time.perf_counter_ns
+except AttributeError:  # Python < 3.7
+    _default_timer = timeit.default_timer
 
-class Timer(object):
+    def perf_counter_ns():
+        """Fallback for :code:`time.perf_counter_ns` based on :code:`timeit.default_timer`."""
+        return int(_default_timer() * 1e9)
+
+
+def _clock_ns(name):
+    """Returns the nanosecond variant of the clock `name` of the :code:`time` module, which is
+    emulated for Python < 3.7. Returns None if the platform does not provide the clock.
     """
-    This class implements a Timer as a context manager.
-    It stores its time of creation in the field :code:`self.start` and calculates how long it was
-    alive and stores it into the field :code:`self.elapsed`.
+    clock = getattr(time, name + "_ns", None)
+    if clock is None:
+        seconds = getattr(time, name, None)
+        if seconds is None:
+            return None
+
+        def clock():
+            return int(seconds() * 1e9)
+    return clock
+
+
+process_time_ns = _clock_ns("process_time")
+thread_time_ns = _clock_ns("thread_time")
+
+
+class PerfTimer(object):
     """
-    def __init__(self):
-        self.start = None
-        self.elapsed = None
+    This class implements a Timer based on :code:`time.perf_counter_ns`. It measures integer
+    nanoseconds, so no rounding happens while measuring and no objects are allocated apart
+    from the integers. One instance can be reused for any number of measurements:
+
+    .. code-block:: python
+
+        t = PerfTimer()
+        for i in range(rows):
+            with t:
+                insert(i)
+            self.record("Inserts", t.elapsed_ns, unit="nanoseconds", typecode=NANOSECONDS)
+
+    It can also be used as decorator. Then the last call of the decorated function is measured:
+
+    .. code-block:: python
+
+        t = PerfTimer()
+        insert = t(insert)
+        insert(1)
+        print(t.seconds)
+
+    With :code:`cpu=True` the CPU time of the process and of the calling thread are measured
+    beside the wall clock time. The part of the wall clock time the thread did not run on a CPU,
+    because it waited for I/O, a lock or a free CPU, is the :attr:`wait_fraction`. Pass the timer
+    to :meth:`pyperf.bench.Bench.storeResult` or :meth:`pyperf.bench.Bench.record` to store all
+    of them at once.
+
+    :param cpu: whether to measure the CPU times, too
+    """
+    __slots__ = ("cpu", "start_ns", "elapsed_ns", "process_ns", "thread_ns", "_process_start",
+                 "_thread_start")
+
+    def __init__(self, cpu=False):
+        self.cpu = cpu
+        self.start_ns = None
+        self.elapsed_ns = None
+        """The duration of the last measurement in nanoseconds."""
+        self.process_ns = None
+        """The CPU time of the process during the last measurement in nanoseconds."""
+        self.thread_ns = None
+        """The CPU time of the thread during the last measurement in nanoseconds."""
+        self._process_start = None
+        self._thread_start = None
+
+    @property
+    def seconds(self):
+        """The duration of the last measurement in seconds as float."""
+        return self.elapsed_ns / 1e9 if self.elapsed_ns is not None else None
+
+    @property
+    def cpu_seconds(self):
+        """The CPU time of the process during the last measurement in seconds."""
+        return self.process_ns / 1e9 if self.process_ns is not None else None
+
+    @property
+    def thread_seconds(self):
+        """The CPU time of the thread during the last measurement in seconds."""
+        return self.thread_ns / 1e9 if self.thread_ns is not None else None
+
+    @property
+    def wait_fraction(self):
+        """The fraction of the last measurement the thread (or the process, if the CPU time
+        of the thread is not available) did not run on a CPU, between 0 and 1.
+        """
+        cpu_ns = self.thread_ns if self.thread_ns is not None else self.process_ns
+        if cpu_ns is None or not self.elapsed_ns:
+            return None
+        return min(1.0, max(0.0, 1.0 - float(cpu_ns) / self.elapsed_ns))
 
     def __enter__(self):
-        self.start = timeit.default_timer()
+        if self.cpu:
+            self._process_start = process_time_ns() if process_time_ns else None
+            self._thread_start = thread_time_ns() if thread_time_ns else None
+        self.start_ns = perf_counter_ns()
         return self
 
     def __exit__(self, *exc):
-        self.elapsed = datetime.timedelta(seconds=timeit.default_timer() - self.start)
+        self.elapsed_ns = perf_counter_ns() - self.start_ns
+        if self.cpu:
+            if self._thread_start is not None:
+                self.thread_ns = thread_time_ns() - self._thread_start
+            if self._process_start is not None:
+                self.process_ns = process_time_ns() - self._process_start
         return False
+
+    def measurements(self):
+        """
+        Returns the measurements of the last run in seconds, the wait fraction as ratio.
+
+        :returns: a list of (suffix, value, unit) tuples: ("", wall time, "seconds"), and with
+            :code:`cpu=True` ("_cpu", process CPU time, "seconds"), ("_thread_cpu", thread CPU time,
+            "seconds") and ("_wait", wait fraction, "fraction") if available
+        """
+        result = [("", self.seconds, "seconds")]
+        if self.cpu:
+            for suffix, value, unit in (("_cpu", self.cpu_seconds, "seconds"),
+                                        ("_thread_cpu", self.thread_seconds, "seconds"),
+                                        ("_wait", self.wait_fraction, "fraction")):
+                if value is not None:
+                    result.append((suffix, value, unit))
+        return result
+
+    def __call__(self, fn):
+        @functools.wraps(fn)
+        def timed(*args, **kwargs):
+            with self:
+                return fn(*args, **kwargs)
+        return timed
+
+
+class Timer(PerfTimer):
+    """
+    This class implements a Timer as a context manager.
+    It stores its time of creation in the field :code:`self.start` and calculates how long it was
+    alive and stores it into the field :code:`self.elapsed`.
+
+    This class is kept for compatibility. The :code:`datetime.timedelta` of :code:`self.elapsed`
+    is only created when it is accessed. Use :attr:`seconds` or :attr:`elapsed_ns` or
+    :class:`PerfTimer` instead.
+    """
+    __slots__ = ()
+
+    @property
+    def start(self):
+        """The start of the last measurement in seconds."""
+        return self.start_ns / 1e9 if self.start_ns is not None else None
+
+    @property
+    def elapsed(self):
+        """The duration of the last measurement as :code:`datetime.timedelta`."""
+        if self.elapsed_ns is None:
+            return None
+        return datetime.timedelta(microseconds=self.elapsed_ns / 1e3)
+
+
+CALIBRATION_SAMPLES = 10000
+"""The number of empty regions measured by :func:`calibrate`."""
+
+RESOLUTION_FACTOR = 10
+"""Samples shorter than this multiple of the timer overhead (or the clock resolution) are flagged."""
+
+SUBTRACT = "subtract"
+FLAG = "flag"
+
+UNIT_NANOSECONDS = {
+    "seconds": 1e9, "s": 1e9,
+    "milliseconds": 1e6, "ms": 1e6,
+    "microseconds": 1e3, "us": 1e3,
+    "nanoseconds": 1, "ns": 1,
+}
+"""The number of nanoseconds per time unit, used to convert the calibration."""
+
+_calibration = None
+
+
+def calibrate(samples=CALIBRATION_SAMPLES):
+    """
+    Measures the overhead of the :class:`PerfTimer` by timing empty regions.
+
+    :param samples: the number of empty regions to measure
+    :returns: a dict with the minimum ("min_ns") and median ("median_ns") of the overhead, the
+        resolution of the clock ("resolution_ns") and the threshold below which samples are
+        flagged ("threshold_ns"), all in nanoseconds
+    """
+    t = PerfTimer()
+    values = []
+    for _ in range(samples):
+        with t:
+            pass
+        values.append(t.elapsed_ns)
+    values.sort()
+    try:
+        resolution_ns = int(time.get_clock_info("perf_counter").resolution * 1e9)
+    except AttributeError:  # Python 2
+        resolution_ns = min(val for val in values if val > 0) if any(values) else 0
+    median_ns = values[len(values) // 2]
+    return {
+        "samples": samples,
+        "min_ns": values[0],
+        "median_ns": median_ns,
+        "resolution_ns": resolution_ns,
+        "threshold_ns": RESOLUTION_FACTOR * max(median_ns, resolution_ns),
+    }
+
+
+def calibration():
+    """Returns the result of :func:`calibrate`, which runs once per process."""
+    global _calibration  # pylint: disable=global-statement
+    if _calibration is None:
+        _calibration = calibrate()
+    return _calibration
+
+
+def correct_overhead(values, unit, mode):
+    """
+    Corrects measurements for the overhead of the timer, see :func:`calibration`.
+
+    :param values: a single measurement or a sequence of measurements
+    :param unit: the time unit of the values, see :data:`UNIT_NANOSECONDS`
+    :param mode: :data:`SUBTRACT` to subtract the minimal overhead from every value (the result
+        is at least 0), :data:`FLAG` to count the values below the resolution threshold
+    :returns: a tuple of the (corrected) values and the number of flagged values, which is None
+        when subtracting
+    :raises ValueError: for an unknown unit or mode
+    """
+    scale = UNIT_NANOSECONDS.get(unit)
+    if scale is None:
+        raise ValueError("Cannot correct the timer overhead of values in '%s'" % unit)
+    single = not hasattr(values, "__iter__")
+    sequence = [values] if single else values
+    if mode == SUBTRACT:
+        overhead = calibration()["min_ns"]
+        if scale != 1:
+            overhead /= scale
+        corrected = [max(0, val - overhead) for val in sequence]
+        return (corrected[0] if single else corrected), None
+    elif mode == FLAG:
+        threshold = calibration()["threshold_ns"] / scale
+        return values, sum(1 for val in sequence if val < threshold)
+    raise ValueError("Unknown overhead correction '%s'" % mode)
@@ -10,25 +10,39 @@ We'll probably make it more generic in the future.
 
 The data mapping is as follows:
 
-* The classname maps to an Influx Measurement
+* The classname maps to an Influx Measurement. Commas and spaces in it, e.g. in the names
+  of matrix entries like "sqlite[rows=1000,journal_mode=WAL]", are escaped
 * Sysinfo (reasonable subset of) maps to Influx Tags
 * Values of type "time series" are aggregated and mapped to Influx Fields:
   "<name>_avg", "<name>_max" and "<name>_min", where <name> is the string
   coming after "bench\_"
+* Values of type "histogram" are mapped to the fields "<name>_avr", "<name>_min",
+  "<name>_max", "<name>_stdev", "<name>_count" and "<name>_p<percentile>"
+* Values of type "distribution" are series mapped to the fields "<name>_avr", "<name>_min",
+  "<name>_max", "<name>_stdev", "<name>_mad", "<name>_count" and "<name>_p<percentile>",
+  e.g. "<name>_p99_9" for the 99.9th percentile. The percentiles default to p50, p90, p99
+  and p99.9 and can be set with the "percentiles" of the suite entry.
+* Values of type "throughput" are series of rates in "ops/s" or "bytes/s" and are
+  aggregated like time series
+* Values of type "file" refer to files next to the report and are not uploaded
+* Values of type "gc", the garbage collections recorded for the outlier attribution, and the
+  "timestamps" and "outliers" of series are not uploaded
 """
 
 import requests
-import dateutil.parser as dateparser
 import json
 import os
 import datetime
 import time
 import logging
 
-from .influxmock import InfluxMock
 from .log import customlogging
 from .exceptions import PyperfError
 from .ioservice import loadJSONData
+from .histogram import Histogram, HISTOGRAM
+from .bench import FILE
+from .attribution import GC
+from .stats import DISTRIBUTION, PERCENTILES_DEFAULT, distribution
 
 
 __docformat__ = "restructuredtext en"
@@ -42,6 +56,8 @@ __all__ = ["upload_2_influx", "InvalidReportError"]
 MSG_TMPL = "%s,%s %s %s"
 
 
+HISTOGRAM_PERCENTILES = (50, 90, 99)
+
 EPOCH = datetime.datetime(1970, 1, 1)
 MAX_UPLOAD_RETRIES = 5
 UPLOAD_SLEEP = 1
@@ -131,6 +147,7 @@ def upload_to_influxdb(lines, influxurl, database, precision):
     :return:
     """
     if os.environ.get("FAKEINFLUX", "false") == "true":
+        from .influxmock import InfluxMock
         requests.post = InfluxMock()
 
     for trial in range(MAX_UPLOAD_RETRIES+1):
@@ -163,6 +180,17 @@ def extract_hostname(sysinfo):
     raise Exception("Could not find a suitable hostname")
 
 
+def measurement(benchmark):
+    """
+    Escapes the commas and spaces of a benchmark name, so it can be used as measurement in
+    the line protocol.
+
+    :param benchmark: The name of the benchmark, e.g. of a matrix entry
+    :return: The escaped name
+    """
+    return benchmark.replace(",", "\\,").replace(" ", "\\ ")
+
+
 def fieldname(benchname):
     """
     This function strips the 'bench_' from a bench-method's name to normalize it.
@@ -193,6 +221,48 @@ def aggregate_series(bench, series):
     }
 
 
+def aggregate_histogram(bench, histogram):
+    """
+    This method extracts the statistics of a histogram.
+
+    :param bench: The bench of the histogram to aggregate
+    :param histogram: The histogram as stored in the report
+    :return: A dict containing the aggregated values of the histogram
+    """
+    fieldprefix = fieldname(bench)
+    hist = Histogram.from_dict(histogram)
+    fields = {
+        "%s_avr" % fieldprefix: hist.mean,
+        "%s_min" % fieldprefix: hist.min,
+        "%s_max" % fieldprefix: hist.max,
+        "%s_stdev" % fieldprefix: hist.stdev,
+        "%s_count" % fieldprefix: hist.count
+    }
+    for p in HISTOGRAM_PERCENTILES:
+        fields["%s_p%s" % (fieldprefix, p)] = hist.percentile(p)
+    return fields
+
+
+def aggregate_distribution(bench, series, percentiles=None):
+    """
+    This method calculates the statistics of the distribution of a series.
+
+    :param bench: The bench of the series to aggregate
+    :param series: The benches time series
+    :param percentiles: The percentiles to calculate, defaults to :data:`pyperf.stats.PERCENTILES_DEFAULT`
+    :return: A dict containing the aggregated values of the series
+    """
+    fieldprefix = fieldname(bench)
+    described = distribution(series, percentiles or PERCENTILES_DEFAULT)
+    fields = {}
+    for key, value in described.items():
+        if isinstance(key, str):
+            fields["%s_%s" % (fieldprefix, "avr" if key == "mean" else key)] = value
+        else:
+            fields["%s_p%s" % (fieldprefix, ("%g" % key).replace(".", "_"))] = value
+    return fields
+
+
 def parse_additional_values(values):
     """
     Parses the additional values and returns them as a dict.
@@ -219,6 +289,7 @@ def convert_to_timestamp(time_iso):
     :param time_iso: The date in iso-format
     :return: The epoch timestamp representation of the date
     """
+    import dateutil.parser as dateparser
     dt = dateparser.parse(time_iso)
     return "%i" % ((dt - EPOCH).total_seconds())
 
@@ -244,7 +315,8 @@ def upload_2_influx(reportpath, influxdburl, database, timestamp=None, precision
         :param timestamp: The timestamp for uploading into the Influx DB. If :code:`None`,
             the report's timestamp will be used.
         :param precision: The precision of the data. May be 's' or 'ms'
-        :param uploadconfig: The configfile containing a dictionary of systemInfos to be used as Tags in Influx
+        :param uploadconfig: The configfile containing a dictionary of systemInfos to be used as
+            Tags in Influx
         :param values: Additional values to upload
         :param add_tags: Additional tags to upload
         :param logconfig: the config file for the logging, see :ref:`howto_logging`
@@ -295,7 +367,16 @@ def upload_2_influx(reportpath, influxdburl, database, timestamp=None, precision
             for bench, bench_results in args_and_data["data"].items():
 
                 report_values = bench_results["value"]
-                if isinstance(report_values, list):
+                if bench_results.get("type") in (FILE, GC):
+                    continue
+                elif bench_results.get("type") == HISTOGRAM:
+                    if report_values["count"]:
+                        fields.update(aggregate_histogram(bench, report_values))
+                elif bench_results.get("type") == DISTRIBUTION:
+                    if report_values:
+                        fields.update(aggregate_distribution(bench, report_values,
+                                                             bench_results.get("percentiles")))
+                elif isinstance(report_values, list):
                     if report_values:
                         fields.update(aggregate_series(bench, report_values))
                 else:
@@ -306,7 +387,7 @@ def upload_2_influx(reportpath, influxdburl, database, timestamp=None, precision
             if fields:
                 fields_str = ",".join(["%s=%s" % (name, value)
                                        for name, value in fields.items()])
-                lines.append(MSG_TMPL % (benchmark, tags_str, fields_str, time_epoch))
+                lines.append(MSG_TMPL % (measurement(benchmark), tags_str, fields_str, time_epoch))
 
         if invalid_benchmarks == len(report["results"]):
             raise InvalidReportError("Report '%s' doesn't contain any result data for any benchmark."
@@ -0,0 +1,61 @@
+# -*- mode: python; coding: utf-8 -*-
+#
+# Copyright (C) 1990 - 2019 CONTACT Software GmbH
+# All rights reserved.
+# https://www.contact-software.com/
+
+import gc
+import sys
+import unittest
+
+from nose.tools import eq_, assert_raises
+from pyperf.attribution import (Attribution, GCMonitor, TelemetryMonitor, attribute, find_outliers,
+                                MAD, IQR)
+
+SAMPLES = [1.0, 1.1, 0.9, 1.0, 1.05, 0.95, 1.0, 5.0, 1.0, 6.0]
+
+
+def test_find_outliers():
+    eq_(find_outliers(SAMPLES, MAD)[1], [7, 9])
+    eq_(find_outliers(SAMPLES, IQR)[1], [7, 9])
+    eq_(find_outliers(SAMPLES, MAD, threshold=100)[1], [])
+    assert_raises(ValueError, find_outliers, SAMPLES, "zscore")
+
+
+def test_attribute():
+    # the samples end at 1, 2, ... seconds, the outliers are at 8 and 10
+    timestamps = [float(i) for i in range(1, 11)]
+    values = [value / 10 for value in SAMPLES]
+    # a collection inside the first outlier, a spike overlapping the end of the second
+    counts = attribute(values, timestamps, "seconds", [(7.7, 7.8, 2)], [(9.9, 10.5)])
+    eq_((counts["count"], counts["gc"], counts["system"], counts["unexplained"]), (2, 1, 1, 0))
+    counts = attribute(values, timestamps, "seconds", [(3.0, 3.1, 0)], [])
+    eq_((counts["count"], counts["gc"], counts["unexplained"]), (2, 0, 2))
+    eq_(counts["method"], MAD)
+    # samples without a time unit only cover their timestamp
+    counts = attribute(values, timestamps, "count", [(7.7, 7.8, 2)], [])
+    eq_(counts["gc"], 0)
+
+
+@unittest.skipIf(sys.version_info < (3, 3), "gc.callbacks requires Python 3.3")
+def test_gc_monitor():
+    clock = iter(range(100)).__next__
+    monitor = GCMonitor(clock)
+    monitor.start()
+    try:
+        gc.collect()
+    finally:
+        monitor.stop()
+    eq_(monitor.events, [(0, 1, 2)])
+    gc.collect()
+    eq_(len(monitor.events), 1)
+
+
+def test_telemetry_spikes():
+    monitor = TelemetryMonitor(lambda: 0.0, spike=50.0)
+    monitor.samples = [(0.0, 0.1, 10.0), (0.1, 0.2, 75.0), (0.2, 0.3, 50.0)]
+    eq_(monitor.spikes, [(0.1, 0.2), (0.2, 0.3)])
+
+
+def test_attribution_rejects_unknown_method():
+    assert_raises(ValueError, Attribution, method="zscore")
@@ -6,11 +6,21 @@
 # https://www.contact-software.com/
 
 
+import gc
 import unittest
 import mock
+import os
+import pstats
+import shutil
+import sys
+import tempfile
 import types
+import time
 from nose.tools import eq_
-from pyperf.bench import Bench
+from pyperf.bench import Bench, bench
+from pyperf.samples import Samples, NANOSECONDS
+from pyperf.histogram import Histogram
+from pyperf.timer import PerfTimer
 
 
 class test_class(Bench):
@@ -87,6 +97,110 @@ class TestBenchMethods(unittest.TestCase):
         self.t.storeResult(val)
         eq_(self.t.results, expected)
 
+    def test_record(self):
+        for val in (0.5, 1.5, 2.5):
+            self.t.record("bench_series", val)
+        self.t.namespace = "ns_"
+        self.t.record("bench_series", 7, unit="ns", type="latency", typecode="q")
+        entry = self.t.results["bench_series"]
+        assert isinstance(entry["value"], Samples)
+        eq_(entry["value"], [0.5, 1.5, 2.5])
+        eq_((entry["unit"], entry["type"]), ("seconds", "time_series"))
+        entry = self.t.results["ns_bench_series"]
+        eq_(entry["value"].typecode, "q")
+        eq_(entry["value"], [7])
+        eq_((entry["unit"], entry["type"]), ("ns", "latency"))
+
+    def test_record_histogram(self):
+        for val in (0.5, 1.5, 2.5):
+            self.t.record("bench_hist", val, type="histogram")
+        hist = self.t.results["bench_hist"]["value"]
+        assert isinstance(hist, Histogram)
+        eq_(hist.count, 3)
+        eq_(hist.mean, 1.5)
+
+    def test_timer_overhead(self):
+        calibration = {"min_ns": 100, "median_ns": 100, "resolution_ns": 1, "threshold_ns": 1000}
+        with mock.patch("pyperf.timer._calibration", calibration):
+            self.t.storeResult([1e-6, 2e-7], name="subtracted", overhead="subtract")
+            self.t.storeResult([1e-6, 2e-7], name="flagged", overhead="flag")
+            for val in (150, 5000, 800):
+                self.t.record("recorded", val, unit="nanoseconds", typecode=NANOSECONDS, overhead="flag")
+        eq_(self.t.results["subtracted"], {"value": [1e-6 - 1e-7, 2e-7 - 1e-7],
+                                           "unit": "seconds", "type": "time"})
+        eq_(self.t.results["flagged"]["below_resolution"], 1)
+        eq_(self.t.results["flagged"]["value"], [1e-6, 2e-7])
+        eq_(self.t.results["recorded"]["below_resolution"], 2)
+        eq_(self.t.results["recorded"]["value"], [150, 5000, 800])
+
+    def test_store_timer(self):
+        t = PerfTimer(cpu=True)
+        with t:
+            time.sleep(0.02)
+        self.t.storeResult(t, name="download")
+        seconds = t.seconds
+        with PerfTimer() as plain:
+            pass
+        self.t.storeResult(plain, name="plain")
+        for _ in range(3):
+            with t:
+                time.sleep(0.001)
+            self.t.record("downloads", t)
+        results = self.t.results
+        eq_(results["download"], {"value": seconds, "unit": "seconds", "type": "time"})
+        eq_(results["download_cpu"]["unit"], "seconds")
+        eq_(results["download_wait"]["unit"], "fraction")
+        assert results["download_wait"]["value"] > 0.5
+        eq_([key for key in results if key.startswith("plain")], ["plain"])
+        for key in ("downloads", "downloads_cpu", "downloads_wait"):
+            eq_(len(results[key]["value"]), 3)
+            eq_(results[key]["type"], "time_series")
+
+    def test_store_throughput(self):
+        t = PerfTimer()
+        t.elapsed_ns = 500000000
+        self.t.storeThroughput("download", t, items=10, nbytes=2048)
+        self.t.storeThroughput("download", 0.25, nbytes=2048)
+        self.t.storeThroughput("download", 0, items=1, nbytes=1)
+        results = self.t.results
+        eq_(results["download_ops_per_sec"], {"value": [20.0], "unit": "ops/s", "type": "throughput"})
+        eq_(results["download_bytes_per_sec"]["value"], [4096.0, 8192.0])
+        eq_(results["download_bytes_per_sec"]["unit"], "bytes/s")
+
+    def test_distribution_percentiles(self):
+        self.t.settings = {"percentiles": [50, 99.99]}
+        self.t.record("latency", 0.5, type="distribution")
+        self.t.storeResult([1, 2], name="latencies", type="distribution")
+        self.t.record("plain", 0.5)
+        eq_(self.t.results["latency"]["percentiles"], [50, 99.99])
+        eq_(self.t.results["latencies"]["percentiles"], [50, 99.99])
+        assert "percentiles" not in self.t.results["plain"]
+
+    def test_measure(self):
+        calls = []
+        samples = self.t.measure(lambda: calls.append(None), min_time=0.001,
+                                 max_time=1.0, min_samples=5)
+        result = self.t.results["test_measure"]
+        eq_(result["type"], "time_series")
+        eq_(result["value"], samples)
+        assert 5 <= len(samples) <= 1000
+        # the calls were batched to clear the minimum sample duration
+        assert len(calls) > 2 * len(samples)
+
+    def test_measure_time_cap(self):
+        sleeps = []
+
+        def slow():
+            sleeps.append(None)
+            time.sleep(0.02)
+
+        samples = self.t.measure(slow, name="slow", min_time=0.01, max_time=0.1,
+                                 rel_ci=0.0, min_samples=1000)
+        # one call per sample, stopped by the time cap
+        eq_(len(samples), len(sleeps))
+        assert len(samples) < 10
+        assert "slow" in self.t.results
+
     def test_discard(self):
         # {self.namespace + name: {"value": val, "unit": unit, "type": type}}
         val = [1, 2, 3]
@@ -97,6 +211,314 @@ class TestBenchMethods(unittest.TestCase):
         eq_(self.t.results, expected)
 
 
+class TestBenchDecorator(unittest.TestCase):
+    class DecoratedBench(Bench):
+        @bench(name="bench_decorated", unit="ms", type="time_series")
+        def decorated(self):
+            self.storeResult([1, 2])
+            self.helper()
+
+        @bench()
+        def plain(self):
+            self.storeResult(3, unit="statements", type="count")
+
+        def bench_legacy(self):
+            self.storeResult(4)
+
+        def helper(self):
+            self.storeResult(5)
+
+    def test_registry(self):
+        eq_([info.attr for info in self.DecoratedBench.benches()],
+            ["bench_legacy", "decorated", "plain"])
+        # the registry is computed once per class
+        assert self.DecoratedBench.benches() is self.DecoratedBench.benches()
+
+        class Derived(self.DecoratedBench):
+            def bench_more(self):
+                pass
+
+        eq_(len(Derived.benches()), 4)
+        eq_(len(self.DecoratedBench.benches()), 3)
+
+    def test_results(self):
+        rc, results = self.DecoratedBench().run({})
+        eq_(rc, True)
+        eq_(results, {
+            "bench_decorated": {"value": [1, 2], "unit": "ms", "type": "time_series"},
+            "helper": {"value": 5, "unit": "seconds", "type": "time"},
+            "bench_plain": {"value": 3, "unit": "statements", "type": "count"},
+            "bench_legacy": {"value": 4, "unit": "seconds", "type": "time"},
+        })
+
+
+class TestWarmup(unittest.TestCase):
+    class WarmupBench(Bench):
+        def setUpClass(self):
+            self.calls = 0
+            self.setups = 0
+
+        def setUp(self):
+            self.setups += 1
+
+        def bench_count(self):
+            self.calls += 1
+            time.sleep(0.005)
+            self.storeResult(self.calls)
+
+    def test_no_warmup(self):
+        bench = self.WarmupBench()
+        rc, results = bench.run({})
+        eq_(rc, True)
+        eq_(bench.calls, 1)
+        eq_(results["bench_count"]["value"], 1)
+
+    def test_warmup_iterations(self):
+        bench = self.WarmupBench()
+        rc, results = bench.run({}, {"warmup": {"iterations": 3}})
+        eq_(rc, True)
+        eq_(bench.calls, 4)
+        eq_(bench.setups, 4)
+        # only the measured run is recorded
+        eq_(results, {"bench_count": {"value": 4, "unit": "seconds", "type": "time"}})
+        eq_(bench.recording, True)
+
+    def test_warmup_until_stable(self):
+        bench = self.WarmupBench()
+        rc, results = bench.run({}, {"warmup": {"until_stable": True, "window": 2,
+                                                "tolerance": 10.0}})
+        eq_(rc, True)
+        # two windows of two iterations are needed to detect the steady state
+        eq_(bench.calls, 5)
+        eq_(results["bench_count"]["value"], 5)
+
+    def test_warmup_max_iterations(self):
+        bench = self.WarmupBench()
+        rc, _ = bench.run({}, {"warmup": {"until_stable": True, "window": 2,
+                                          "tolerance": -1, "max_iterations": 6}})
+        eq_(rc, True)
+        eq_(bench.calls, 7)
+
+
+class TestMemory(unittest.TestCase):
+    class MemoryBench(Bench):
+        def bench_keep(self):
+            self.kept = bytearray(4 * 1024 * 1024)
+
+        def bench_temporary(self):
+            data = bytearray(4 * 1024 * 1024)
+            del data
+
+    def setUp(self):
+        self.artifacts = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.artifacts)
+
+    @unittest.skipIf(sys.version_info < (3, 4), "tracemalloc requires Python 3.4")
+    def test_memory(self):
+        rc, results = self.MemoryBench().run({}, {"memory": True})
+        eq_(rc, True)
+        for name in ("bench_keep", "bench_temporary"):
+            for key in ("peak_bytes", "net_bytes", "rss_bytes"):
+                result = results["%s_%s" % (name, key)]
+                eq_((result["type"], result["unit"]), ("memory", "bytes"))
+            self.assertGreaterEqual(results[name + "_peak_bytes"]["value"], 4 * 1024 * 1024)
+        self.assertGreaterEqual(results["bench_keep_net_bytes"]["value"], 4 * 1024 * 1024)
+        self.assertLess(results["bench_temporary_net_bytes"]["value"], 1024 * 1024)
+        eq_("bench_keep_allocations" in results, False)
+
+    @unittest.skipIf(sys.version_info < (3, 4), "tracemalloc requires Python 3.4")
+    def test_top_allocations(self):
+        bench = self.MemoryBench()
+        bench.artifacts = os.path.join(self.artifacts, "entry")
+        rc, results = bench.run({}, {"memory": {"top": 3}})
+        eq_(rc, True)
+        result = results["bench_keep_allocations"]
+        eq_(result["type"], "file")
+        eq_(result["value"], os.path.join(self.artifacts, "entry", "bench_keep_allocations.txt"))
+        with open(result["value"]) as f:
+            content = f.read()
+        self.assertIn("#1: +", content)
+        self.assertIn("bytearray(4 * 1024 * 1024)", content)
+
+    def test_memory_disabled(self):
+        rc, results = self.MemoryBench().run({})
+        eq_(rc, True)
+        eq_(results, {})
+
+
+class TestProfile(unittest.TestCase):
+    class ProfiledBench(Bench):
+        def setUpClass(self):
+            self.calls = []
+
+        def _work(self):
+            return sum(range(1000))
+
+        def bench_profiled(self):
+            self.calls.append("profiled")
+            self.storeResult(len(self.calls))
+            self._work()
+
+        @bench(name="renamed")
+        def other(self):
+            self.calls.append("other")
+
+    def setUp(self):
+        self.artifacts = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.artifacts)
+
+    def test_profile(self):
+        bench = self.ProfiledBench()
+        bench.artifacts = self.artifacts
+        rc, results = bench.run({}, {"profile": "bench_*"})
+        eq_(rc, True)
+        # the profile pass runs after the measured pass and is not recorded
+        eq_(bench.calls, ["profiled", "other", "profiled"])
+        eq_(results["bench_profiled"]["value"], 1)
+        eq_(sorted(results), ["bench_profiled", "bench_profiled_profile"])
+        result = results["bench_profiled_profile"]
+        eq_(result["type"], "file")
+        eq_(result["value"], os.path.join(self.artifacts, "bench_profiled_profile.pstats"))
+        stats = pstats.Stats(result["value"])
+        eq_(any(func[2] == "_work" for func in stats.stats), True)
+
+    def test_profile_by_result_name(self):
+        bench = self.ProfiledBench()
+        bench.artifacts = self.artifacts
+        rc, results = bench.run({}, {"profile": "renamed"})
+        eq_(rc, True)
+        eq_(bench.calls, ["profiled", "other", "other"])
+        eq_("renamed_profile" in results, True)
+        eq_("bench_profiled_profile" in results, False)
+
+
+class TestResources(unittest.TestCase):
+    class ResourceBench(Bench):
+        def bench_cpu(self):
+            end = time.process_time() + 0.05
+            while time.process_time() < end:
+                pass
+
+        def bench_write(self):
+            with tempfile.TemporaryFile() as f:
+                f.write(b"x" * 1024 * 1024)
+                f.flush()
+                os.fsync(f.fileno())
+
+    @unittest.skipIf(sys.version_info < (3, 3), "time.process_time requires Python 3.3")
+    def test_resources(self):
+        rc, results = self.ResourceBench().run({}, {"resources": True})
+        eq_(rc, True)
+        self.assertGreaterEqual(results["bench_cpu_user_seconds"]["value"] +
+                                results["bench_cpu_system_seconds"]["value"], 0.04)
+        eq_(results["bench_cpu_user_seconds"]["type"], "resources")
+        eq_(results["bench_cpu_user_seconds"]["unit"], "seconds")
+        for key in ("voluntary_switches", "involuntary_switches"):
+            self.assertGreaterEqual(results["bench_cpu_" + key]["value"], 0)
+            eq_(results["bench_cpu_" + key]["unit"], "count")
+        if "bench_write_write_bytes" in results:
+            self.assertGreaterEqual(results["bench_write_write_syscalls"]["value"], 1)
+
+    def test_resources_exclude_other_probes(self):
+        class IdleBench(Bench):
+            def bench_idle(self):
+                time.sleep(0.01)
+
+        bench = IdleBench()
+        bench.artifacts = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, bench.artifacts)
+        rc, results = bench.run({}, {"resources": True, "sampling": {"interval": 0.001}})
+        eq_(rc, True)
+        # the profile file written by the sampler is not counted by the resource probe
+        if "bench_idle_write_bytes" in results:
+            eq_(results["bench_idle_write_bytes"]["value"], 0)
+            eq_(results["bench_idle_write_syscalls"]["value"], 0)
+
+
+class TestGCControl(unittest.TestCase):
+    class GCBench(Bench):
+        def bench_gc(self):
+            self.storeResult(int(gc.isenabled()), name="enabled", type="count", unit="count")
+
+    def test_gc_disabled(self):
+        rc, results = self.GCBench().run({}, {"gc": "disable"})
+        eq_(rc, True)
+        eq_(results["enabled"]["value"], 0)
+        eq_(gc.isenabled(), True)
+        rc, results = self.GCBench().run({}, {})
+        eq_(results["enabled"]["value"], 1)
+
+
+class TestAttribution(unittest.TestCase):
+    class SpikyBench(Bench):
+        def bench_requests(self):
+            for i in range(50):
+                with PerfTimer() as t:
+                    time.sleep(0.02 if i in (10, 30) else 0.001)
+                    if i == 30:
+                        gc.collect()
+                self.record("requests", t)
+            self.storeResult(1.0, name="plain")
+
+    def test_attribution(self):
+        rc, results = self.SpikyBench().run({}, {"attribution": {"method": "iqr"}})
+        eq_(rc, True)
+        requests = results["requests"]
+        eq_(len(requests["timestamps"]), 50)
+        eq_(list(requests["timestamps"]), sorted(requests["timestamps"]))
+        eq_(requests["outliers"]["method"], "iqr")
+        self.assertGreaterEqual(requests["outliers"]["count"], 2)
+        if hasattr(gc, "callbacks"):
+            self.assertGreaterEqual(len(results["gc_pauses"]["value"]), 1)
+            self.assertGreaterEqual(requests["outliers"]["gc"], 1)
+        assert "timestamps" not in results["plain"]
+
+    def test_attribution_with_histogram(self):
+        class HistogramBench(Bench):
+            def bench_latency(self):
+                for i in range(20):
+                    self.record("latency", 0.001 * i, type="histogram")
+                    self.record("series", 0.001 * i)
+
+        rc, results = HistogramBench().run({}, {"attribution": True})
+        eq_(rc, True)
+        # the histogram keeps no samples, so they are neither timestamped nor attributed
+        assert "timestamps" not in results["latency"]
+        assert "outliers" not in results["latency"]
+        eq_(results["latency"]["value"].count, 20)
+        eq_(len(results["series"]["timestamps"]), 20)
+        assert "outliers" in results["series"]
+
+    def test_without_attribution(self):
+        rc, results = self.SpikyBench().run({}, {})
+        assert "timestamps" not in results["requests"]
+        assert "gc_pauses" not in results
+
+
+@unittest.skipIf(sys.version_info < (3, 5), "async def requires Python 3.5")
+class TestAsync(unittest.TestCase):
+    def setUp(self):
+        testdata = os.path.join(os.path.dirname(__file__), "testdata")
+        sys.path.insert(0, testdata)
+        self.addCleanup(sys.path.remove, testdata)
+
+    def test_async_bench(self):
+        from AsyncBenchmark import AsyncBenchmark
+        bench = AsyncBenchmark()
+        rc, results = bench.run({})
+        eq_(rc, True)
+        # all hooks and tests share one event loop, which is closed afterwards
+        eq_(len(set(bench.loops)), 1)
+        eq_(len(bench.loops), 4)
+        eq_(bench.loops[0].is_closed(), True)
+        eq_(results["bench_sleep"]["value"], 1)
+        eq_(results["bench_sync"]["value"], 2)
+        eq_("bench_sync_loop_lag" in results, False)
+        lag = results["bench_blocking_loop_lag"]
+        eq_(lag["type"], "time_series")
+        self.assertGreaterEqual(max(lag["value"]), 0.03)
+
+
 class Test_ErrorHandling(unittest.TestCase):
     class TestBench(Bench):
         def bench_1(self):
@@ -5,10 +5,15 @@
 # https://www.contact-software.com/
 
 import unittest
+import json
 import os
+import shutil
+import sys
+import tempfile
 import mock
 from os.path import join
 
+from pyperf import ioservice, systemInfos
 from pyperf.benchrunner import Benchrunner
 from nose.tools import eq_
 
@@ -17,13 +22,28 @@ HERE = os.path.abspath(os.path.dirname(__file__))
 
 class TestBenchrunner(unittest.TestCase):
     outfile = "dummy_outfile.json"
+    checkpoint = "dummy_outfile.checkpoint.jsonl"
 
     def setUp(self):
         self.benchrunner = Benchrunner()
+        self.sysinfos = tempfile.mkdtemp()
+        self.sysinfo_cache = mock.patch.object(systemInfos, "CACHE_FILE",
+                                               join(self.sysinfos, "sysinfos.json"))
+        self.sysinfo_cache.start()
 
     def tearDown(self):
+        self.sysinfo_cache.stop()
+        shutil.rmtree(self.sysinfos)
         if os.path.exists(self.outfile):
             os.remove(self.outfile)
+        artifacts = os.path.splitext(self.outfile)[0] + "_files"
+        if os.path.exists(artifacts):
+            shutil.rmtree(artifacts)
+        if os.path.exists(self.checkpoint):
+            os.remove(self.checkpoint)
+        cache = join(HERE, "testdata", ".pyperf_cache")
+        if os.path.exists(cache):
+            shutil.rmtree(cache)
 
     def test_normalize_bench_path(self):
         def abspath(path):
@@ -91,3 +111,260 @@ class TestBenchrunner(unittest.TestCase):
         self.benchrunner.main(suite, self.outfile, "", False)
 
         method_mock.assert_called()
+
+    def test_parallel_run(self):
+        suite = os.path.join(HERE, "testdata", "suite_parallel.json")
+        method_mock = mock.MagicMock(wraps=self.benchrunner.start_bench_script)
+        self.benchrunner.start_bench_script = method_mock
+
+        rc = self.benchrunner.main(suite, self.outfile, "", False, jobs=2)
+
+        # the broken bench is reported, the others deliver their results
+        eq_(rc, 1)
+        results = self.benchrunner.results["results"]
+        for bench_key in ("First", "Second", "Exclusive"):
+            eq_(results[bench_key]["data"]["bench_func1"]["value"], 1)
+            eq_(results[bench_key]["data"]["bench_func2"]["value"], 2)
+        eq_(results["Broken"]["data"], {})
+
+        # only the exclusive bench was run by the runner process itself
+        method_mock.assert_called_once()
+        eq_(method_mock.call_args[0][2], "DummyBenchmark")
+
+    def test_timeout(self):
+        suite = os.path.join(HERE, "testdata", "suite_timeout.json")
+
+        rc = self.benchrunner.main(suite, self.outfile, "", False)
+
+        eq_(rc, 1)
+        results = self.benchrunner.results["results"]
+        eq_(results["MethodTimeout"]["status"], "timeout")
+        eq_(results["MethodTimeout"]["timeout"], {"method": "bench_hang", "seconds": 0.5})
+        eq_(results["Timeout"]["status"], "timeout")
+        eq_(results["Timeout"]["timeout"], {"method": None, "seconds": 0.5})
+        for bench_key in ("MethodTimeout", "Timeout"):
+            data = results[bench_key]["data"]
+            eq_(data["bench_fast"]["value"], 1)
+            eq_("bench_unreached" in data, False)
+            if os.name == "posix":
+                # the terminated worker hands over the results of the hanging method
+                eq_(data["bench_hang"]["value"], 2)
+
+        # the suite goes on after a timeout
+        eq_("status" in results["Next"], False)
+        eq_(results["Next"]["data"]["bench_func1"]["value"], 1)
+
+    def test_fixtures(self):
+        suite = os.path.join(HERE, "testdata", "suite_fixtures.json")
+
+        rc = self.benchrunner.main(suite, self.outfile, "", False)
+
+        # the bench with the unknown fixture fails
+        eq_(rc, 1)
+        results = self.benchrunner.results
+        eq_(results["results"]["Unknown"]["data"], {})
+        eq_(results["results"]["First"]["data"]["bench_fixture"]["value"], "db")
+        eq_(results["results"]["Second"]["data"]["bench_fixture"]["value"], "db")
+
+        # the shared fixture is set up once and torn down after its last user,
+        # the unused fixture is not set up at all
+        events = sys.modules["FixtureBenchmark"].EVENTS
+        eq_(events, ["setUp", "bench", "bench", "tearDown"])
+        eq_(sorted(results["fixtures"]), ["shared"])
+        eq_(sorted(results["fixtures"]["shared"]), ["setup", "teardown"])
+        # the bench which could not run is in the checkpoint, too
+        lines = ioservice.loadJSONLines(self.checkpoint)
+        eq_(sorted(line["name"] for line in lines), ["First", "Second", "Unknown", "Without"])
+
+    def test_fixtures_partially_set_up(self):
+        suite = os.path.join(HERE, "testdata", "suite_fixtures_partial.json")
+        if "FixtureBenchmark" in sys.modules:
+            del sys.modules["FixtureBenchmark"].EVENTS[:]
+
+        eq_(self.benchrunner.main(suite, self.outfile, "", False), 1)
+
+        # "Partial" set up the shared fixture before its unknown fixture failed, the shared
+        # fixture is still torn down after its last real user
+        events = sys.modules["FixtureBenchmark"].EVENTS
+        try:
+            eq_(events, ["setUp", "bench", "tearDown", "plain"])
+        finally:
+            del events[:]
+
+    def test_expand_matrix(self):
+        entry = {"file": "bench.py", "className": "Bench", "active": True,
+                 "matrix": {"rows": [1, 2], "flag": True, "mode": ["a", "b"]},
+                 "args": {"rows": 0, "other": 3}}
+        entries = self.benchrunner.expand_matrix("sqlite", entry)
+        eq_([name for name, _ in entries], ["sqlite[rows=1,flag=true,mode=a]",
+                                            "sqlite[rows=1,flag=true,mode=b]",
+                                            "sqlite[rows=2,flag=true,mode=a]",
+                                            "sqlite[rows=2,flag=true,mode=b]"])
+        eq_(entries[1][1], {"file": "bench.py", "className": "Bench", "active": True,
+                            "args": {"rows": 1, "flag": True, "mode": "b", "other": 3}})
+        # the entry itself is left unchanged
+        eq_(entry["args"], {"rows": 0, "other": 3})
+        eq_(self.benchrunner.expand_matrix("plain", {"args": {}}), [("plain", {"args": {}})])
+        eq_(self.benchrunner.expand_matrix("empty", {"matrix": {"rows": []}, "args": {}}), [])
+
+    def test_matrix_run(self):
+        suite = os.path.join(HERE, "testdata", "suite_matrix.json")
+
+        rc = self.benchrunner.main(suite, self.outfile, "", False)
+
+        eq_(rc, 0)
+        results = self.benchrunner.results["results"]
+        entry = results["Sweep[rows=10000,journal_mode=WAL]"]
+        eq_(entry["args"], {"rows": 10000, "journal_mode": "WAL", "tablename": "sweep"})
+        eq_(entry["data"]["bench_func1"]["value"], 1)
+        eq_(len([key for key in results if key.startswith("Sweep[")]), 4)
+
+    def test_artifact_dir(self):
+        eq_(self.benchrunner.artifact_dir("sqlite[rows=1]"), "")
+        self.benchrunner.artifacts = join("out", "report_files")
+        eq_(self.benchrunner.artifact_dir("sqlite[rows=1,mode=a b/c]"),
+            join("out", "report_files", "sqlite[rows=1,mode=a_b_c]"))
+
+    def test_profile(self):
+        suite = os.path.join(HERE, "testdata", "suite_parallel.json")
+
+        self.benchrunner.main(suite, self.outfile, "", False, profile="First")
+
+        results = self.benchrunner.results["results"]
+        # all bench methods of the matching entry are profiled, the others are not
+        for bench in ("bench_func1", "bench_func2"):
+            path = results["First"]["data"][bench + "_profile"]["value"]
+            eq_(path, join("dummy_outfile_files", "First", bench + "_profile.pstats"))
+            eq_(os.path.exists(path), True)
+        eq_(sorted(results["Second"]["data"]), ["bench_func1", "bench_func2"])
+
+        self.benchrunner.main(suite, self.outfile, "", False, profile="bench_func2")
+
+        eq_(sorted(results["Second"]["data"]), ["bench_func1", "bench_func2", "bench_func2_profile"])
+
+    def test_environment(self):
+        suite = os.path.join(HERE, "testdata", "suite_environment.json")
+
+        with mock.patch.dict(os.environ):
+            with mock.patch.object(self.benchrunner, "start_bench_script",
+                                   return_value=(True, {})) as start:
+                self.benchrunner.main(suite, self.outfile, "", False)
+            eq_(os.environ["PYTHONHASHSEED"], "0")
+
+        sysinfos = self.benchrunner.results["Sysinfos"]
+        eq_(sysinfos["env_hashseed"], "0")
+        eq_(sysinfos["env_gc"], "disable")
+        # the gc setting of the suite is the default of the entries
+        eq_(start.call_args[0][4]["gc"], "disable")
+
+    def test_resume(self):
+        suite = os.path.join(HERE, "testdata", "suite_parallel.json")
+
+        self.benchrunner.main(suite, self.outfile, "", False)
+        lines = ioservice.loadJSONLines(self.checkpoint)
+        eq_([line["name"] for line in lines], ["First", "Second", "Exclusive", "Broken"])
+        eq_([line["rc"] for line in lines], [True, True, True, False])
+        first = lines[0]["data"]
+
+        # "Second" was killed while it was written, "Exclusive" changed its args
+        with open(self.checkpoint, "w") as fd:
+            fd.write(json.dumps(lines[0]) + "\n")
+            fd.write(json.dumps(dict(lines[2], args={"rows": 1})) + "\n")
+            fd.write(json.dumps(lines[1])[:20])
+
+        runner = Benchrunner()
+        with mock.patch.object(runner, "start_bench_script",
+                               wraps=runner.start_bench_script) as start:
+            rc = runner.main(suite, self.outfile, "", False, resume=self.checkpoint)
+        eq_(rc, 1)
+        eq_(sorted(call[0][2] for call in start.call_args_list),
+            ["Benchmark", "DummyBenchmark", "DummyBenchmark"])
+        eq_(runner.results["results"]["First"]["data"], first)
+        names = [line["name"] for line in ioservice.loadJSONLines(self.checkpoint)]
+        eq_(names, ["First", "Exclusive", "Second", "Exclusive", "Broken"])
+
+    def test_resume_unsorted_args(self):
+        # the checkpoint is written with sorted keys, the args of the suite are not sorted
+        suite = os.path.join(HERE, "testdata", "suite_resume.json")
+        eq_(self.benchrunner.main(suite, self.outfile, "", False), 1)
+
+        runner = Benchrunner()
+        with mock.patch.object(runner, "start_bench_script",
+                               wraps=runner.start_bench_script) as start:
+            eq_(runner.main(suite, self.outfile, "", False, resume=self.checkpoint), 1)
+        eq_([call[0][2] for call in start.call_args_list], ["Benchmark"])
+
+    def test_checkpoint_removed_on_success(self):
+        suite = os.path.join(HERE, "testdata", "dummy.json")
+        eq_(self.benchrunner.main(suite, self.outfile, "", False), 0)
+        eq_(os.path.exists(self.outfile), True)
+        eq_(os.path.exists(self.checkpoint), False)
+
+    def test_no_sysinfo_cache(self):
+        suite = os.path.join(HERE, "testdata", "dummy.json")
+        eq_(self.benchrunner.main(suite, self.outfile, "", False, use_sysinfo_cache=False), 0)
+        eq_(os.path.exists(systemInfos.CACHE_FILE), False)
+        eq_(Benchrunner().main(suite, self.outfile, "", False), 0)
+        assert os.path.exists(systemInfos.CACHE_FILE)
+        with mock.patch.object(systemInfos, "VMInfo", return_value={"vm": "Maybe"}):
+            eq_(Benchrunner().main(suite, self.outfile, "", False, use_sysinfo_cache=False), 0)
+        with open(self.outfile) as f:
+            eq_(json.load(f)["Sysinfos"]["vm"], "Maybe")
+
+    def test_resume_missing_checkpoint(self):
+        suite = os.path.join(HERE, "testdata", "suite_parallel.json")
+        missing = os.path.join(HERE, "testdata", "missing.checkpoint.jsonl")
+        runner = Benchrunner()
+        with mock.patch.object(runner, "start_bench_script") as start:
+            eq_(runner.main(suite, self.outfile, "", False, resume=missing), 1)
+        eq_(start.call_count, 0)
+
+    def test_cache(self):
+        suite = os.path.join(HERE, "testdata", "suite_cache.json")
+
+        self.benchrunner.main(suite, self.outfile, "", False)
+        first = self.benchrunner.results["results"]["Cached"]["data"]
+        eq_("cached" in self.benchrunner.results["results"]["Cached"], False)
+
+        runner = Benchrunner()
+        with mock.patch.object(runner, "start_bench_script",
+                               wraps=runner.start_bench_script) as start:
+            eq_(runner.main(suite, self.outfile, "", False), 0)
+        eq_(start.call_count, 1)
+        results = runner.results["results"]
+        eq_(results["Cached"]["cached"], True)
+        eq_(results["Cached"]["data"], first)
+        eq_("cached" in results["Uncached"], False)
+
+        runner = Benchrunner()
+        with mock.patch.object(runner, "start_bench_script",
+                               wraps=runner.start_bench_script) as start:
+            runner.main(suite, self.outfile, "", False, use_cache=False)
+        eq_(start.call_count, 2)
+        eq_("cached" in runner.results["results"]["Cached"], False)
+
+    def test_cache_fixtures(self):
+        suite = os.path.join(HERE, "testdata", "suite_cache_fixtures.json")
+        data = {"fixtures": {"shared": {"file": "FixtureBenchmark.py", "className": "SharedFixture",
+                                        "args": {"name": "db"}}},
+                "suite": {"Cached": {"file": "FixtureBenchmark.py", "className": "FixtureBenchmark",
+                                     "fixtures": ["shared"], "cache": True, "args": {}}}}
+        try:
+            ioservice.saveJSONData(data, suite)
+            eq_(self.benchrunner.main(suite, self.outfile, "", False), 0)
+
+            runner = Benchrunner()
+            eq_(runner.main(suite, self.outfile, "", False), 0)
+            eq_(runner.results["results"]["Cached"]["cached"], True)
+
+            # a changed fixture invalidates the cached results
+            data["fixtures"]["shared"]["args"]["name"] = "other"
+            ioservice.saveJSONData(data, suite)
+            runner = Benchrunner()
+            eq_(runner.main(suite, self.outfile, "", False), 0)
+            results = runner.results["results"]["Cached"]
+            eq_("cached" in results, False)
+            eq_(results["data"]["bench_fixture"]["value"], "other")
+        finally:
+            os.remove(suite)
+            del sys.modules["FixtureBenchmark"].EVENTS[:]
@@ -0,0 +1,68 @@
+# -*- mode: python; coding: utf-8 -*-
+#
+# Copyright (C) 1990 - 2019 CONTACT Software GmbH
+# All rights reserved.
+# https://www.contact-software.com/
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import mock
+from nose.tools import eq_
+from pyperf import cache
+from pyperf.cache import ResultCache
+from pyperf.samples import Samples
+
+HERE = os.path.abspath(os.path.dirname(__file__))
+BENCH = os.path.join(HERE, "testdata", "DummyBenchmark.py")
+SYSINFOS = {"cpu": "x86_64", "os": "linux", "time": "2019-01-01T00:00:00", "env_gc": "disable"}
+
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = ResultCache(self.directory, SYSINFOS)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_key(self):
+        entry = {"file": "DummyBenchmark.py", "className": "DummyBenchmark", "args": {"rows": 1}}
+        key = self.cache.key(BENCH, entry)
+        eq_(key, self.cache.key(BENCH[:-3], dict(entry, active=True, cache={"max_age": 1})))
+        assert key != self.cache.key(BENCH, dict(entry, args={"rows": 2}))
+        assert key != self.cache.key(BENCH, dict(entry, warmup={"iterations": 1}))
+        assert key != ResultCache(self.directory, dict(SYSINFOS, env_gc="freeze")).key(BENCH, entry)
+        # the time of the run does not matter
+        eq_(key, ResultCache(self.directory, dict(SYSINFOS, time="now")).key(BENCH, entry))
+        eq_(self.cache.key(os.path.join(HERE, "missing.py"), entry), None)
+
+    def test_key_fixtures(self):
+        entry = {"file": "DummyBenchmark.py", "className": "DummyBenchmark", "args": {},
+                 "fixtures": ["shared"]}
+        definition = {"file": "FixtureBenchmark.py", "className": "SharedFixture",
+                      "args": {"name": "db"}}
+        fixture = os.path.join(HERE, "testdata", "FixtureBenchmark.py")
+        key = self.cache.key(BENCH, entry, {"shared": (fixture, definition)})
+        assert key != self.cache.key(BENCH, entry)
+        assert key != self.cache.key(BENCH, entry, {"shared": (fixture, dict(definition, args={}))})
+        # the source of the fixture is part of the key
+        assert key != self.cache.key(BENCH, entry, {"shared": (BENCH, definition)})
+        eq_(self.cache.key(BENCH, entry, {"shared": (os.path.join(HERE, "missing.py"), definition)}),
+            None)
+
+    def test_store_and_load(self):
+        eq_(self.cache.load("abc", 60), None)
+        self.cache.store("abc", {"bench_x": {"value": Samples([1.0, 2.0]), "unit": "s", "type": "time"}})
+        eq_(self.cache.load("abc", 60)["bench_x"]["value"], [1.0, 2.0])
+        with mock.patch("time.time", return_value=time.time() + 61):
+            eq_(self.cache.load("abc", 60), None)
+
+    def test_max_age(self):
+        eq_(cache.max_age(None), None)
+        eq_(cache.max_age(False), None)
+        eq_(cache.max_age(True), cache.MAX_AGE_DEFAULT)
+        eq_(cache.max_age({"max_age": 3600}), 3600)
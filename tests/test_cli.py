@@ -40,12 +40,16 @@ class RunnerTest(unittest.TestCase):
     def tearDown(self):
         if os.path.exists(self.REPORTFILE):
             os.remove(self.REPORTFILE)
+        checkpoint = os.path.splitext(self.REPORTFILE)[0] + ".checkpoint.jsonl"
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
 
     def test_trivial_run(self):
         cmdline = ["python"] + coverage_opts() + [
             BENCH, "run",
             "--suite", SUITE,
-            "-o", self.REPORTFILE
+            "-o", self.REPORTFILE,
+            "--no-sysinfo-cache"
         ]
         proc = subprocess.Popen(cmdline, stdout=subprocess.PIPE, stderr=DEVNULL)
 
@@ -85,7 +89,8 @@ class RunnerTest(unittest.TestCase):
             BENCH, "run",
             "--suite", SUITE,
             "-o", self.REPORTFILE,
-            "--verbose"
+            "--verbose",
+            "--no-sysinfo-cache"
         ]
         rc = subprocess.call(cmdline, stdout=DEVNULL, stderr=DEVNULL)
 
@@ -101,7 +106,8 @@ class RunnerTest(unittest.TestCase):
         cmdline = ["python"] + coverage_opts() + [
             BENCH, "run",
             "--suite", SUITE_BROKEN,
-            "-o", self.REPORTFILE
+            "-o", self.REPORTFILE,
+            "--no-sysinfo-cache"
         ]
         rc = subprocess.call(cmdline, stdout=DEVNULL, stderr=DEVNULL)
         assert_not_equals(rc, 0)
@@ -110,7 +116,8 @@ class RunnerTest(unittest.TestCase):
         cmdline = ["python"] + coverage_opts() + [
             BENCH, "run",
             "--suite", SUITE_BENCH_BROKEN,
-            "-o", self.REPORTFILE
+            "-o", self.REPORTFILE,
+            "--no-sysinfo-cache"
         ]
         rc = subprocess.call(cmdline, stdout=DEVNULL, stderr=DEVNULL)
         assert_not_equals(rc, 0)
@@ -185,13 +192,17 @@ class Test_Integration(unittest.TestCase):
             BENCH,
             "run",
             "--suite", os.path.join(DATADIR, "dummy.json"),
-            "-o", self.REPORTFILE
+            "-o", self.REPORTFILE,
+            "--no-sysinfo-cache"
         ]
         subprocess.check_call(cmdline, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
 
     def tearDown(self):
         if os.path.exists(self.REPORTFILE):
             os.remove(self.REPORTFILE)
+        checkpoint = os.path.splitext(self.REPORTFILE)[0] + ".checkpoint.jsonl"
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
 
     def test_upload(self):
         rc = subprocess.check_call(["python"] + coverage_opts() + [
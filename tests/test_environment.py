@@ -0,0 +1,59 @@
+# -*- mode: python; coding: utf-8 -*-
+#
+# Copyright (C) 1990 - 2019 CONTACT Software GmbH
+# All rights reserved.
+# https://www.contact-software.com/
+
+import gc
+import os
+import mock
+
+from nose.tools import eq_, assert_raises
+from pyperf import environment
+from pyperf.environment import GCControl, GC_COLLECT, GC_DISABLE, GC_FREEZE
+
+
+def test_gc_control():
+    assert_raises(ValueError, GCControl, "off")
+    for mode in (GC_DISABLE, GC_FREEZE):
+        control = GCControl(mode)
+        control.start()
+        eq_(gc.isenabled(), False)
+        control.stop()
+        eq_(gc.isenabled(), True)
+    control = GCControl(GC_COLLECT)
+    with mock.patch("gc.collect") as collect:
+        control.start()
+        eq_(gc.isenabled(), True)
+        control.stop()
+    eq_(collect.call_count, 1)
+
+
+def test_gc_control_keeps_disabled_gc():
+    gc.disable()
+    try:
+        control = GCControl(GC_DISABLE)
+        control.start()
+        control.stop()
+        eq_(gc.isenabled(), False)
+    finally:
+        gc.enable()
+
+
+def test_apply_environment():
+    with mock.patch.dict(os.environ):
+        settings = {"hashseed": 42, "gc": "freeze"}
+        if hasattr(os, "sched_getaffinity"):
+            settings["affinity"] = sorted(os.sched_getaffinity(0))
+        applied = environment.apply_environment(settings)
+        eq_(os.environ["PYTHONHASHSEED"], "42")
+    eq_(applied["hashseed"], "42")
+    eq_(applied["gc"], GC_FREEZE if hasattr(gc, "freeze") else GC_DISABLE)
+    eq_(applied.get("affinity"), settings.get("affinity"))
+    eq_(environment.sysinfos(applied)["env_hashseed"], "42")
+
+
+def test_apply_environment_skips_failures():
+    with mock.patch("psutil.Process.nice", side_effect=OSError("denied")):
+        applied = environment.apply_environment({"nice": -20, "gc": "off"})
+    eq_(applied, {})
@@ -0,0 +1,76 @@
+# -*- mode: python; coding: utf-8 -*-
+#
+# Copyright (C) 1990 - 2019 CONTACT Software GmbH
+# All rights reserved.
+# https://www.contact-software.com/
+
+import random
+from nose.tools import eq_, raises
+from pyperf import stats
+from pyperf.histogram import Histogram
+
+
+def _values(n, seed=42):
+    rnd = random.Random(seed)
+    return [rnd.lognormvariate(-7, 1) for _ in range(n)]
+
+
+def test_statistics():
+    values = _values(10000)
+    hist = Histogram()
+    for val in values:
+        hist.add(val)
+    eq_(hist.count, len(values))
+    eq_(hist.min, min(values))
+    eq_(hist.max, max(values))
+    assert abs(hist.mean - stats.mean(values)) < 1e-12
+    assert abs(hist.stdev - stats.stdev(values)) < 1e-12
+
+
+def test_percentiles():
+    values = sorted(_values(10000))
+    hist = Histogram(precision=0.01)
+    for val in values:
+        hist.add(val)
+    for p in (1, 50, 90, 99, 99.9):
+        exact = values[int(p / 100.0 * len(values)) - 1]
+        assert abs(hist.percentile(p) - exact) <= 0.011 * exact, p
+    eq_(hist.percentile(0), hist.min)
+    eq_(hist.percentile(100), hist.max)
+    eq_(Histogram().percentile(50), None)
+
+
+def test_bounded_memory():
+    hist = Histogram()
+    for val in _values(100000):
+        hist.add(val)
+    # the number of buckets depends on the range of the values only
+    assert len(hist.buckets) < 1500
+
+
+def test_merge():
+    values = _values(2000)
+    left, right, both = Histogram(), Histogram(), Histogram()
+    for i, val in enumerate(values):
+        (left if i % 3 else right).add(val)
+        both.add(val)
+    left.merge(right)
+    eq_(left.count, both.count)
+    eq_(left.buckets, both.buckets)
+    eq_((left.min, left.max), (both.min, both.max))
+    assert abs(left.mean - both.mean) < 1e-12
+    assert abs(left.stdev - both.stdev) < 1e-12
+
+
+@raises(ValueError)
+def test_merge_incompatible():
+    Histogram(precision=0.01).merge(Histogram(precision=0.1))
+
+
+def test_roundtrip():
+    hist = Histogram()
+    for val in _values(100):
+        hist.add(val)
+    copy = Histogram.from_dict(hist.to_dict())
+    eq_(copy.to_dict(), hist.to_dict())
+    eq_(copy.percentile(90), hist.percentile(90))
@@ -0,0 +1,75 @@
+# -*- mode: python; coding: utf-8 -*-
+#
+# Copyright (C) 1990 - 2019 CONTACT Software GmbH
+# All rights reserved.
+# https://www.contact-software.com/
+
+import os
+import subprocess
+import sys
+import unittest
+
+from nose.tools import eq_, assert_raises
+from pyperf import importtime
+from pyperf.exceptions import PyperfError
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+OUTPUT = """import time: self [us] | cumulative | imported package
+import time:      1660 |      42577 | site
+import time:       173 |        173 |   pyperf
+import time:      1956 |       4946 | pyperf.benchmark
+import time:      4279 |       4279 |       psutil._ntuples
+import time:      7172 |      70687 | pyperf.benchrunner
+Traceback (most recent call last):
+"""
+
+
+def test_parse_importtime():
+    times = importtime.parse_importtime(OUTPUT)
+    eq_(set(times), {"site", "pyperf", "pyperf.benchmark", "psutil._ntuples", "pyperf.benchrunner"})
+    eq_(times["pyperf"], (173, 173, 1))
+    eq_(times["psutil._ntuples"].depth, 3)
+    eq_(times["pyperf.benchrunner"].cumulative_us, 70687)
+
+
+def test_import_seconds():
+    times = importtime.parse_importtime(OUTPUT)
+    # neither the startup nor the nested parent package are counted
+    eq_(importtime.import_seconds(times, ["pyperf.benchmark", "pyperf.benchrunner"]), 0.075633)
+    eq_(importtime.import_seconds(times, ["pyperf.missing"]), 0)
+
+
+@unittest.skipIf(sys.version_info < (3, 7), "-X importtime requires Python 3.7")
+def test_measure_imports():
+    cwd = os.getcwd()
+    os.chdir(ROOT)
+    try:
+        times = importtime.measure_imports(["pyperf.timer"])
+        eq_(times["pyperf.timer"].depth, 0)
+        assert importtime.import_seconds(times, ["pyperf.timer"]) > 0
+        assert_raises(PyperfError, importtime.measure_imports, ["pyperf.missing"])
+    finally:
+        os.chdir(cwd)
+
+
+def test_lazy_imports():
+    # starting "pyperf run" and importing a bench must not load the heavy dependencies of
+    # the other subcommands and of the optional features
+    code = ("import sys, pyperf.__main__, pyperf.bench; "
+            "print(' '.join(sorted(sys.modules)))")
+    output = subprocess.check_output([sys.executable, "-c", code], cwd=ROOT)
+    modules = set(output.decode("ascii").split())
+    eq_(modules & {"asyncio", "psutil", "requests", "dateutil", "ctypes", "numpy", "cProfile",
+                   "multiprocessing", "tracemalloc"}, set())
+
+
+def test_lazy_imports_benchrunner():
+    # the benchrunner needs psutil for the Sysinfos, but multiprocessing only for the
+    # worker processes
+    code = ("import sys, pyperf.benchrunner; "
+            "print(' '.join(sorted(sys.modules)))")
+    output = subprocess.check_output([sys.executable, "-c", code], cwd=ROOT)
+    modules = set(output.decode("ascii").split())
+    eq_(modules & {"asyncio", "requests", "dateutil", "ctypes", "numpy", "cProfile",
+                   "multiprocessing", "pyperf.cache"}, set())
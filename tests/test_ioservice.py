@@ -7,10 +7,12 @@
 import unittest
 import logging
 import os
+import json
 from pyperf import ioservice
 from nose.tools import eq_
 from shutil import rmtree
 from pyperf.exceptions import PyperfError
+from pyperf.samples import Samples
 
 logger = logging.getLogger("Foo")
 
@@ -69,6 +71,32 @@ class Testioservice(unittest.TestCase):
         filePath = os.path.join(os.getcwd(), "tests", "tmpdir", "foobar.json")
         self.assertRaises(PyperfError, ioservice.saveJSONData, noJSON, filePath)
 
+    def test_saveJSONData_samples(self):
+        filePath = os.path.join(os.getcwd(), "tests", "tmpdir", "samples.json")
+        data = {"results": {"bench_a": {"value": Samples([0.5, 1.0, float("inf")]), "type": "time_series"},
+                            "bench_b": {"value": Samples(range(10000), typecode="q"), "type": "count"},
+                            "bench_c": {"value": Samples(), "type": "time_series"}}}
+        self.assertTrue(ioservice.saveJSONData(data, filePath))
+        loaded = ioservice.loadJSONData(filePath)
+        eq_(loaded["results"]["bench_a"]["value"], [0.5, 1.0, float("inf")])
+        eq_(loaded["results"]["bench_b"]["value"], list(range(10000)))
+        eq_(loaded["results"]["bench_c"]["value"], [])
+
+    def test_iterencode_like_json(self):
+        data = {"b": [1, {"x": None, "y": u"\u00fc"}], "a": {}, "c": [], "d": (1.5, "text")}
+        eq_(u"".join(ioservice.iterencode(data)),
+            json.dumps(data, sort_keys=True, indent=4, separators=(",", ": "), ensure_ascii=False))
+
+    def test_appendJSONLine(self):
+        filePath = os.path.join(self.tmpdir, "lines.jsonl")
+        ioservice.appendJSONLine({"name": "a", "data": {"value": Samples([0.5, 1.0])}}, filePath)
+        # a line which cannot be encoded is terminated and skipped
+        self.assertRaises(PyperfError, ioservice.appendJSONLine, {"name": "b", "data": object()},
+                          filePath)
+        ioservice.appendJSONLine({"name": "c", "data": Samples(range(3), typecode="q")}, filePath)
+        eq_(ioservice.loadJSONLines(filePath), [{"data": {"value": [0.5, 1.0]}, "name": "a"},
+                                                {"data": [0, 1, 2], "name": "c"}])
+
     def test_readFile(self):
         filePath = os.path.join(os.getcwd(), "tests", "testdata", "plain_textfile.txt")
         data = ioservice.readFile(filePath)
@@ -0,0 +1,80 @@
+# -*- mode: python; coding: utf-8 -*-
+#
+# Copyright (C) 1990 - 2019 CONTACT Software GmbH
+# All rights reserved.
+# https://www.contact-software.com/
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from nose.tools import eq_
+
+from pyperf.bench import Bench
+from pyperf.sampler import SamplingProfiler, WALL
+
+
+def _busy(seconds):
+    end = time.time() + seconds
+    while time.time() < end:
+        pass
+
+
+class TestSamplingProfiler(unittest.TestCase):
+    def test_main_thread(self):
+        profiler = SamplingProfiler(interval=0.001)
+        profiler.start()
+        _busy(0.2)
+        stacks = profiler.stop()
+        self.assertGreater(profiler.samples, 5)
+        eq_(any(stack.endswith("_busy (test_sampler.py:20)") for stack in stacks), True)
+        # the root of the stack comes first
+        eq_(all(";" in stack for stack in stacks), True)
+
+    def test_other_thread(self):
+        profiler = SamplingProfiler(interval=0.001, mode=WALL)
+
+        def target():
+            profiler.start()
+            _busy(0.2)
+            profiler.stop()
+
+        thread = threading.Thread(target=target)
+        thread.start()
+        thread.join()
+        self.assertGreater(profiler.samples, 5)
+        eq_(any("target (test_sampler.py:" in stack for stack in profiler.stacks), True)
+
+    def test_format(self):
+        profiler = SamplingProfiler()
+        profiler.stacks.update({"a (x.py:1);b (x.py:5)": 3, "a (x.py:1)": 2})
+        eq_(profiler.format(), "a (x.py:1) 2\na (x.py:1);b (x.py:5) 3\n")
+
+    def test_unknown_mode(self):
+        self.assertRaises(ValueError, SamplingProfiler, mode="gpu")
+
+
+class TestSamplingBench(unittest.TestCase):
+    class HotBench(Bench):
+        def bench_hot(self):
+            _busy(0.2)
+
+    def setUp(self):
+        self.artifacts = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.artifacts)
+
+    def test_sampling(self):
+        bench = self.HotBench()
+        bench.artifacts = self.artifacts
+        rc, results = bench.run({}, {"sampling": {"interval": 0.001}})
+        eq_(rc, True)
+        result = results["bench_hot_stacks"]
+        eq_(result["type"], "file")
+        eq_(result["value"], os.path.join(self.artifacts, "bench_hot_stacks.folded"))
+        with open(result["value"]) as f:
+            lines = f.read().splitlines()
+        self.assertGreater(sum(int(line.rsplit(" ", 1)[1]) for line in lines), 5)
+        eq_(any("bench_hot (test_sampler.py:" in line for line in lines), True)
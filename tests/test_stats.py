@@ -0,0 +1,53 @@
+# -*- mode: python; coding: utf-8 -*-
+#
+# Copyright (C) 1990 - 2019 CONTACT Software GmbH
+# All rights reserved.
+# https://www.contact-software.com/
+
+from nose.tools import eq_
+from pyperf import stats
+
+
+def test_mean_and_stdev():
+    eq_(stats.mean([1, 2, 3, 4]), 2.5)
+    assert abs(stats.stdev([2, 4, 4, 4, 5, 5, 7, 9]) ** 2 - 32.0 / 7) < 1e-9
+    eq_(stats.stdev([1]), 0.0)
+
+
+def test_relative_ci():
+    eq_(stats.relative_ci([1]), float("inf"))
+    eq_(stats.relative_ci([0, 0]), float("inf"))
+    eq_(stats.relative_ci([5, 5, 5]), 0.0)
+    assert stats.relative_ci([1, 2, 1, 2]) > stats.relative_ci([1, 2, 1, 2] * 10)
+
+
+def test_is_steady():
+    # not enough values
+    assert not stats.is_steady([1, 1, 1], 2, 0.1)
+    # decreasing runtimes, e.g. caused by cold caches
+    assert not stats.is_steady([10, 8, 4, 2], 2, 0.1)
+    assert stats.is_steady([10, 8, 2.05, 2, 2, 2.05], 2, 0.1)
+    assert stats.is_steady([0, 0, 0, 0], 2, 0.1)
+
+
+def test_percentile_and_mad():
+    values = list(range(1, 11))
+    eq_(stats.percentile(values, 0), 1)
+    eq_(stats.percentile(values, 50), 5.5)
+    eq_(stats.percentile(values, 100), 10)
+    assert abs(stats.percentile(values, 90) - 9.1) < 1e-9
+    # the outlier does not change the median absolute deviation
+    eq_(stats.mad([1, 2, 3, 4, 1000]), 1)
+
+
+def test_distribution():
+    values = [float(val) for val in range(1000, 0, -1)]
+    result = stats.distribution(values)
+    eq_(result["count"], 1000)
+    eq_(result["min"], 1.0)
+    eq_(result["max"], 1000.0)
+    eq_(result["mean"], 500.5)
+    eq_(result["mad"], 250.0)
+    eq_(sorted(key for key in result if not isinstance(key, str)), [50, 90, 99, 99.9])
+    assert abs(result[99.9] - 999.001) < 1e-6
+    eq_(set(stats.distribution([1, 2], [10])), set(["mean", "min", "max", "stdev", "mad", "count", 10]))
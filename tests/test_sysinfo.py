@@ -5,12 +5,28 @@
 # https://www.contact-software.com/
 
 from pyperf import systemInfos as si
+from pyperf.exceptions import PyperfError
+from nose.tools import eq_
+import mock
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
 import unittest
 
 
 def test_getAllSysInfos():
-    sysinfos_verbose = si.getAllSysInfos(verbose=True)
-    sysinfos_sparse = si.getAllSysInfos(verbose=False)
+    directory = tempfile.mkdtemp()
+    try:
+        with mock.patch.object(si, "CACHE_FILE", os.path.join(directory, "sysinfos.json")):
+            sysinfos_verbose = si.getAllSysInfos(verbose=True)
+            sysinfos_sparse = si.getAllSysInfos(verbose=False)
+            # the default cache is looked up when the infos are collected
+            assert os.path.exists(si.CACHE_FILE)
+    finally:
+        shutil.rmtree(directory)
 
     assert sysinfos_verbose
     assert sysinfos_sparse
@@ -27,8 +43,76 @@ def test_matchVersion():
         assert inputs[ver] == si.matchVersion(ver)
 
 
+def test_checkOutput():
+    eq_(si.checkOutput([sys.executable, "-c", "print('out')"], 10.0).strip(), b"out")
+    start = time.time()
+    try:
+        si.checkOutput([sys.executable, "-c", "import time; time.sleep(30)"], 0.2)
+    except PyperfError as e:
+        assert "did not finish" in e.message, e.message
+    else:
+        raise AssertionError("the command was not killed")
+    assert time.time() - start < 10.0
+    try:
+        si.checkOutput([sys.executable, "-c", "import sys; sys.exit(3)"], 10.0)
+    except PyperfError as e:
+        assert "exit code 3" in e.message, e.message
+    else:
+        raise AssertionError("the failure was not reported")
+
+
 # TODO: Probably the production code should tolerate that
 @unittest.skip("Failes on CI (no traceroute in container)")
 def test_traceroute():
     routes = si.traceroute("localhost")
     assert routes
+
+
+class TestProbes(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cachefile = os.path.join(self.directory, "pyperf", "sysinfos.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_static_infos_are_cached(self):
+        first = si.getAllSysInfos(False, self.cachefile)
+        assert os.path.exists(self.cachefile)
+        with mock.patch.object(si, "VMInfo", side_effect=AssertionError("not cached")):
+            second = si.getAllSysInfos(False, self.cachefile)
+        eq_(second["vm"], first["vm"])
+        eq_(second["cpu_cores_logical"], first["cpu_cores_logical"])
+        # the time is collected on every run
+        with mock.patch.object(si, "getSessionInfo", return_value={"time": "now"}):
+            eq_(si.getAllSysInfos(False, self.cachefile)["time"], "now")
+
+    def test_cache_expires(self):
+        si.getAllSysInfos(False, self.cachefile)
+        with mock.patch.object(si, "VMInfo", return_value={"vm": "Maybe"}):
+            eq_(si.getAllSysInfos(False, self.cachefile)["vm"] != "Maybe", True)
+            with mock.patch("time.time", return_value=time.time() + si.CACHE_TTL + 1):
+                eq_(si.getAllSysInfos(False, self.cachefile)["vm"], "Maybe")
+            eq_(si.getAllSysInfos(False, self.cachefile, ttl=0)["vm"], "Maybe")
+
+    def test_run_probes(self):
+        release = threading.Event()
+
+        def hang():
+            release.wait()
+            return {"hung": True}
+
+        def fail():
+            raise OSError("no traceroute")
+
+        probes = [si.SysInfoProbe("hang", hang, (), False, 0.1),
+                  si.SysInfoProbe("fail", fail, (), False, 1.0),
+                  si.SysInfoProbe("none", lambda: None, (), False, 1.0),
+                  si.SysInfoProbe("ok", lambda value: {"ok": value}, (1,), False, 1.0)]
+        start = time.time()
+        try:
+            results = si.runProbes(probes)
+        finally:
+            release.set()
+        assert time.time() - start < 1.0
+        eq_(results, {"none": {}, "ok": {"ok": 1}})
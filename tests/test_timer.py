@@ -0,0 +1,72 @@
+# -*- mode: python; coding: utf-8 -*-
+#
+# Copyright (C) 1990 - 2019 CONTACT Software GmbH
+# All rights reserved.
+# https://www.contact-software.com/
+
+import datetime
+import mock
+import time
+
+from nose.tools import eq_, assert_raises
+from pyperf.timer import PerfTimer, Timer, calibrate, correct_overhead, RESOLUTION_FACTOR, SUBTRACT, FLAG
+
+
+def test_perf_timer():
+    t = PerfTimer()
+    eq_((t.elapsed_ns, t.seconds), (None, None))
+    with t as entered:
+        time.sleep(0.01)
+    eq_(entered is t, True)
+    first = t.elapsed_ns
+    eq_(isinstance(first, int), True)
+    assert 0.01 <= t.seconds < 1.0
+    eq_(t.seconds, first / 1e9)
+
+    # the instance is reused
+    with t:
+        pass
+    assert t.elapsed_ns < first
+
+
+def test_perf_timer_decorator():
+    t = PerfTimer()
+
+    @t
+    def add(a, b=0):
+        time.sleep(0.01)
+        return a + b
+
+    eq_(add(1, b=2), 3)
+    eq_(add.__name__, "add")
+    assert t.seconds >= 0.01
+
+
+def test_timer_compatibility():
+    t = Timer()
+    eq_((t.start, t.elapsed), (None, None))
+    with Timer() as t:
+        time.sleep(0.01)
+    eq_(isinstance(t.elapsed, datetime.timedelta), True)
+    assert abs(t.elapsed.total_seconds() - t.seconds) < 1e-6
+    assert t.elapsed.total_seconds() >= 0.01
+    eq_(isinstance(t.start, float), True)
+
+
+def test_calibrate():
+    calibration = calibrate(1000)
+    eq_(calibration["samples"], 1000)
+    assert 0 <= calibration["min_ns"] <= calibration["median_ns"]
+    eq_(calibration["threshold_ns"],
+        RESOLUTION_FACTOR * max(calibration["median_ns"], calibration["resolution_ns"]))
+
+
+def test_correct_overhead():
+    calibration = {"min_ns": 50, "median_ns": 60, "resolution_ns": 1, "threshold_ns": 600}
+    with mock.patch("pyperf.timer._calibration", calibration):
+        eq_(correct_overhead([100, 40, 1000], "nanoseconds", SUBTRACT), ([50, 0, 950], None))
+        eq_(correct_overhead(1e-6, "seconds", SUBTRACT), (1e-6 - 50e-9, None))
+        eq_(correct_overhead([100, 599, 600, 5000], "ns", FLAG), ([100, 599, 600, 5000], 2))
+        eq_(correct_overhead(0.5, "us", FLAG), (0.5, 1))
+        assert_raises(ValueError, correct_overhead, [1], "statements", SUBTRACT)
+        assert_raises(ValueError, correct_overhead, [1], "seconds", "ignore")
@@ -127,6 +127,50 @@ class TestInfluxdbUploader(unittest.TestCase):
         uploader.upload_2_influx(os.path.join(self.testdata, "report.json"),
                                  self.influxdburl, self.database)
 
+    def test_report_with_histogram(self):
+        with patch('pyperf.uploader.requests.post', new=self.influxmock):
+            uploader.upload_2_influx(os.path.join(self.testdata, "report_histogram.json"),
+                                     self.influxdburl, self.database)
+            lp_msg = self.influxmock.data_last
+            assert lp_msg.startswith("HistogramBenchmark")
+            assert lp_msg.find("latency_count=5") != -1
+            assert lp_msg.find("latency_min=0.01") != -1
+            assert lp_msg.find("latency_max=0.5") != -1
+            assert lp_msg.find("latency_p50=") != -1
+            assert lp_msg.find("latency_p99=") != -1
+
+    def test_report_with_throughput(self):
+        with patch('pyperf.uploader.requests.post', new=self.influxmock):
+            uploader.upload_2_influx(os.path.join(self.testdata, "report_throughput.json"),
+                                     self.influxdburl, self.database)
+            lp_msg = self.influxmock.data_last
+            assert lp_msg.startswith("ThroughputBenchmark")
+            assert lp_msg.find("download_bytes_per_sec_avr=2000") != -1
+            assert lp_msg.find("download_bytes_per_sec_min=1000") != -1
+            assert lp_msg.find("download_ops_per_sec_max=30") != -1
+
+    def test_report_with_matrix(self):
+        with patch('pyperf.uploader.requests.post', new=self.influxmock):
+            uploader.upload_2_influx(os.path.join(self.testdata, "report_matrix.json"),
+                                     self.influxdburl, self.database)
+            lp_msg = self.influxmock.data_last
+            # the comma of the matrix point is escaped, so it does not start the tags
+            assert lp_msg.startswith("sqlite[rows=1000\\,journal_mode=WAL],")
+            assert lp_msg.find("sqlite[rows=1000,") == -1
+            assert lp_msg.find("insert_avr=0.2") != -1
+
+    def test_report_with_distribution(self):
+        with patch('pyperf.uploader.requests.post', new=self.influxmock):
+            uploader.upload_2_influx(os.path.join(self.testdata, "report_distribution.json"),
+                                     self.influxdburl, self.database)
+            lp_msg = self.influxmock.data_last
+            assert lp_msg.startswith("DistributionBenchmark")
+            for field in ("latency_avr=", "latency_stdev=", "latency_mad=", "latency_count=10",
+                          "latency_p50=", "latency_p90=", "latency_p99=", "latency_p99_9=",
+                          "tail_p50=3", "tail_p99_99=", "tail_mad=1"):
+                assert lp_msg.find(field) != -1, field
+            assert lp_msg.find("tail_p90=") == -1
+
     def test_multiple_benchmarks_one_without_data(self):
         with patch('pyperf.uploader.requests.post', new=self.influxmock):
             uploader.upload_2_influx(os.path.join(self.testdata, "report_one_valid_one_invalid.json"),
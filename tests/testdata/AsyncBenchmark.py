@@ -0,0 +1,23 @@
+import asyncio
+import time
+
+from pyperf.bench import Bench
+
+
+class AsyncBenchmark(Bench):
+    async def setUpClass(self):
+        self.loops = [asyncio.get_event_loop()]
+
+    async def setUp(self):
+        self.loops.append(asyncio.get_event_loop())
+
+    async def bench_sleep(self):
+        await asyncio.sleep(0.01)
+        self.storeResult(1)
+
+    async def bench_blocking(self):
+        await asyncio.sleep(0)
+        time.sleep(0.05)
+
+    def bench_sync(self):
+        self.storeResult(2)
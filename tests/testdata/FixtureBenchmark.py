@@ -0,0 +1,24 @@
+from pyperf.bench import Bench
+from pyperf.fixture import Fixture
+
+EVENTS = []
+
+
+class SharedFixture(Fixture):
+    def setUp(self):
+        EVENTS.append("setUp")
+        return {"name": self.args["name"]}
+
+    def tearDown(self):
+        EVENTS.append("tearDown")
+
+
+class FixtureBenchmark(Bench):
+    def bench_fixture(self):
+        EVENTS.append("bench")
+        self.storeResult(self.fixtures["shared"]["name"])
+
+
+class PlainBenchmark(Bench):
+    def bench_plain(self):
+        EVENTS.append("plain")
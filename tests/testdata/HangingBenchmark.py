@@ -0,0 +1,16 @@
+import time
+
+from pyperf.bench import Bench
+
+
+class HangingBenchmark(Bench):
+    def bench_fast(self):
+        self.storeResult(1)
+
+    def bench_hang(self):
+        self.storeResult(2)
+        while True:
+            time.sleep(0.05)
+
+    def bench_unreached(self):
+        self.storeResult(3)